@@ -0,0 +1,185 @@
+"""
+Bounded analysis executor
+A fixed pool of worker tasks runs analysis jobs from a bounded priority queue
+(open-position sessions first, then agents, then one-shot dashboard requests).
+When the queue is full, a new job evicts the lowest-priority queued job if it
+outranks it, and is otherwise rejected with Overloaded, so callers can fall back
+to a cached or degraded result instead of piling up work. Per-stage semaphores
+cap how many analyses are inside each pipeline stage (e.g. LLM sentiment) at once.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from rate_limiter import Priority, upstream_priority
+
+
+DEFAULT_STAGE_LIMITS = {'market': 8, 'sentiment': 4, 'onchain': 8}
+
+
+class Overloaded(Exception):
+    """The analysis queue is full (or the job was evicted by higher-priority work)"""
+
+    def __init__(self, priority: Priority, queued: int):
+        self.priority = priority
+        self.queued = queued
+        super().__init__(f"Analysis queue full ({queued} queued) - {priority.name} job shed")
+
+
+class _Job:
+    __slots__ = ('priority', 'seq', 'key', 'factory', 'future', 'enqueued_at')
+
+    def __init__(self, priority: Priority, seq: int, key: Optional[str], factory: Callable[[], Awaitable]):
+        self.priority = priority
+        self.seq = seq
+        self.key = key
+        self.factory = factory
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: '_Job') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AnalysisExecutor:
+    def __init__(self, workers: int = 8, queue_size: int = 32, stage_limits: Optional[Dict[str, int]] = None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.stage_limits = dict(DEFAULT_STAGE_LIMITS if stage_limits is None else stage_limits)
+        self._queue: List[_Job] = []  # Heap, best priority first
+        self._by_key: Dict[str, _Job] = {}  # Queued or running job per key (e.g. session id)
+        self._seq = itertools.count()
+        self._available: Optional[asyncio.Condition] = None
+        self._stages: Dict[str, asyncio.Semaphore] = {}
+        self._stage_active = {stage: 0 for stage in self.stage_limits}
+        self._tasks: List[asyncio.Task] = []
+        self.running = 0
+        self.stats = {
+            priority.name: {'submitted': 0, 'completed': 0, 'shed': 0, 'evicted': 0, 'joined': 0, 'wait_ms_max': 0.0}
+            for priority in Priority
+        }
+
+    def start(self):
+        if self._tasks:
+            return
+        self._available = asyncio.Condition()
+        self._stages = {stage: asyncio.Semaphore(limit) for stage, limit in self.stage_limits.items()}
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._queue:
+            if not job.future.done():
+                job.future.set_exception(Overloaded(job.priority, len(self._queue)))
+        self._queue = []
+
+    async def submit(self, priority: Priority, factory: Callable[[], Awaitable], key: Optional[str] = None):
+        """
+        Queue `factory()` and wait for its result. A job with the same key that is
+        still queued or running is joined instead of queued twice. Raises Overloaded
+        when the job is shed.
+        """
+        if not self._tasks:
+            self.start()
+        stats = self.stats[priority.name]
+        existing = self._by_key.get(key) if key is not None else None
+        if existing is not None and not existing.future.done():
+            stats['joined'] += 1
+            return await asyncio.shield(existing.future)
+
+        stats['submitted'] += 1
+        if len(self._queue) >= self.queue_size:
+            worst = max(self._queue)
+            if not priority < worst.priority:
+                stats['shed'] += 1
+                raise Overloaded(priority, len(self._queue))
+            # Make room by shedding the lowest-priority, newest queued job
+            self._queue.remove(worst)
+            heapq.heapify(self._queue)
+            self._forget(worst)
+            self.stats[worst.priority.name]['evicted'] += 1
+            worst.future.set_exception(Overloaded(worst.priority, len(self._queue)))
+
+        job = _Job(priority, next(self._seq), key, factory)
+        heapq.heappush(self._queue, job)
+        if key is not None:
+            self._by_key[key] = job
+        async with self._available:
+            self._available.notify()
+        return await asyncio.shield(job.future)
+
+    def _forget(self, job: _Job):
+        if job.key is not None and self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+
+    async def _worker(self, index: int):
+        while True:
+            async with self._available:
+                await self._available.wait_for(lambda: self._queue)
+                job = heapq.heappop(self._queue)
+            stats = self.stats[job.priority.name]
+            stats['wait_ms_max'] = max(stats['wait_ms_max'], round((time.monotonic() - job.enqueued_at) * 1000, 1))
+            self.running += 1
+            try:
+                with upstream_priority(job.priority):
+                    result = await job.factory()
+                if not job.future.done():
+                    job.future.set_result(result)
+                stats['completed'] += 1
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.running -= 1
+                self._forget(job)
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        """Hold one of the stage's slots while inside the block (no limit for unknown stages)"""
+        semaphore = self._stages.get(name)
+        if semaphore is None:
+            yield
+            return
+        async with semaphore:
+            self._stage_active[name] += 1
+            try:
+                yield
+            finally:
+                self._stage_active[name] -= 1
+
+    @property
+    def saturated(self) -> bool:
+        return len(self._queue) >= self.queue_size
+
+    def snapshot(self) -> dict:
+        return {
+            'workers': self.workers,
+            'running': self.running,
+            'queued': len(self._queue),
+            'queue_size': self.queue_size,
+            'stages': {
+                stage: {'limit': limit, 'active': self._stage_active[stage]}
+                for stage, limit in self.stage_limits.items()
+            },
+            'priorities': self.stats
+        }
+
+
+def parse_stage_limits(spec: Optional[str]) -> Dict[str, int]:
+    """DEFAULT_STAGE_LIMITS overridden by 'stage=limit,...'"""
+    limits = dict(DEFAULT_STAGE_LIMITS)
+    for item in (spec or '').split(','):
+        stage, _, limit = item.strip().partition('=')
+        if stage and limit:
+            limits[stage] = int(limit)
+    return limits
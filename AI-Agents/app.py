@@ -3,20 +3,40 @@ FastAPI application for Sentiment Catcher & On-Chain Data Analyzer
 Real-time streaming of LONG/SHORT/HOLD recommendations for Aptos Perp DEX
 """
 import os
+import math
 import asyncio
 import json
 from datetime import datetime
 from typing import Optional, Dict
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from market_data import CoinMarketCapAPI
+from market_data import create_market_data_provider
 from sentiment_analyzer import SentimentAnalyzer
 from aptos_analyzer import AptosAnalyzer
 from decision_engine import DecisionEngine
 from position_manager import PositionManager, RiskLevel
+from volatility import VolatilityTracker
+from sizing import SizingInputCache, size_position
+from pnl_surface import calculate_pnl_surface
+from risk_engine import MonteCarloRiskEngine
+from state_store import StateStore
+from candles import TickCandleAggregator, INTERVAL_SECONDS
+from downsampling import downsample_ohlcv, DOWNSAMPLING_METHODS
+from market_data import ohlcv_columns_to_rows
+from rate_limiter import Priority, upstream_priority, budget_snapshot, BudgetExceeded
+from price_table import PriceTable
+from price_stream import PriceStreamIngestor
+from live_price import LivePriceSynthesizer
+from indexer_ingest import create_indexer_ingestor, parse_assets
+from dex_liquidity import create_liquidity_tracker
+from transaction_tail import create_transaction_tailer
+from whale_detector import create_whale_detector
+from analysis_executor import AnalysisExecutor, Overloaded, parse_stage_limits
+from stage_deadlines import StageDeadlines, parse_stage_deadlines
 
 # Load environment variables
 load_dotenv()
@@ -40,14 +60,77 @@ app.add_middleware(
 cmc_api_key = os.getenv('CMC_API_KEY')
 openai_api_key = os.getenv('OPENAI_API_KEY')
 
-if not cmc_api_key or not openai_api_key:
-    raise ValueError("Please set CMC_API_KEY and OPENAI_API_KEY in your .env file")
+if not openai_api_key:
+    print("⚠️  OPENAI_API_KEY not set - sentiment falls back to a momentum-based score")
 
-cmc = CoinMarketCapAPI(cmc_api_key)
+# CMC, CoinGecko or recorded replay, chosen by MARKET_DATA_PROVIDER
+market_provider = create_market_data_provider()
 sentiment_analyzer = SentimentAnalyzer(openai_api_key)
 aptos_analyzer = AptosAnalyzer()
 decision_engine = DecisionEngine()
 position_manager = PositionManager()
+volatility_tracker = VolatilityTracker()  # Shared across sessions, keyed by token
+sizing_input_cache = SizingInputCache()  # Win rate / payoff ratio per token for quant_algo sizing
+risk_engine = MonteCarloRiskEngine()  # Caches simulated paths per (token, horizon)
+tick_candles = TickCandleAggregator()  # Real OHLC candles from recorded market ticks
+downsample_cache = {}  # (token, days, max_points, method) -> (source key, downsampled columns), LRU order
+MAX_DOWNSAMPLE_ENTRIES = 256
+
+# Last traded price per token, shared by every session and the polling endpoint
+price_table = PriceTable()
+PRICE_STREAM_MAX_AGE = float(os.getenv('PRICE_STREAM_MAX_AGE', '5'))  # Seconds before a table price is stale
+price_stream = PriceStreamIngestor(os.getenv('PRICE_STREAM_URL'), price_table) if os.getenv('PRICE_STREAM_URL') else None
+# One live-price walk per token between quotes, at LIVE_PRICE_HZ
+live_prices = LivePriceSynthesizer(price_table, hz=float(os.getenv('LIVE_PRICE_HZ', '10')),
+                                   stream_max_age=PRICE_STREAM_MAX_AGE)
+
+
+def record_stream_tick(token: str, price: float, volume: float, timestamp: float):
+    """Real ticks feed the candle aggregator and volatility estimator directly"""
+    volatility_tracker.update_price(token, price, timestamp)
+    tick_candles.record_tick(token, price, volume, timestamp)
+
+
+if price_stream:
+    price_stream.add_tick_listener(record_stream_tick)
+
+
+volatility_seeds = {}  # {token: task} - range estimator seeded once from historical candles
+
+
+async def seed_volatility(token: str):
+    """Feed a week of hourly candles to the range-based estimator while tick history is short"""
+    try:
+        with upstream_priority(Priority.BACKGROUND):
+            columns = await asyncio.to_thread(market_provider.get_historical_columns, token, 7)
+        if columns is not None:
+            volatility_tracker.update_ohlc_columns(token, columns)
+    except Exception as e:
+        print(f"⚠️  [Volatility] Could not seed {token} from history: {e}")
+
+
+def table_price(token: str) -> Optional[float]:
+    """Latest price from the shared table, for valuing on-chain amounts in USD"""
+    return (price_table.get(token) or {}).get('price')
+
+
+tracked_assets = parse_assets(os.getenv('APTOS_INDEXER_ASSETS'))  # Aptos asset type -> (symbol, decimals)
+aptos_analyzer.price_lookup = table_price
+# Token transfer activity from the Aptos indexer (APTOS_INDEXER_URL) into the analyzer's rolling counters
+indexer_ingestor = create_indexer_ingestor(aptos_analyzer.activity, price_lookup=table_price)
+# Tails /transactions into a memory-mapped event ring (APTOS_EVENT_RING_PATH) that volume windows scan
+transaction_tailer = create_transaction_tailer(aptos_analyzer.rpc, tracked_assets)
+if transaction_tailer:
+    aptos_analyzer.events = transaction_tailer.ring
+# Large transfers and exchange flows from one on-chain feed (both see the same transfers);
+# the event ring is preferred, as for volume
+aptos_analyzer.whales = create_whale_detector(tracked_assets, table_price)
+if transaction_tailer:
+    transaction_tailer.add_records_listener(aptos_analyzer.whales.observe_records)
+elif indexer_ingestor:
+    indexer_ingestor.add_activity_listener(aptos_analyzer.whales.observe_activity)
+# DEX pool reserves for the same assets, refreshed every DEX_LIQUIDITY_REFRESH_SECONDS
+aptos_analyzer.liquidity = create_liquidity_tracker(aptos_analyzer.rpc, tracked_assets, price_lookup=table_price)
 
 # Store positions by session (in production, use database)
 active_positions = {}
@@ -57,6 +140,25 @@ active_agents = {}  # {session_id: {'activated': True/False, 'token': ..., 'stab
 agent_results = {}  # {session_id: latest_analysis_result}
 agent_tasks = {}  # {session_id: background_task}
 agent_price_history = {}  # {session_id: [{'price': float, 'timestamp': str}]} - Track price history for live updates
+oneshot_results = {}  # {request key: last one-shot result} - served (marked degraded) when analysis is shed
+MAX_ONESHOT_RESULTS = 256
+
+# Every analysis runs on a bounded worker pool; open-position sessions are served first
+analysis_executor = AnalysisExecutor(
+    workers=int(os.getenv('ANALYSIS_WORKERS', '8')),
+    queue_size=int(os.getenv('ANALYSIS_QUEUE_SIZE', '32')),
+    stage_limits=parse_stage_limits(os.getenv('ANALYSIS_STAGE_LIMITS'))
+)
+
+# Per-iteration latency budget: a stage that misses its deadline is served from its last result
+AGENT_LOOP_INTERVAL = 1.0
+stage_deadlines = StageDeadlines(
+    budget=float(os.getenv('ANALYSIS_BUDGET_SECONDS', '0.8')),
+    deadlines=parse_stage_deadlines(os.getenv('ANALYSIS_STAGE_DEADLINES'))
+)
+
+# Write-ahead journal for positions, agents and results so a restart doesn't lose open positions
+state_store = StateStore(os.getenv('STATE_DB_PATH', 'data/sentenex_state.db'))
 
 
 class PerpTradeRequest(BaseModel):
@@ -93,6 +195,8 @@ class AnalysisResponse(BaseModel):
     reasoning: str
     action_message: Optional[str] = None  # Human-readable action message
     clear_action: Optional[str] = None  # Clear action (LONG/SHORT/HOLD)
+    degraded: Optional[bool] = None  # True when the analysis queue was saturated and a cached result was served
+    stage_freshness: Optional[dict] = None  # Per stage: fresh, or the age of the cached value used past its deadline
 
 
 def calculate_perp_trade_details(recommendation: str, market_data: dict, 
@@ -109,27 +213,21 @@ def calculate_perp_trade_details(recommendation: str, market_data: dict,
     # Calculate margin requirement
     margin_required = collateral_usdc / suggested_leverage
     
-    # Calculate potential PnL for 5% price movement
+    # Potential PnL for a 5% price movement, read from the scenario surface
+    # HOLD shows the example for a LONG position
     price_change_pct = 0.05
-    
-    if recommendation == "LONG":
-        # LONG: profit when price goes up, loss when price goes down
-        pnl_if_up = collateral_usdc * suggested_leverage * price_change_pct
-        roi_if_up = suggested_leverage * price_change_pct * 100
-        pnl_if_down = -collateral_usdc * suggested_leverage * price_change_pct
-        roi_if_down = -suggested_leverage * price_change_pct * 100
-    elif recommendation == "SHORT":
-        # SHORT: profit when price goes down, loss when price goes up
-        pnl_if_up = -collateral_usdc * suggested_leverage * price_change_pct
-        roi_if_up = -suggested_leverage * price_change_pct * 100
-        pnl_if_down = collateral_usdc * suggested_leverage * price_change_pct
-        roi_if_down = suggested_leverage * price_change_pct * 100
-    else:
-        # HOLD: Show example for LONG position
-        pnl_if_up = collateral_usdc * suggested_leverage * price_change_pct
-        roi_if_up = suggested_leverage * price_change_pct * 100
-        pnl_if_down = -collateral_usdc * suggested_leverage * price_change_pct
-        roi_if_down = -suggested_leverage * price_change_pct * 100
+    surface = calculate_pnl_surface(
+        'SHORT' if recommendation == "SHORT" else 'LONG',
+        current_price,
+        collateral_usdc,
+        price_moves=(price_change_pct, -price_change_pct),
+        leverages=(suggested_leverage,)
+    )
+    roi_if_up, roi_if_down = surface['roi_pct'][0]
+    # ROI does not depend on collateral, so use the exact (un-bucketed) amount for PnL
+    pnl_if_up = collateral_usdc * roi_if_up / 100
+    pnl_if_down = collateral_usdc * roi_if_down / 100
+    liquidation_price = current_price * (1 + surface['liquidation']['move_pct'][0] / 100)
     
     return {
         'collateral_stablecoin': round(collateral_usdc, 2),
@@ -139,6 +237,7 @@ def calculate_perp_trade_details(recommendation: str, market_data: dict,
         'token_exposure': round(token_exposure, 4),
         'current_price': round(current_price, 4),
         'margin_required': round(margin_required, 2),
+        'liquidation_price': round(liquidation_price, 4),
         'token': token,
         'if_price_moves_5pct_up': {
             'pnl': round(pnl_if_up, 2),
@@ -162,46 +261,84 @@ async def perform_analysis(token: str, stablecoin: str, portfolio_amount: float,
     analysis_start_time = datetime.now()
     print(f"[perform_analysis] Starting fresh analysis for {token} at {analysis_start_time.isoformat()}")
     
+    # Every stage runs under its deadline within the iteration budget; a late stage keeps
+    # running in the background and this iteration uses its last result instead
+    deadline = stage_deadlines.iteration()
+    
+    async def in_stage(name, func, *args, **kwargs):
+        async with analysis_executor.stage(name):
+            return await asyncio.to_thread(func, *args, **kwargs)
+    
     # Step 1: Fetch market data for the token we want to trade
-    # Always fetch fresh data - no caching - make actual API call
-    print(f"[perform_analysis] Fetching fresh market data from CMC API...")
-    market_data = cmc.get_token_info(token.upper())
+    # Upstream clients block while queueing for the shared request budget, so they run
+    # off the event loop (the caller's upstream_priority carries over to the thread)
+    print(f"[perform_analysis] Fetching fresh market data from {market_provider.name} provider...")
+    try:
+        market_data = await deadline.run(
+            'market', token.upper(),
+            lambda: in_stage('market', market_provider.get_token_info, token.upper())
+        )
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={'Retry-After': str(max(int(e.retry_after), 1))})
     
     if not market_data:
         raise HTTPException(
             status_code=404, 
-            detail=f"Token {token} not found. Please check: 1) Token symbol is correct, 2) CMC API key is valid, 3) API key has access to quotes endpoint"
+            detail=f"Token {token} not found by the {market_provider.name} market data provider. Please check: 1) Token symbol is correct, 2) API key (if any) is valid and has access to quotes"
         )
     
     print(f"[perform_analysis] Market data received - Price: ${market_data.get('price', 0):.4f}, 24h Change: {market_data.get('percent_change_24h', 0):.2f}%")
     
+    # Mark (and check SL/TP) at the shared live price - a streamed tick, or the token's
+    # synthesized walk around the latest quote; the quote keeps its own price
+    live_prices.set_anchor(token, market_data['price'], market_data.get('percent_change_1h', 0))
+    live = price_table.get(token, max_age=PRICE_STREAM_MAX_AGE)
+    if live:
+        market_data = {**market_data, 'quote_price': market_data['price'], 'price': live['price'],
+                       'price_source': live['source'], 'price_seq': live['seq']}
+    if live and live['source'] == 'stream':
+        daily_volatility = volatility_tracker.get_daily_volatility(token.upper())  # Already fed per tick
+    else:
+        # Feed the streaming volatility estimator (O(1) per tick) for leverage sizing
+        quote_price = market_data.get('quote_price', market_data['price'])
+        daily_volatility = volatility_tracker.update_price(token.upper(), quote_price)
+        tick_candles.record_tick(token.upper(), quote_price)
+    if daily_volatility is None and token.upper() not in volatility_seeds:
+        volatility_seeds[token.upper()] = asyncio.create_task(seed_volatility(token.upper()))
+    
     # Step 2: Analyze sentiment - only call OpenAI every N iterations to avoid rate limits
     # For real-time updates, we'll use a simplified sentiment based on market data
     # Full OpenAI analysis can be done less frequently
     print(f"[perform_analysis] Analyzing sentiment using model: {model}...")
-    sentiment_data = sentiment_analyzer.analyze_token_sentiment(
-        token.upper(),
-        market_data['name'],
-        market_data,
-        model=model
+    sentiment_data = await deadline.run(
+        'sentiment', (token.upper(), model),
+        lambda: in_stage('sentiment', sentiment_analyzer.analyze_token_sentiment,
+                         token.upper(), market_data['name'], market_data, model=model)
     )
     
     # Step 3: Analyze on-chain data
     print(f"[perform_analysis] Analyzing on-chain data...")
-    onchain_data = aptos_analyzer.analyze_onchain_signals(token.upper())
+    # Reads the in-memory feeds the ingest listeners update, so it stays on the event loop
+    async def onchain_stage():
+        async with analysis_executor.stage('onchain'):
+            return aptos_analyzer.analyze_onchain_signals(token.upper())
+    
+    onchain_data = await deadline.run('onchain', token.upper(), onchain_stage)
     
     # Step 4: Generate final recommendation
-    decision = decision_engine.calculate_signal(
-        market_data,
-        sentiment_data,
-        onchain_data
+    decision = await deadline.run(
+        'decision', (token.upper(), model),  # Follows the sentiment stage's key
+        lambda: in_stage('decision', decision_engine.calculate_signal,
+                         market_data, sentiment_data, onchain_data, daily_volatility)
     )
     
-    # Step 5: Calculate leverage based on risk level
+    # Step 5: Calculate leverage based on risk level and realized volatility
     leverage_info = position_manager.calculate_leverage(
         risk_level,
         decision['confidence'],
-        decision['final_score']
+        decision['final_score'],
+        daily_volatility
     )
     
     # Step 6: Get current position (if any)
@@ -212,6 +349,7 @@ async def perform_analysis(token: str, stablecoin: str, portfolio_amount: float,
             market_data['price']
         )
         active_positions[session_id] = current_position
+        state_store.record('position_update', session_id, current_position)
     
     # Step 7: Determine if we should open/close positions
     execution_signal = {}
@@ -249,7 +387,14 @@ async def perform_analysis(token: str, stablecoin: str, portfolio_amount: float,
             'collateral': current_position.get('collateral'),
             'position_size': current_position.get('position_size'),
             'pnl_usd': current_position.get('pnl_usd', 0),
-            'pnl_pct': current_position.get('pnl_pct', 0)
+            'pnl_pct': current_position.get('pnl_pct', 0),
+            'risk': risk_engine.estimate(
+                current_position,
+                market_data['price'],
+                daily_volatility,
+                stop_loss_roi=stop_loss_roi,
+                take_profit_roi=take_profit_roi
+            )
         }
         
         # Auto-close if conditions met
@@ -260,6 +405,8 @@ async def perform_analysis(token: str, stablecoin: str, portfolio_amount: float,
                 ', '.join(close_decision['exit_conditions'])
             )
             active_positions[session_id] = closed_position
+            state_store.record('position_close', session_id, closed_position)
+            sizing_input_cache.record_trade(closed_position['token'], closed_position['pnl_pct'])
             position_info['status'] = 'closed'
             position_info['close_reason'] = ', '.join(close_decision['exit_conditions'])
             
@@ -272,6 +419,7 @@ async def perform_analysis(token: str, stablecoin: str, portfolio_amount: float,
                     active_agents[session_id]['activated'] = False
                     active_agents[session_id]['deactivated_at'] = datetime.now().isoformat()
                     active_agents[session_id]['deactivation_reason'] = exit_conditions_str
+                    state_store.record('agent_deactivate', session_id, active_agents[session_id])
                     print(f"[CRITICAL] Agent {session_id} deactivated due to: {exit_conditions_str}")
     else:
         # Check if we should open a new position
@@ -288,17 +436,36 @@ async def perform_analysis(token: str, stablecoin: str, portfolio_amount: float,
         }
         position_info = {'status': 'none'}
         
+        # Size the position with the requested quant algorithm (if any)
+        collateral = portfolio_amount
+        if open_decision['should_open'] and quant_algo:
+            sizing_inputs = sizing_input_cache.get_inputs(
+                token.upper(),
+                take_profit_roi,
+                stop_loss_roi,
+                daily_volatility,
+                leverage_info['suggested_leverage']
+            )
+            position_sizing = size_position(quant_algo, portfolio_amount, sizing_inputs, risk_level)
+            execution_signal['position_sizing'] = position_sizing
+            collateral = position_sizing['collateral']
+            if collateral <= 0:
+                execution_signal['action'] = 'WAIT'
+                execution_signal['should_open'] = False
+                execution_signal['reason'] = f'{quant_algo} sizing returned zero (no edge)'
+        
         # Auto-open if conditions met
-        if open_decision['should_open']:
+        if execution_signal['should_open']:
             new_position = position_manager.create_position(
                 token.upper(),
                 decision['recommendation'],
                 market_data['price'],
                 leverage_info['suggested_leverage'],
-                portfolio_amount,
+                collateral,
                 stablecoin.upper()
             )
             active_positions[session_id] = new_position
+            state_store.record('position_open', session_id, new_position)
             position_info = {
                 'status': 'open',
                 'type': new_position.get('type'),
@@ -347,6 +514,11 @@ async def perform_analysis(token: str, stablecoin: str, portfolio_amount: float,
         'percent_change_24h': float(market_data.get('percent_change_24h', 0)),
         'percent_change_7d': float(market_data.get('percent_change_7d', 0))
     }
+    # Keep the provider quote and the live-price provenance alongside the marked price
+    if 'quote_price' in market_data:
+        fresh_market_data['quote_price'] = float(market_data['quote_price'])
+        fresh_market_data['price_source'] = str(market_data['price_source'])
+        fresh_market_data['price_seq'] = int(market_data['price_seq'])
     
     fresh_sentiment_data = {
         'overall_sentiment': float(sentiment_data.get('overall_sentiment', 0)),
@@ -361,7 +533,14 @@ async def perform_analysis(token: str, stablecoin: str, portfolio_amount: float,
         'activity_score': float(onchain_data.get('activity_score', 0.5)),
         'liquidity_score': float(onchain_data.get('liquidity_score', 0.5)),
         'transaction_count_24h': int(onchain_data.get('transaction_count_24h', 0)),
-        'total_liquidity_usd': float(onchain_data.get('total_liquidity_usd', 0))
+        'volume_usd_24h': float(onchain_data.get('volume_usd_24h', 0)),
+        'unique_addresses_24h': int(onchain_data.get('unique_addresses_24h', 0)),
+        'total_liquidity_usd': float(onchain_data.get('total_liquidity_usd', 0)),
+        'whale_flow_signal': float(onchain_data.get('whale_flow_signal', 0.0)),
+        'large_transfers_1h': int(onchain_data.get('large_transfers_1h', 0)),
+        'exchange_inflow_usd_1h': float(onchain_data.get('exchange_inflow_usd_1h', 0.0)),
+        'exchange_outflow_usd_1h': float(onchain_data.get('exchange_outflow_usd_1h', 0.0)),
+        'freshness': copy.deepcopy(onchain_data.get('freshness'))
     }
     
     # Deep copy all nested structures
@@ -394,7 +573,8 @@ async def perform_analysis(token: str, stablecoin: str, portfolio_amount: float,
         'execution_signal': fresh_execution_signal,
         'perp_trade_details': fresh_perp_trade,
         'signal_breakdown': fresh_signal_breakdown,
-        'reasoning': str(decision['reasoning'])
+        'reasoning': str(decision['reasoning']),
+        'stage_freshness': copy.deepcopy(deadline.freshness)
     }
     
     # Log the actual values to verify they're fresh
@@ -427,13 +607,18 @@ async def agent_loop(session_id: str, token: str, stablecoin: str,
     Runs every 1 second while agent is activated
     """
     iteration = 0
+    if price_stream:
+        await price_stream.subscribe(token)
     
+    loop = asyncio.get_running_loop()
+    next_run = loop.time()
     while True:
         # Check if agent is still activated
         if session_id not in active_agents or not active_agents[session_id].get('activated', False):
             print(f"Agent {session_id} deactivated, stopping loop")
             break
         
+        next_run += AGENT_LOOP_INTERVAL
         try:
             iteration += 1
             # Always create a fresh timestamp to ensure uniqueness
@@ -444,25 +629,35 @@ async def agent_loop(session_id: str, token: str, stablecoin: str,
             # Get agent config from active_agents to pass to perform_analysis
             agent_config = active_agents.get(session_id, {})
             
+            # Sessions with an open position get first claim on the upstream budget
+            position = active_positions.get(session_id)
+            priority = Priority.POSITION_CRITICAL if position and position.get('status') == 'open' else Priority.AGENT
+            
             # Perform analysis - this should fetch fresh data from APIs
             # This makes actual API calls to CMC, OpenAI, etc.
-            result = await perform_analysis(
-                token,
-                stablecoin,
-                portfolio_amount,
-                risk_level,
-                session_id,
-                agent_config.get('model', 'GPT-5'),
-                agent_config.get('stop_loss', '90.0'),
-                agent_config.get('take_profit', '150.0'),
-                agent_config.get('quant_algo', None)
+            # Runs on the bounded executor; the priority also applies to the upstream budgets
+            result = await analysis_executor.submit(
+                priority,
+                lambda: perform_analysis(
+                    token,
+                    stablecoin,
+                    portfolio_amount,
+                    risk_level,
+                    session_id,
+                    agent_config.get('model', 'GPT-5'),
+                    agent_config.get('stop_loss', '90.0'),
+                    agent_config.get('take_profit', '150.0'),
+                    agent_config.get('quant_algo', None)
+                ),
+                key=session_id
             )
             
-            # CRITICAL: Add live price variation for smooth chart updates
-            # CMC API doesn't update every second, so we add small variations based on trend
-            cmc_price = result.get('market_data', {}).get('price', 0)
+            # Live price comes from the shared price table: real ticks when the stream is
+            # live, otherwise the token's synthesizer task (same price for every session)
+            # The provider quote stays in quote_price; 'price' is already marked at the live price
+            result_market = result.get('market_data', {})
+            cmc_price = result_market.get('quote_price', result_market.get('price', 0))
             percent_change_1h = result.get('market_data', {}).get('percent_change_1h', 0)
-            percent_change_24h = result.get('market_data', {}).get('percent_change_24h', 0)
             
             # Initialize price history for this session if needed
             if session_id not in agent_price_history:
@@ -471,55 +666,12 @@ async def agent_loop(session_id: str, token: str, stablecoin: str,
             # Get last prices from history
             price_history = agent_price_history[session_id]
             last_live_price = price_history[-1]['price'] if price_history else None
-            last_cmc_price = price_history[-1]['cmc_price'] if price_history else None
-            
-            # Calculate live price with variation for smooth updates
-            import random
-            import math
-            
-            # ALWAYS add variation - even on first iteration or when CMC changes
-            if last_live_price is not None:
-                # We have history - continue from last live price
-                base_price = last_live_price
-            else:
-                # First iteration - start from CMC price
-                base_price = cmc_price
-            
-            # Calculate trend based on 1h change rate (scaled to per-second)
-            # If 1h change is +1%, that's +0.000278% per second
-            hourly_trend_per_second = (percent_change_1h / 3600) / 100  # Convert % to decimal, then per second
             
-            # Add random walk - make it percentage-based but with minimum absolute change
-            # For low-priced tokens (like APT ~$2), we need larger percentage variation
-            # For high-priced tokens (like BTC ~$90k), smaller percentage is fine
-            # Use adaptive variation: ±0.1% minimum, or ±$0.01 minimum for visibility
-            min_absolute_change = 0.01  # Minimum $0.01 change for visibility
-            min_percentage_change = 0.001  # Minimum 0.1% change
-            
-            # Calculate both percentage and absolute variations
-            percentage_variation = random.uniform(-0.001, 0.001)  # ±0.1% base variation
-            absolute_variation = random.uniform(-min_absolute_change, min_absolute_change)
-            
-            # Use the larger of percentage-based or absolute minimum
-            if abs(percentage_variation * base_price) < min_absolute_change:
-                # For low-priced tokens, use absolute variation
-                random_walk = absolute_variation / base_price  # Convert to percentage
-            else:
-                # For higher-priced tokens, use percentage variation
-                random_walk = percentage_variation
-            
-            trend_component = hourly_trend_per_second
-            
-            # Combine: base price + trend + random walk
-            price_change = (trend_component + random_walk) * base_price
-            live_price = base_price + price_change
-            
-            # Ensure live price doesn't drift too far from CMC price (±1%)
-            max_drift = cmc_price * 0.01  # 1% max drift
-            if abs(live_price - cmc_price) > max_drift:
-                # Pull back towards CMC price gradually
-                drift_factor = 0.2  # Pull back 20% each time
-                live_price = cmc_price + (live_price - cmc_price) * (1 - drift_factor)
+            live = price_table.get(token, max_age=PRICE_STREAM_MAX_AGE)
+            live_price = live['price'] if live else cmc_price
+            if live and live['source'] == 'synthetic' and 'quote_price' not in result_market:
+                # Without the quote, cmc_price would just repeat the synthesized live price
+                print(f"⚠️  [Agent Loop] {session_id}: quote_price missing while the live-price synthesizer runs")
             
             # Log the update
             if last_live_price is not None:
@@ -544,6 +696,8 @@ async def agent_loop(session_id: str, token: str, stablecoin: str,
             new_market_data['price'] = float(live_price)  # Ensure it's a float
             new_market_data['live_price'] = float(live_price)  # Add separate field for live price
             new_market_data['cmc_price'] = float(cmc_price)  # Keep original CMC price
+            if live:
+                new_market_data['price_seq'] = live['seq']  # Polls re-mark only on newer prices
             result['market_data'] = new_market_data  # Replace entire dict for fresh reference
             
             # Ensure timestamp is always fresh and unique
@@ -558,6 +712,7 @@ async def agent_loop(session_id: str, token: str, stablecoin: str,
             # Use deep copy to ensure completely fresh object
             import copy
             agent_results[session_id] = copy.deepcopy(result)
+            state_store.record('agent_result', session_id, result)
             
             # CRITICAL: Check if agent was deactivated during analysis (e.g., TP/SL hit)
             # Break immediately instead of waiting for next iteration
@@ -573,6 +728,9 @@ async def agent_loop(session_id: str, token: str, stablecoin: str,
             price_id = id(result.get('market_data', {}).get('price', 0))
             print(f"[Agent {session_id}] Update #{iteration} | Price: ${price:.4f} (ID: {price_id}) | Rec: {rec} | Conf: {confidence:.1f}% | Sentiment: {sentiment:.2f} | Timestamp: {current_timestamp}")
             
+        except Overloaded as e:
+            # Shed under load - polls keep serving the previous result until a slot frees up
+            print(f"⚠️  [Agent Loop] {session_id}: {e}")
         except Exception as e:
             print(f"Error in agent loop for {session_id}: {e}")
             import traceback
@@ -581,8 +739,73 @@ async def agent_loop(session_id: str, token: str, stablecoin: str,
             # Only log the error, don't overwrite previous successful result
             # This prevents validation errors when returning cached results
         
-        # Wait 1 second before next update
-        await asyncio.sleep(1)
+        # Fixed rate: sleep out the rest of the second; after an overrun, skip the missed
+        # ticks instead of firing them back to back
+        now = loop.time()
+        if next_run < now:
+            next_run = now
+        await asyncio.sleep(next_run - now)
+
+
+def start_agent_task(session_id: str, agent_config: dict):
+    """Start the background analysis loop for an activated agent"""
+    task = asyncio.create_task(agent_loop(
+        session_id,
+        agent_config['token'],
+        agent_config['stablecoin'],
+        agent_config['portfolio_amount'],
+        agent_config['risk_level'],
+        agent_config.get('model', 'GPT-5'),
+        agent_config.get('stop_loss', '90.0'),
+        agent_config.get('take_profit', '150.0'),
+        agent_config.get('quant_algo')
+    ))
+    agent_tasks[session_id] = task
+    
+    # The token's live-price task runs while any agent on it does (however the loop ends)
+    live_prices.acquire(agent_config['token'])
+    task.add_done_callback(lambda _: live_prices.release(agent_config['token']))
+    return task
+
+
+@app.on_event("startup")
+async def recover_state():
+    """Restore positions, agents and results from the journal and resume active agents"""
+    state = state_store.recover()
+    active_positions.update(state['active_positions'])
+    active_agents.update(state['active_agents'])
+    agent_results.update(state['agent_results'])
+    state_store.start()
+    analysis_executor.start()
+    if price_stream:
+        price_stream.start()
+    if indexer_ingestor:
+        indexer_ingestor.start()
+    if aptos_analyzer.liquidity:
+        aptos_analyzer.liquidity.start()
+    if transaction_tailer:
+        transaction_tailer.start()
+    
+    for session_id, agent_config in active_agents.items():
+        if agent_config.get('activated', False):
+            print(f"[Startup] Resuming agent {session_id}")
+            start_agent_task(session_id, agent_config)
+
+
+@app.on_event("shutdown")
+async def flush_state():
+    """Flush pending journal records before the process exits"""
+    if price_stream:
+        await price_stream.stop()
+    if indexer_ingestor:
+        await indexer_ingestor.stop()
+    if aptos_analyzer.liquidity:
+        await aptos_analyzer.liquidity.stop()
+    if transaction_tailer:
+        await transaction_tailer.stop()
+    await analysis_executor.stop()
+    await aptos_analyzer.close()
+    state_store.close()
 
 
 @app.post("/api/analyze", response_model=AnalysisResponse)
@@ -619,6 +842,12 @@ async def analyze_perp_trade(request: PerpTradeRequest):
                 # Ensure price is explicitly a float with high precision
                 if 'price' in fresh_market_data:
                     fresh_market_data['price'] = float(fresh_market_data['price'])
+                # Between agent iterations, serve the latest live price (sub-second, no REST call)
+                streamed = price_table.get(request.token, max_age=PRICE_STREAM_MAX_AGE)
+                if streamed and streamed['seq'] != fresh_market_data.get('price_seq'):
+                    fresh_market_data['price'] = streamed['price']
+                    fresh_market_data['live_price'] = streamed['price']
+                    fresh_market_data['price_seq'] = streamed['seq']
                 cached_result['market_data'] = fresh_market_data
             
             # Log to verify we're returning fresh data
@@ -725,26 +954,52 @@ async def analyze_perp_trade(request: PerpTradeRequest):
                     'sentiment_score': 0.0,
                     'market_momentum': 0.0,
                     'onchain_signal': 0.0,
+                    'whale_flow_signal': 0.0,
                     'risk_level': 'Medium'
                 },
                 reasoning='Agent activated, waiting for first analysis to complete...',
                 agent_status='initializing'
             )
     
-    # Agent not activated - perform one-time analysis
+    # Agent not activated - perform one-time analysis (lowest interactive priority)
+    # Only identical requests (every perform_analysis argument) share a queued job or a cached result
+    oneshot_key = '|'.join(str(value) for value in (
+        session_id, request.risk_level, request.model, request.stop_loss,
+        request.take_profit, request.quant_algo
+    ))
     try:
-        result = await perform_analysis(
-            request.token,
-            request.stablecoin,
-            request.portfolio_amount,
-            request.risk_level,
-            session_id,
-            request.model,
-            request.stop_loss,
-            request.take_profit,
-            request.quant_algo
+        result = await analysis_executor.submit(
+            Priority.DASHBOARD,
+            lambda: perform_analysis(
+                request.token,
+                request.stablecoin,
+                request.portfolio_amount,
+                request.risk_level,
+                session_id,
+                request.model,
+                request.stop_loss,
+                request.take_profit,
+                request.quant_algo
+            ),
+            key=oneshot_key
         )
+        oneshot_results.pop(oneshot_key, None)
+        oneshot_results[oneshot_key] = result
+        if len(oneshot_results) > MAX_ONESHOT_RESULTS:
+            oneshot_results.pop(next(iter(oneshot_results)))  # Oldest first
         return AnalysisResponse(**result)
+    except Overloaded as e:
+        # Saturated: serve this request's last result, marked degraded, rather than queueing more work
+        cached_result = oneshot_results.get(oneshot_key)
+        if cached_result is None:
+            raise HTTPException(status_code=503, detail=str(e), headers={'Retry-After': '1'})
+        return AnalysisResponse(**{
+            **cached_result,
+            'degraded': True,
+            'action_message': f"Analysis capacity saturated - showing the result from {cached_result['timestamp']}"
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -797,20 +1052,10 @@ async def activate_agent(request: ActivateAgentRequest):
         'quant_algo': request.quant_algo,
         'activated_at': datetime.now().isoformat()
     }
+    state_store.record('agent_activate', session_id, active_agents[session_id])
     
     # Start background task
-    task = asyncio.create_task(agent_loop(
-        session_id,
-        request.token.upper(),
-        request.stablecoin.upper(),
-        request.portfolio_amount,
-        request.risk_level.lower(),
-        request.model,
-        request.stop_loss,
-        request.take_profit,
-        request.quant_algo
-    ))
-    agent_tasks[session_id] = task
+    start_agent_task(session_id, active_agents[session_id])
     
     return {
         'status': 'activated',
@@ -843,6 +1088,7 @@ async def deactivate_agent(request: DeactivateAgentRequest):
         # Stop the background task
         active_agents[session_id]['activated'] = False
         active_agents[session_id]['deactivated_at'] = datetime.now().isoformat()
+        state_store.record('agent_deactivate', session_id, active_agents[session_id])
         
         # Cancel background task if exists
         if session_id in agent_tasks:
@@ -857,10 +1103,12 @@ async def deactivate_agent(request: DeactivateAgentRequest):
         # Clear stored results and price history
         if session_id in agent_results:
             del agent_results[session_id]
+            state_store.record('agent_result_delete', session_id)
         if session_id in agent_price_history:
             del agent_price_history[session_id]
         if session_id in active_positions:
             del active_positions[session_id]
+            state_store.record('position_delete', session_id)
         
         return {
             'status': 'deactivated',
@@ -909,8 +1157,27 @@ async def get_agent_status(token: str, stablecoin: str, portfolio_amount: float)
 # WebSocket endpoint removed - using polling-based system instead
 # Frontend should use /api/activate, then poll /api/analyze repeatedly
 
+def get_downsampled_columns(token: str, days: int, columns: dict,
+                            max_points: int, method: str) -> dict:
+    """Downsampled columns, cached until the underlying series changes"""
+    count = len(columns['timestamp'])
+    source_key = (count, float(columns['timestamp'][-1]), float(columns['close'][-1])) if count else (0,)
+    cache_key = (token, days, max_points, method)
+    cached = downsample_cache.pop(cache_key, None)
+    if cached and cached[0] == source_key:
+        downsample_cache[cache_key] = cached  # Most recently used last
+        return cached[1]
+    
+    downsampled = downsample_ohlcv(columns, max_points, method)
+    downsample_cache[cache_key] = (source_key, downsampled)
+    if len(downsample_cache) > MAX_DOWNSAMPLE_ENTRIES:
+        downsample_cache.pop(next(iter(downsample_cache)))  # Least recently used first
+    return downsampled
+
+
 @app.get("/api/historical/{token}")
-async def get_historical_data(token: str, days: int = 30):
+async def get_historical_data(token: str, days: int = 30, format: str = "rows",
+                              max_points: Optional[int] = None, downsample: str = "minmax"):
     """
     Get historical price data for a token with OHLC (candlestick) data
     
@@ -918,7 +1185,18 @@ async def get_historical_data(token: str, days: int = 30):
         token: Token symbol (e.g., APT, BTC, ETH)
         days: Number of days of historical data (default: 30)
             Options: 1 (1 day), 7 (7 days), 30 (30 days), 365 (1 year)
+        format: "rows" (default, one object per point) or "columnar"
+            (one array per field: timestamp, open, high, low, close, volume)
+        max_points: Downsample to at most this many points (default: no limit)
+        downsample: "minmax" (merge candles, keeps every high/low) or "lttb"
     """
+    if format not in ("rows", "columnar"):
+        raise HTTPException(status_code=400, detail="format must be 'rows' or 'columnar'")
+    if downsample not in DOWNSAMPLING_METHODS:
+        raise HTTPException(status_code=400, detail=f"downsample must be one of {', '.join(DOWNSAMPLING_METHODS)}")
+    if max_points is not None and max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be at least 3")
+    
     try:
         # Map common period names to days
         period_map = {
@@ -932,20 +1210,231 @@ async def get_historical_data(token: str, days: int = 30):
         if isinstance(days, str) and days.lower() in period_map:
             days = period_map[days.lower()]
         
-        historical = cmc.get_historical_data(token.upper(), days)
-        if historical:
-            return {
+        with upstream_priority(Priority.DASHBOARD):
+            columns = await asyncio.to_thread(market_provider.get_historical_columns, token.upper(), days)
+        if columns is None or len(columns['timestamp']) == 0:
+            raise HTTPException(status_code=404, detail=f"Could not fetch historical data for {token}")
+        if days <= 7:
+            volatility_tracker.update_ohlc_columns(token.upper(), columns)  # Hourly bars
+        
+        if max_points:
+            columns = get_downsampled_columns(token.upper(), days, columns, max_points, downsample)
+        
+        if format == "columnar":
+            # Plain float lists serialize directly - skip FastAPI's per-element encoder
+            return JSONResponse(content={
                 "token": token.upper(),
                 "days": days,
-                "data": historical,
-                "count": len(historical)
-            }
-        else:
-            raise HTTPException(status_code=404, detail=f"Could not fetch historical data for {token}")
+                "format": "columnar",
+                "columns": {name: values.tolist() for name, values in columns.items()},
+                "count": len(columns['timestamp'])
+            })
+        
+        historical = ohlcv_columns_to_rows(columns)
+        return {
+            "token": token.upper(),
+            "days": days,
+            "data": historical,
+            "count": len(historical)
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/candles/{token}")
+async def get_tick_candles(token: str, interval: str = "1m"):
+    """
+    OHLC candles aggregated from the market ticks recorded by running agents
+    
+    Args:
+        token: Token symbol (e.g., APT, BTC, ETH)
+        interval: Candle interval - 1m, 5m, 1h or 1d (default: 1m)
+    """
+    if interval not in INTERVAL_SECONDS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(INTERVAL_SECONDS)}")
+    
+    columns = tick_candles.get_candles(token.upper(), interval)
+    return JSONResponse(content={
+        "token": token.upper(),
+        "interval": interval,
+        "format": "columnar",
+        "columns": {name: values.tolist() for name, values in columns.items()},
+        "count": len(columns['timestamp'])
+    })
+
+
+@app.get("/api/pnl-surface/{token}")
+async def get_pnl_surface(token: str, collateral: float = 100.0, side: str = "LONG",
+                          price: Optional[float] = None, move_range_pct: float = 20.0,
+                          steps: int = 41, leverages: Optional[str] = None):
+    """
+    PnL / ROI surface over a grid of price moves and leverage levels
+    
+    Args:
+        token: Token symbol (e.g., APT, BTC, ETH)
+        collateral: Collateral in stablecoin (default: 100)
+        side: LONG or SHORT
+        price: Entry price; defaults to the current market price
+        move_range_pct: Grid spans -move_range_pct..+move_range_pct (default: 20)
+        steps: Number of price-move columns (default: 41)
+        leverages: Comma-separated leverage levels (e.g. "1,2,5,10"); defaults to 1x-50x
+    """
+    if steps < 2 or steps > 1001:
+        raise HTTPException(status_code=400, detail="steps must be between 2 and 1001")
+    
+    try:
+        leverage_levels = [float(l) for l in leverages.split(',') if l.strip()] if leverages else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid leverages: {leverages}")
+    if leverage_levels is not None and not all(math.isfinite(l) and l >= 1 for l in leverage_levels):
+        raise HTTPException(status_code=400, detail=f"Leverages must be numbers >= 1: {leverages}")
+    if not (math.isfinite(collateral) and collateral > 0):
+        raise HTTPException(status_code=400, detail="collateral must be a positive number")
+    if not (math.isfinite(move_range_pct) and 0 < move_range_pct < 100):
+        raise HTTPException(status_code=400, detail="move_range_pct must be between 0 and 100 (exclusive)")
+    if price is not None and not (math.isfinite(price) and price > 0):
+        raise HTTPException(status_code=400, detail="price must be a positive number")
+    
+    if price is None:
+        try:
+            with upstream_priority(Priority.DASHBOARD):
+                market_data = await asyncio.to_thread(market_provider.get_token_info, token.upper())
+        except BudgetExceeded as e:
+            raise HTTPException(status_code=429, detail=str(e),
+                                headers={'Retry-After': str(max(int(e.retry_after), 1))})
+        if not market_data:
+            raise HTTPException(status_code=404, detail=f"Token {token} not found")
+        price = market_data['price']
+    
+    move_range = move_range_pct / 100
+    surface = calculate_pnl_surface(
+        side,
+        price,
+        collateral,
+        price_moves=[-move_range + 2 * move_range * i / (steps - 1) for i in range(steps)],
+        leverages=leverage_levels
+    )
+    return {
+        "token": token.upper(),
+        **surface
+    }
+
+
+@app.get("/api/risk/{token}/{stablecoin}/{portfolio_amount}")
+async def get_position_risk(token: str, stablecoin: str, portfolio_amount: float,
+                            horizon_minutes: int = 60, confidence: float = 0.95):
+    """
+    Monte Carlo risk estimate for the session's open position
+    
+    Returns the probability of touching stop-loss, take-profit and liquidation
+    within the horizon, plus VaR and expected shortfall of the horizon PnL.
+    """
+    if horizon_minutes < 1 or horizon_minutes > 10080:
+        raise HTTPException(status_code=400, detail="horizon_minutes must be between 1 and 10080")
+    if not 0.5 <= confidence < 1:
+        raise HTTPException(status_code=400, detail="confidence must be in [0.5, 1)")
+    
+    session_id = f"{token.upper()}_{stablecoin.upper()}_{portfolio_amount}"
+    position = active_positions.get(session_id)
+    if not position or position.get('status') != 'open':
+        raise HTTPException(status_code=404, detail=f"No open position for session {session_id}")
+    
+    agent_config = active_agents.get(session_id, {})
+    stop_loss_roi = -(100.0 - float(agent_config.get('stop_loss', '90.0')))
+    take_profit_roi = float(agent_config.get('take_profit', '150.0')) - 100.0
+    
+    risk = risk_engine.estimate(
+        position,
+        position.get('current_price', position.get('entry_price')),
+        volatility_tracker.get_daily_volatility(token.upper()),
+        horizon_minutes=horizon_minutes,
+        stop_loss_roi=stop_loss_roi,
+        take_profit_roi=take_profit_roi,
+        confidence=confidence
+    )
+    return {
+        'session_id': session_id,
+        'position': position,
+        'risk': risk
+    }
+
+
+@app.get("/api/prices")
+async def get_live_prices():
+    """
+    Shared last-price table
+    
+    Latest price, age, sequence number and source per token, plus update,
+    duplicate and gap counters and the tick stream's connection state.
+    """
+    return {
+        'prices': price_table.snapshot(),
+        'stream': price_stream.snapshot() if price_stream else None
+    }
+
+
+@app.get("/api/onchain-activity/{token}")
+async def get_onchain_activity(token: str):
+    """
+    Rolling on-chain transfer activity for a token
+    
+    1h and 24h transaction count, USD volume and approximate unique addresses
+    from the indexer ingestion job, cached DEX liquidity, plus the ingestor's
+    cursor, lag and error counters and the pool registry's refresh state.
+    """
+    token = token.upper()
+    return {
+        'token': token,
+        'windows': aptos_analyzer.activity.window_totals(token),
+        'unique_addresses': aptos_analyzer.activity.unique_counts(token),
+        'observed_seconds': round(aptos_analyzer.activity.coverage_seconds(token), 1),
+        'liquidity': aptos_analyzer.get_liquidity_metrics(token),
+        'indexer': indexer_ingestor.snapshot() if indexer_ingestor else None,
+        'transaction_tail': transaction_tailer.snapshot() if transaction_tailer else None,
+        'dex_pools': aptos_analyzer.liquidity.snapshot() if aptos_analyzer.liquidity else None,
+        'whale_flows': aptos_analyzer.whales.flows(token),
+        'whale_alerts': aptos_analyzer.whales.recent_alerts(token),
+        'signal_cache': aptos_analyzer.signal_cache_stats
+    }
+
+
+@app.get("/api/price-sources")
+async def get_price_sources():
+    """
+    Market data sources behind the current provider
+    
+    With several sources (MARKET_DATA_PROVIDER=cmc,coingecko), reports the
+    aggregation method, hedged request count, and per-source p50/p95 latency,
+    staleness, failures and whether the source is currently dropped.
+    """
+    return market_provider.source_stats()
+
+
+@app.get("/api/analysis-executor")
+async def get_analysis_executor():
+    """
+    Analysis worker pool state
+    
+    Workers running, queue depth against its bound, per-stage slots in use,
+    and per-priority submitted/completed/shed/evicted counts with the longest
+    queueing delay.
+    """
+    return {**analysis_executor.snapshot(), 'deadlines': stage_deadlines.snapshot()}
+
+
+@app.get("/api/upstream-budgets")
+async def get_upstream_budgets():
+    """
+    Shared CMC / CoinGecko / OpenAI request budgets
+    
+    Per provider: configured rate, tokens left, queue length, upstream 429s, and
+    per-priority granted/rejected counts with queueing delay (avg, p95, max).
+    """
+    return budget_snapshot()
+
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
@@ -953,6 +1442,7 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "services": {
+            "market_data_provider": market_provider.name,
             "coinmarketcap": "configured" if cmc_api_key else "not configured",
             "openai": "configured" if openai_api_key else "not configured"
         }
@@ -1,9 +1,16 @@
 """
 Aptos blockchain on-chain data analyzer
 """
-import requests
-from typing import Dict, Optional, List
+import os
+from typing import Callable, Dict, Optional, List
 import time
+from datetime import datetime
+
+import numpy as np
+
+from aptos_rpc import AptosRpcClient
+from onchain_activity import OnchainActivityStore
+from event_ring import EventRingBuffer, EVENT_DEPOSIT
 
 
 class AptosAnalyzer:
@@ -11,18 +18,33 @@ class AptosAnalyzer:
         # Aptos mainnet RPC endpoints
         self.mainnet_rpc = "https://fullnode.mainnet.aptoslabs.com/v1"
         self.testnet_rpc = "https://fullnode.testnet.aptoslabs.com/v1"
-        self.current_rpc = self.mainnet_rpc
+        self.current_rpc = os.getenv('APTOS_RPC_URL', self.mainnet_rpc)
+        # Pooled async client - coalesces lookups and caches them per ledger version
+        self.rpc = AptosRpcClient(self.current_rpc)
+        # Rolling 1h/24h transfer counters, filled by the indexer ingestor (indexer_ingest.py)
+        self.activity = OnchainActivityStore()
+        # Cached DEX pool aggregates, refreshed on a schedule (dex_liquidity.py); None when not configured
+        self.liquidity = None
+        # Memory-mapped transfer events written by the transaction tailer (transaction_tail.py);
+        # when set, volume windows are scanned from it instead of the indexer counters
+        self.events: Optional[EventRingBuffer] = None
+        self.price_lookup: Optional[Callable[[str], Optional[float]]] = None  # TOKEN -> USD price
+        # Large-transfer / exchange-flow detector fed by the same event feeds (whale_detector.py)
+        self.whales = None
+        # TOKEN -> (inputs key, result); recomputed only when the ledger version or counters advance
+        self._signal_cache: Dict[str, tuple] = {}
+        self.signal_cache_stats = {'hits': 0, 'misses': 0}
     
-    def get_account_info(self, address: str) -> Optional[Dict]:
+    async def get_account_info(self, address: str) -> Optional[Dict]:
         """Get account information from Aptos"""
-        try:
-            url = f"{self.current_rpc}/accounts/{address}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"Error fetching account info: {e}")
-            return None
+        return await self.rpc.get_account(address)
+    
+    async def get_account_resource(self, address: str, resource_type: str) -> Optional[Dict]:
+        """Get one Move resource (e.g. a CoinStore) of an account"""
+        return await self.rpc.get_account_resource(address, resource_type)
+    
+    async def close(self):
+        await self.rpc.close()
     
     def get_token_holders(self, token_address: str) -> Optional[List]:
         """Get token holder information (if available via indexer)"""
@@ -42,13 +64,36 @@ class AptosAnalyzer:
         Returns volume metrics and activity indicators
         """
         try:
-            # Placeholder for transaction volume analysis
-            # In production, integrate with Aptos indexer
+            if self.events is not None:
+                ring_volume = self._transaction_volume_from_ring(token_address)
+                if ring_volume is not None:
+                    return ring_volume
+            
+            if not self.activity.tracked(token_address):
+                # Not ingested from the indexer - neutral placeholders
+                return {
+                    'transaction_count_24h': 0,
+                    'unique_addresses_24h': 0,
+                    'volume_usd_24h': 0,
+                    'activity_score': 0.5  # 0-1 scale
+                }
+            
+            now = time.time()
+            totals = self.activity.window_totals(token_address, now)
+            unique_addresses = self.activity.unique_counts(token_address, now)
+            count_1h = totals['1h']['transaction_count']
+            count_24h = totals['24h']['transaction_count']
+            
             return {
-                'transaction_count_24h': 0,
-                'unique_addresses_24h': 0,
-                'volume_usd_24h': 0,
-                'activity_score': 0.5  # 0-1 scale
+                'transaction_count_24h': int(count_24h),
+                'transaction_count_1h': int(count_1h),
+                'unique_addresses_24h': unique_addresses['24h'],  # Approximate (HyperLogLog)
+                'unique_addresses_1h': unique_addresses['1h'],
+                'volume_usd_24h': totals['24h']['volume_usd'],
+                'volume_usd_1h': totals['1h']['volume_usd'],
+                'activity_score': self._activity_score(
+                    count_1h, count_24h, self.activity.coverage_seconds(token_address, now)
+                )
             }
         except Exception as e:
             print(f"Error analyzing transaction volume: {e}")
@@ -59,18 +104,56 @@ class AptosAnalyzer:
                 'activity_score': 0.5
             }
     
+    def _activity_score(self, count_1h: float, count_24h: float, observed_seconds: float) -> float:
+        """
+        Last hour against the hourly average over the observed part of the 24h window:
+        a steady rate scores 0.5, a surge approaches 1, a lull approaches 0
+        """
+        hourly_average = count_24h / max(observed_seconds / 3600, 1.0)
+        ratio = count_1h / hourly_average if hourly_average > 0 else 1.0
+        return ratio / (1 + ratio)
+    
+    def _transaction_volume_from_ring(self, token_symbol: str) -> Optional[Dict]:
+        """Exact 1h/24h figures from a scan of the event ring; None if it holds nothing for the token"""
+        now = time.time()
+        day = self.events.window(now - 86400, token_symbol)
+        if len(day) == 0:
+            return None
+        hour = day[np.searchsorted(day['timestamp'], now - 3600):]
+        
+        def transactions(events) -> int:
+            # Records are in version order: count version changes
+            return int(np.count_nonzero(np.diff(events['version']))) + 1 if len(events) else 0
+        
+        price = self.price_lookup(token_symbol) if self.price_lookup else None
+        day_deposits = day['amount'][day['kind'] == EVENT_DEPOSIT]
+        hour_deposits = hour['amount'][hour['kind'] == EVENT_DEPOSIT]
+        count_24h, count_1h = transactions(day), transactions(hour)
+        observed = now - max(self.events.oldest_timestamp(), now - 86400)
+        return {
+            'transaction_count_24h': count_24h,
+            'transaction_count_1h': count_1h,
+            'unique_addresses_24h': int(len(np.unique(day['address']))),
+            'unique_addresses_1h': int(len(np.unique(hour['address']))),
+            'volume_usd_24h': float(day_deposits.sum()) * price if price else 0,
+            'volume_usd_1h': float(hour_deposits.sum()) * price if price else 0,
+            'activity_score': self._activity_score(count_1h, count_24h, observed)
+        }
+    
     def get_liquidity_metrics(self, token_address: str) -> Dict:
         """
         Get liquidity metrics for a token (from DEX pools)
         """
         try:
-            # This would require integration with Aptos DEX protocols
-            # like PancakeSwap on Aptos, Liquidswap, etc.
-            return {
-                'total_liquidity_usd': 0,
-                'liquidity_score': 0.5,  # 0-1 scale
-                'pool_count': 0
-            }
+            metrics = self.liquidity.metrics(token_address) if self.liquidity else None
+            if metrics is None:
+                # No pools tracked (or not refreshed yet) - neutral placeholders
+                return {
+                    'total_liquidity_usd': 0,
+                    'liquidity_score': 0.5,  # 0-1 scale
+                    'pool_count': 0
+                }
+            return metrics
         except Exception as e:
             print(f"Error fetching liquidity metrics: {e}")
             return {
@@ -79,11 +162,48 @@ class AptosAnalyzer:
                 'pool_count': 0
             }
     
+    def _signal_inputs_key(self, token_symbol: str, now: float) -> tuple:
+        liquidity = self.liquidity.metrics(token_symbol) if self.liquidity else None
+        return (
+            self.rpc.observed_ledger_version,
+            self.activity.state_key(token_symbol, now),
+            (self.events.written, int(now // 60)) if self.events is not None else None,
+            (self.whales.generation, int(now // 60)) if self.whales is not None else None,
+            liquidity['ledger_version'] if liquidity else None
+        )
+    
+    def _freshness(self, token_symbol: str, computed_at: float, now: float, cached: bool) -> Dict:
+        """How old the signal and the data behind it are"""
+        last_event_at = self.activity.last_event_at.get(token_symbol.upper())
+        liquidity = self.liquidity.metrics(token_symbol) if self.liquidity else None
+        return {
+            'cached': cached,
+            'computed_at': datetime.fromtimestamp(computed_at).isoformat(),
+            'age_seconds': round(now - computed_at, 3),
+            'ledger_version': self.rpc.observed_ledger_version,
+            'last_event_age_seconds': round(now - last_event_at, 1) if last_event_at else None,
+            'liquidity_age_seconds': round(now - liquidity['updated_at'], 1) if liquidity else None,
+            'liquidity_ledger_version': liquidity['ledger_version'] if liquidity else None
+        }
+    
     def analyze_onchain_signals(self, token_symbol: str) -> Dict:
         """
         Comprehensive on-chain analysis
         Returns signals that can influence trading decisions
+        
+        Cached per token until the observed ledger version, the activity counters
+        or the liquidity snapshot advance; 'freshness' reports the signal's age.
         """
+        now = time.time()
+        key = self._signal_inputs_key(token_symbol, now)
+        cached = self._signal_cache.get(token_symbol.upper())
+        if cached is not None and cached[0] == key:
+            self.signal_cache_stats['hits'] += 1
+            result = dict(cached[1])
+            result['freshness'] = self._freshness(token_symbol, cached[2], now, True)
+            return result
+        self.signal_cache_stats['misses'] += 1
+        
         try:
             # Combine various on-chain metrics
             volume_data = self.get_transaction_volume(token_symbol)
@@ -96,14 +216,25 @@ class AptosAnalyzer:
             # Combined on-chain signal (-100 to +100)
             onchain_signal = ((activity_score + liquidity_score) / 2 - 0.5) * 200
             
-            return {
+            # Net exchange flow of large holders - a separate decision input
+            flows = self.whales.flows(token_symbol, now) if self.whales is not None else {}
+            
+            result = {
                 'onchain_signal': onchain_signal,
                 'activity_score': activity_score,
                 'liquidity_score': liquidity_score,
                 'transaction_count_24h': volume_data.get('transaction_count_24h', 0),
+                'volume_usd_24h': volume_data.get('volume_usd_24h', 0),
+                'unique_addresses_24h': volume_data.get('unique_addresses_24h', 0),
                 'total_liquidity_usd': liquidity_data.get('total_liquidity_usd', 0),
+                'whale_flow_signal': flows.get('whale_flow_signal', 0.0),
+                'large_transfers_1h': flows.get('large_transfers_1h', 0),
+                'exchange_inflow_usd_1h': flows.get('exchange_inflow_usd_1h', 0.0),
+                'exchange_outflow_usd_1h': flows.get('exchange_outflow_usd_1h', 0.0),
                 'recommendation': self._get_onchain_recommendation(onchain_signal)
             }
+            self._signal_cache[token_symbol.upper()] = (key, result, now)
+            return {**result, 'freshness': self._freshness(token_symbol, now, now, False)}
         except Exception as e:
             print(f"Error in on-chain analysis: {e}")
             return {
@@ -111,6 +242,8 @@ class AptosAnalyzer:
                 'activity_score': 0.5,
                 'liquidity_score': 0.5,
                 'transaction_count_24h': 0,
+                'volume_usd_24h': 0,
+                'unique_addresses_24h': 0,
                 'total_liquidity_usd': 0,
                 'recommendation': 'HOLD'
             }
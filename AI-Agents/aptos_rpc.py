@@ -0,0 +1,199 @@
+"""
+Async Aptos fullnode client
+One pooled aiohttp session for every lookup. Concurrent identical requests are
+coalesced, and resource lookups for the same account that arrive within a
+short batch window share one /resources call. Reads are pinned to a ledger
+version and cached under it, so repeated checks within the same ledger
+version are served from memory.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+
+class AptosRpcClient:
+    def __init__(self, base_url: str, max_connections: int = 20, timeout: float = 10.0,
+                 batch_window: float = 0.005, ledger_refresh: float = 0.5,
+                 version_tolerance: int = 0, max_cache_entries: int = 10000):
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.batch_window = batch_window  # Seconds to collect lookups before sending a batch
+        self.ledger_refresh = ledger_refresh  # Seconds between ledger version checks
+        self.version_tolerance = version_tolerance  # Serve cached reads up to this many versions old
+        self.max_cache_entries = max_cache_entries
+        # Accounts holding too many resources for one /resources page (e.g. DEX pool accounts);
+        # their resource lookups are sent individually instead of batched
+        self.unbatched_accounts = set()
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._cache: Dict[tuple, Tuple[int, Any]] = {}  # lookup key -> (ledger version, value)
+        self._inflight: Dict[tuple, asyncio.Future] = {}  # (lookup key, version) -> pending result
+        self._pending: List[Tuple[tuple, int, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._ledger_version: Optional[int] = None
+        self._ledger_checked_at = 0.0
+        self._ledger_future: Optional[asyncio.Future] = None
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'batched_lookups': 0, 'errors': 0}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _get_json(self, path: str, params: Optional[Dict] = None) -> Optional[Any]:
+        """GET a fullnode path; None for 404. Learns the ledger version from response headers."""
+        self.stats['requests'] += 1
+        async with self._get_session().get(f"{self.base_url}{path}", params=params) as response:
+            header_version = response.headers.get('X-Aptos-Ledger-Version')
+            if header_version is not None and (self._ledger_version is None or int(header_version) > self._ledger_version):
+                self._ledger_version = int(header_version)
+                self._ledger_checked_at = time.monotonic()
+            if response.status == 404:
+                return None
+            response.raise_for_status()
+            return await response.json()
+
+    @property
+    def observed_ledger_version(self) -> Optional[int]:
+        """Newest ledger version seen so far, without a request"""
+        return self._ledger_version
+
+    async def ledger_version(self) -> int:
+        """Current ledger version, re-checked at most every `ledger_refresh` seconds"""
+        if self._ledger_version is not None and time.monotonic() - self._ledger_checked_at < self.ledger_refresh:
+            return self._ledger_version
+        if self._ledger_future is not None:
+            return await asyncio.shield(self._ledger_future)
+
+        self._ledger_future = asyncio.get_running_loop().create_future()
+        try:
+            info = await self._get_json('/')
+            version = max(int(info['ledger_version']), self._ledger_version or 0)
+            self._ledger_version = version
+            self._ledger_checked_at = time.monotonic()
+            self._ledger_future.set_result(version)
+            return version
+        except Exception as e:
+            self._ledger_future.set_exception(e)
+            self._ledger_future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._ledger_future = None
+
+    async def get_transactions(self, start: int, limit: int = 100) -> List[Dict]:
+        """A page of committed transactions from `start` (not cached - the tailer reads each page once)"""
+        return await self._get_json('/transactions', {'start': str(start), 'limit': str(limit)}) or []
+
+    async def get_account(self, address: str) -> Optional[Dict]:
+        return await self._lookup(('account', address))
+
+    async def get_account_resource(self, address: str, resource_type: str,
+                                   version: Optional[int] = None) -> Optional[Dict]:
+        """One resource; pass `version` to read several resources at the same ledger version"""
+        return await self._lookup(('resource', address, resource_type), version)
+
+    async def get_account_resources(self, address: str) -> Optional[List[Dict]]:
+        return await self._lookup(('resources', address))
+
+    async def _lookup(self, key: tuple, version: Optional[int] = None) -> Optional[Any]:
+        if version is None:
+            try:
+                version = await self.ledger_version()
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Error fetching Aptos ledger version: {e}")
+                return None
+
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] >= version - self.version_tolerance:
+            self.stats['cache_hits'] += 1
+            return cached[1]
+
+        inflight = self._inflight.get((key, version))
+        if inflight is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[(key, version)] = future
+        self._pending.append((key, version, future))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+        return await asyncio.shield(future)
+
+    async def _flush_after_window(self):
+        # Lookups queued while a flush's calls are in flight go out in the next round
+        while self._pending:
+            await self._flush_once()
+
+    async def _flush_once(self):
+        await asyncio.sleep(self.batch_window)
+        pending, self._pending = self._pending, []
+
+        # Two or more resources of one account at one version -> a single /resources call
+        resource_groups: Dict[tuple, List] = {}
+        singles = []
+        for item in pending:
+            key, version, _ = item
+            if key[0] == 'resource' and key[1] not in self.unbatched_accounts:
+                resource_groups.setdefault((key[1], version), []).append(item)
+            else:
+                singles.append(item)
+        calls = []
+        for (address, version), items in resource_groups.items():
+            if len(items) > 1:
+                self.stats['batched_lookups'] += len(items)
+                calls.append(self._fetch_resource_batch(address, version, items))
+            else:
+                singles.extend(items)
+        calls.extend(self._fetch_single(*item) for item in singles)
+        await asyncio.gather(*calls)
+
+        if len(self._cache) > self.max_cache_entries:
+            self._cache.clear()  # Cheap bound; entries are only valid for one version anyway
+
+    def _resolve(self, key: tuple, version: int, future: asyncio.Future, value: Any, ok: bool):
+        if ok:
+            self._cache[key] = (version, value)
+        self._inflight.pop((key, version), None)
+        if not future.done():
+            future.set_result(value)
+
+    async def _fetch_single(self, key: tuple, version: int, future: asyncio.Future):
+        params = {'ledger_version': str(version)}
+        kind, address = key[0], key[1]
+        try:
+            if kind == 'account':
+                value = await self._get_json(f"/accounts/{address}", params)
+            elif kind == 'resources':
+                value = await self._get_json(f"/accounts/{address}/resources", params)
+            else:
+                value = await self._get_json(f"/accounts/{address}/resource/{key[2]}", params)
+            self._resolve(key, version, future, value, True)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Error fetching Aptos {kind} for {address}: {e}")
+            self._resolve(key, version, future, None, False)
+
+    async def _fetch_resource_batch(self, address: str, version: int, items: List):
+        try:
+            resources = await self._get_json(f"/accounts/{address}/resources", {'ledger_version': str(version)})
+            by_type = {resource['type']: resource for resource in resources or []}
+            self._cache[('resources', address)] = (version, resources)
+            for key, _, future in items:
+                self._resolve(key, version, future, by_type.get(key[2]), True)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Error fetching Aptos resources for {address}: {e}")
+            for key, _, future in items:
+                self._resolve(key, version, future, None, False)
@@ -0,0 +1,125 @@
+"""
+OHLCV candle aggregation from price samples
+Builds true open/high/low/close bars with a vectorized group-by over time
+buckets, from either finer-grained upstream points or recorded live ticks
+"""
+import bisect
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '5m': 300,
+    '1h': 3600,
+    '1d': 86400
+}
+
+
+def aggregate_ohlcv(timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray,
+                    interval_seconds: int, volume_mode: str = 'sum',
+                    previous_close: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    Group price samples into candles of `interval_seconds`.
+
+    Each candle opens at the previous candle's close (the price was continuous
+    across the boundary), so high/low also cover the move into the first sample.
+    volume_mode='sum' adds per-sample volumes (ticks); 'last' takes the last value
+    in the bucket (rolling 24h volumes such as CoinGecko's total_volumes).
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    if len(timestamps) == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return {name: empty for name in ('timestamp', 'open', 'high', 'low', 'close', 'volume')}
+
+    buckets = np.floor(timestamps / interval_seconds).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(prices)] - 1
+
+    close = prices[ends]
+    open_prices = np.empty_like(close)
+    open_prices[0] = prices[0] if previous_close is None else previous_close
+    open_prices[1:] = close[:-1]
+
+    high = np.maximum(np.maximum.reduceat(prices, starts), open_prices)
+    low = np.minimum(np.minimum.reduceat(prices, starts), open_prices)
+
+    if volume_mode == 'last':
+        volume = volumes[ends]
+    else:
+        volume = np.add.reduceat(volumes, starts)
+
+    return {
+        'timestamp': (buckets[starts] * interval_seconds).astype(np.float64),
+        'open': open_prices,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume
+    }
+
+
+class TickCandleAggregator:
+    """
+    Records live ticks per token and serves candles at several intervals.
+    Completed candles are cached per interval boundary; between boundaries only
+    the still-forming candle is recomputed from the ticks since the boundary.
+    """
+
+    def __init__(self, max_age_seconds: float = 2 * 86400, max_ticks: int = 500000):
+        self.max_age_seconds = max_age_seconds
+        self.max_ticks = max_ticks
+        self._ticks: Dict[str, Dict[str, list]] = {}  # token -> {'timestamp': [...], 'price': [...], 'volume': [...]}
+        self._completed: Dict[tuple, tuple] = {}  # (token, interval) -> (boundary, columns)
+
+    def record_tick(self, token: str, price: float, volume: float = 0.0,
+                    timestamp: Optional[float] = None):
+        """Append a tick (timestamps are expected to be non-decreasing per token)"""
+        if not price or price <= 0:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        ticks = self._ticks.setdefault(token, {'timestamp': [], 'price': [], 'volume': []})
+        if ticks['timestamp'] and timestamp < ticks['timestamp'][-1]:
+            return  # Out-of-order tick
+        ticks['timestamp'].append(timestamp)
+        ticks['price'].append(price)
+        ticks['volume'].append(volume)
+
+        # Trim in chunks so the cost is amortized over many ticks
+        if len(ticks['timestamp']) > self.max_ticks or timestamp - ticks['timestamp'][0] > self.max_age_seconds * 1.5:
+            cutoff = bisect.bisect_left(ticks['timestamp'], timestamp - self.max_age_seconds)
+            cutoff = max(cutoff, len(ticks['timestamp']) - self.max_ticks)
+            for values in ticks.values():
+                del values[:cutoff]
+
+    def get_candles(self, token: str, interval: str) -> Dict[str, np.ndarray]:
+        """Candles for a token at '1m', '5m', '1h' or '1d', including the forming candle"""
+        interval_seconds = INTERVAL_SECONDS[interval]
+        ticks = self._ticks.get(token)
+        if not ticks or not ticks['timestamp']:
+            return aggregate_ohlcv([], [], [], interval_seconds)
+
+        timestamps = ticks['timestamp']
+        boundary = np.floor(timestamps[-1] / interval_seconds) * interval_seconds
+        split = bisect.bisect_left(timestamps, boundary)
+
+        key = (token, interval)
+        cached = self._completed.get(key)
+        if cached and cached[0] == boundary:
+            completed = cached[1]
+        else:
+            completed = aggregate_ohlcv(
+                timestamps[:split], ticks['price'][:split], ticks['volume'][:split], interval_seconds
+            )
+            self._completed[key] = (boundary, completed)
+
+        previous_close = completed['close'][-1] if len(completed['close']) else None
+        forming = aggregate_ohlcv(
+            timestamps[split:], ticks['price'][split:], ticks['volume'][split:],
+            interval_seconds, previous_close=previous_close
+        )
+        return {name: np.concatenate([completed[name], forming[name]]) for name in completed}
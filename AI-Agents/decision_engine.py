@@ -2,7 +2,7 @@
 Decision engine that combines market data, sentiment, and on-chain signals
 to generate trading recommendations for perpetual DEX
 """
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 import json
 
 
@@ -13,11 +13,14 @@ class DecisionEngine:
             'sentiment': 0.35,      # AI sentiment analysis
             'market_momentum': 0.30, # Price movements and volume
             'onchain': 0.20,        # On-chain activity
+            'whale_flow': 0.10,     # Net large-holder flow out of (+) / into (-) exchanges
             'risk': 0.15            # Risk assessment
         }
+        # Daily volatility at which the risk-label leverage table applies unchanged
+        self.reference_daily_volatility = 0.04
     
     def calculate_signal(self, market_data: Dict, sentiment_data: Dict, 
-                        onchain_data: Dict) -> Dict:
+                        onchain_data: Dict, daily_volatility: Optional[float] = None) -> Dict:
         """
         Calculate final trading signal by combining all inputs
         """
@@ -40,6 +43,7 @@ class DecisionEngine:
         
         # On-chain signal
         onchain_signal = onchain_data.get('onchain_signal', 0)
+        whale_flow_signal = onchain_data.get('whale_flow_signal', 0)  # 0 when no flows are detected
         
         # Risk adjustment
         risk_multiplier = {
@@ -52,9 +56,10 @@ class DecisionEngine:
         sentiment_component = (sentiment_score * 0.6 + short_term_sentiment * 0.4) * self.weights['sentiment']
         momentum_component = market_momentum * self.weights['market_momentum']
         onchain_component = onchain_signal * self.weights['onchain']
+        whale_component = whale_flow_signal * self.weights['whale_flow']
         
         # Combine all signals
-        final_score = (sentiment_component + momentum_component + onchain_component) * risk_multiplier
+        final_score = (sentiment_component + momentum_component + onchain_component + whale_component) * risk_multiplier
         
         # Determine recommendation (lowered thresholds for more sensitivity)
         # LONG: score > 15 (was 25)
@@ -70,7 +75,7 @@ class DecisionEngine:
             confidence = 1.0 - (abs(final_score) / 15)  # Adjusted for new threshold
         
         # Calculate position sizing suggestion (for perp DEX)
-        leverage_suggestion = self._suggest_leverage(confidence, risk_level)
+        leverage_suggestion = self._suggest_leverage(confidence, risk_level, daily_volatility)
         
         return {
             'recommendation': recommendation,
@@ -80,6 +85,7 @@ class DecisionEngine:
                 'sentiment_score': round(sentiment_score, 2),
                 'market_momentum': round(market_momentum, 2),
                 'onchain_signal': round(onchain_signal, 2),
+                'whale_flow_signal': round(whale_flow_signal, 2),
                 'risk_level': risk_level
             },
             'leverage_suggestion': leverage_suggestion,
@@ -87,10 +93,12 @@ class DecisionEngine:
                                                  sentiment_data, market_data, onchain_data)
         }
     
-    def _suggest_leverage(self, confidence: float, risk_level: str) -> Dict:
+    def _suggest_leverage(self, confidence: float, risk_level: str,
+                          daily_volatility: Optional[float] = None) -> Dict:
         """
         Suggest appropriate leverage based on confidence and risk
         For perp DEX, leverage typically ranges from 1x to 100x+
+        Base leverage is scaled inversely with realized volatility when known
         """
         base_leverage = {
             'Low': 10,
@@ -98,6 +106,11 @@ class DecisionEngine:
             'High': 2
         }.get(risk_level, 5)
         
+        if daily_volatility and daily_volatility > 0:
+            # Calm regime -> more leverage, volatile regime -> less
+            volatility_ratio = self.reference_daily_volatility / daily_volatility
+            base_leverage = int(min(max(base_leverage * volatility_ratio, 1), 10))
+        
         # Adjust based on confidence
         if confidence > 0.8:
             suggested_leverage = min(base_leverage * 2, 20)
@@ -106,11 +119,14 @@ class DecisionEngine:
         else:
             suggested_leverage = max(base_leverage // 2, 1)
         
-        return {
+        suggestion = {
             'suggested_leverage': suggested_leverage,
             'max_safe_leverage': base_leverage * 2,
             'warning': 'High leverage increases risk. Only use what you can afford to lose.'
         }
+        if daily_volatility:
+            suggestion['daily_volatility_pct'] = round(daily_volatility * 100, 4)
+        return suggestion
     
     def _generate_reasoning(self, recommendation: str, score: float,
                            sentiment_data: Dict, market_data: Dict, 
@@ -127,6 +143,10 @@ class DecisionEngine:
         if factors:
             reasoning_parts.append(f"Key factors: {', '.join(factors[:3])}")
         
+        if onchain_data.get('whale_flow_signal'):
+            direction = "out of" if onchain_data['whale_flow_signal'] > 0 else "into"
+            reasoning_parts.append(f"Large holders moving {direction} exchanges ({onchain_data['whale_flow_signal']:+.0f})")
+        
         risk = sentiment_data.get('risk_level', 'Medium')
         reasoning_parts.append(f"Risk level: {risk}")
         
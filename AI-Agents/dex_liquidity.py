@@ -0,0 +1,224 @@
+"""
+Aptos DEX liquidity tracking
+Pools for the tracked assets are discovered once (by probing the pool resource
+types each DEX would store for the asset paired with common quote assets) and
+the registry is cached on disk. Reserves are refreshed on a schedule, reading
+every pool at one ledger version concurrently over the pooled RPC client, into
+per-token aggregates that AptosAnalyzer.get_liquidity_metrics reads without
+touching the network.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aptos_rpc import AptosRpcClient
+
+
+APT = '0x1::aptos_coin::AptosCoin'
+LZ_USDC = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC'
+LZ_USDT = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDT'
+QUOTE_ASSETS = [APT, LZ_USDC, LZ_USDT]
+
+LIQUIDSWAP = '0x190d44266241744264b964a37b8f09863167a12d3e70cda39376cfb4e3561e12'
+PANCAKESWAP = '0xc7efb4076dbe143cbcd98cfaaa929ecfc8f299203dfff63b95ccbfe21ce6b1a2'
+
+# Where each DEX stores its pools, the pool resource type, and the reserve fields
+DEX_LAYOUTS = {
+    'liquidswap': {
+        'account': '0x05a97986a9d031c4567e15b797be516910cfcb4156312482efc6a19c0a30c948',
+        'pool_type': LIQUIDSWAP + '::liquidity_pool::LiquidityPool<{x}, {y}, {curve}>',
+        'curves': [LIQUIDSWAP + '::curves::Uncorrelated', LIQUIDSWAP + '::curves::Stable'],
+        'reserves': ('coin_x_reserve.value', 'coin_y_reserve.value')
+    },
+    'pancakeswap': {
+        'account': PANCAKESWAP,
+        'pool_type': PANCAKESWAP + '::swap::TokenPairReserve<{x}, {y}>',
+        'curves': [None],
+        'reserves': ('reserve_x', 'reserve_y')
+    }
+}
+
+
+def _field(data: Dict, path: str) -> int:
+    for part in path.split('.'):
+        data = data[part]
+    return int(data)
+
+
+def liquidity_score(total_liquidity_usd: float) -> float:
+    """0-1 on a log scale: $10k or less -> 0, $10M -> 0.6, $1B or more -> 1"""
+    if total_liquidity_usd <= 0:
+        return 0.0
+    return min(max((math.log10(total_liquidity_usd) - 4) / 5, 0.0), 1.0)
+
+
+class DexLiquidityTracker:
+    def __init__(self, rpc: AptosRpcClient, assets: Dict[str, Tuple[str, int]],
+                 price_lookup: Optional[Callable[[str], Optional[float]]] = None,
+                 refresh_interval: float = 60.0, registry_path: str = 'data/dex_pools.json',
+                 rediscover_interval: float = 86400.0, layouts: Optional[Dict] = None):
+        self.rpc = rpc
+        self.assets = assets  # Asset type -> (symbol, decimals)
+        self.price_lookup = price_lookup  # TOKEN -> USD price (None leaves USD liquidity at 0)
+        self.refresh_interval = refresh_interval
+        self.registry_path = registry_path
+        self.rediscover_interval = rediscover_interval
+        self.layouts = layouts or DEX_LAYOUTS
+        for layout in self.layouts.values():
+            self.rpc.unbatched_accounts.add(layout['account'])
+
+        self.pools: List[Dict] = []  # {'dex', 'account', 'type', 'x', 'y'}
+        self._discovered_at: Optional[float] = None
+        self._metrics: Dict[str, Dict] = {}  # TOKEN -> cached aggregates
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'refreshes': 0, 'errors': 0, 'last_refresh_ms': None, 'ledger_version': None}
+        self.load_registry()
+
+    def load_registry(self) -> bool:
+        try:
+            with open(self.registry_path) as f:
+                data = json.load(f)
+            if set(data.get('assets', [])) != set(self.assets):
+                return False  # Tracked assets changed - rediscover
+            self.pools = data['pools']
+            self._discovered_at = data['discovered_at']
+            print(f"[DEX Liquidity] Loaded {len(self.pools)} pools from {self.registry_path}")
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def _candidate_pools(self) -> List[Dict]:
+        candidates = []
+        for asset in self.assets:
+            for quote in QUOTE_ASSETS:
+                if quote == asset:
+                    continue
+                # Pair order inside the type depends on each DEX's sorting rule - probe both
+                for x, y in ((asset, quote), (quote, asset)):
+                    for dex, layout in self.layouts.items():
+                        for curve in layout['curves']:
+                            candidates.append({
+                                'dex': dex,
+                                'account': layout['account'],
+                                'type': layout['pool_type'].format(x=x, y=y, curve=curve),
+                                'x': x,
+                                'y': y
+                            })
+        unique = {(pool['account'], pool['type']): pool for pool in candidates}
+        return list(unique.values())
+
+    async def discover(self):
+        """Probe candidate pool types once and keep the ones that exist"""
+        candidates = self._candidate_pools()
+        errors = self.rpc.stats['errors']
+        resources = await asyncio.gather(*[
+            self.rpc.get_account_resource(pool['account'], pool['type']) for pool in candidates
+        ])
+        if self.rpc.stats['errors'] > errors:
+            raise RuntimeError("pool probes failed - a missing pool and a failed read look the same")
+        self.pools = [pool for pool, resource in zip(candidates, resources) if resource is not None]
+        self._discovered_at = time.time()
+
+        directory = os.path.dirname(self.registry_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.registry_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'discovered_at': self._discovered_at, 'assets': sorted(self.assets), 'pools': self.pools}, f)
+        os.replace(tmp_path, self.registry_path)
+        print(f"[DEX Liquidity] Discovered {len(self.pools)} pools out of {len(candidates)} candidates")
+
+    async def refresh(self):
+        """Read every registered pool's reserves at one ledger version and rebuild the aggregates"""
+        started = time.perf_counter()
+        version = await self.rpc.ledger_version()
+        resources = await asyncio.gather(*[
+            self.rpc.get_account_resource(pool['account'], pool['type'], version) for pool in self.pools
+        ])
+
+        metrics = {}
+        for pool, resource in zip(self.pools, resources):
+            if resource is None:
+                continue
+            x_field, y_field = self.layouts[pool['dex']]['reserves']
+            data = resource.get('data', {})
+            for asset, field in ((pool['x'], x_field), (pool['y'], y_field)):
+                if asset not in self.assets:
+                    continue
+                symbol, decimals = self.assets[asset]
+                entry = metrics.setdefault(symbol, {'reserve': 0.0, 'pool_count': 0, 'dexes': set()})
+                entry['reserve'] += _field(data, field) / 10 ** decimals
+                entry['pool_count'] += 1
+                entry['dexes'].add(pool['dex'])
+
+        now = time.time()
+        for symbol, entry in metrics.items():
+            price = self.price_lookup(symbol) if self.price_lookup else None
+            # Constant-product pools hold equal value on both sides: pool TVL ~ 2x the token side
+            total_usd = 2 * entry['reserve'] * price if price else 0.0
+            self._metrics[symbol] = {
+                'total_liquidity_usd': total_usd,
+                'liquidity_score': liquidity_score(total_usd) if price else 0.5,
+                'pool_count': entry['pool_count'],
+                'token_reserve': entry['reserve'],
+                'dexes': sorted(entry['dexes']),
+                'ledger_version': version,
+                'updated_at': now
+            }
+        self.stats['refreshes'] += 1
+        self.stats['ledger_version'] = version
+        self.stats['last_refresh_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    def metrics(self, token: str) -> Optional[Dict]:
+        """Cached aggregates for a token, or None before the first refresh that saw its pools"""
+        entry = self._metrics.get(token.upper())
+        return dict(entry) if entry else None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                if self._discovered_at is None or time.time() - self._discovered_at >= self.rediscover_interval:
+                    await self.discover()
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"⚠️  [DEX Liquidity] Refresh failed: {type(e).__name__}: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def snapshot(self) -> dict:
+        return {
+            'pools': len(self.pools),
+            'discovered_at': self._discovered_at,
+            'tokens': {symbol: dict(entry) for symbol, entry in self._metrics.items()},
+            **self.stats
+        }
+
+
+def create_liquidity_tracker(rpc: AptosRpcClient, assets: Dict[str, Tuple[str, int]],
+                             price_lookup: Optional[Callable[[str], Optional[float]]] = None) -> Optional[DexLiquidityTracker]:
+    """DexLiquidityTracker refreshing every DEX_LIQUIDITY_REFRESH_SECONDS, or None when that is unset / 0"""
+    refresh_interval = float(os.getenv('DEX_LIQUIDITY_REFRESH_SECONDS', '0'))
+    if refresh_interval <= 0:
+        return None
+    return DexLiquidityTracker(
+        rpc, assets, price_lookup, refresh_interval,
+        registry_path=os.getenv('DEX_POOL_REGISTRY_PATH', 'data/dex_pools.json')
+    )
@@ -0,0 +1,76 @@
+"""
+Shape-preserving downsampling for chart series
+- minmax: merges adjacent candles into buckets (open first, close last, high max,
+  low min), so every extreme survives
+- lttb: Largest-Triangle-Three-Buckets point selection on the close series
+"""
+from typing import Dict
+
+import numpy as np
+
+
+DOWNSAMPLING_METHODS = ('minmax', 'lttb')
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the points LTTB keeps (first and last are always kept)"""
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket boundaries for the n - 2 interior points
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+
+    # Bucket averages, used as the third triangle vertex for the previous bucket
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.r_[sums_x / counts, x[-1]]
+    avg_y = np.r_[sums_y / counts, y[-1]]
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        cx, cy = avg_x[bucket + 1], avg_y[bucket + 1]
+        # Twice the triangle area for every candidate in the bucket at once
+        areas = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        previous = lo + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_ohlcv(columns: Dict[str, np.ndarray], max_points: int,
+                     method: str = 'minmax', volume_mode: str = 'last') -> Dict[str, np.ndarray]:
+    """
+    Reduce OHLCV columns to at most `max_points` rows.
+    volume_mode follows candles.aggregate_ohlcv ('last' for rolling 24h volumes, 'sum' for ticks).
+    """
+    n = len(columns['timestamp'])
+    if max_points <= 0 or n <= max_points:
+        return columns
+
+    if method == 'lttb':
+        indices = lttb_indices(columns['timestamp'], columns['close'], max_points)
+        return {name: values[indices] for name, values in columns.items()}
+
+    starts = np.linspace(0, n, max_points, endpoint=False).astype(np.int64)
+    ends = np.r_[starts[1:], n] - 1
+    if volume_mode == 'sum':
+        volume = np.add.reduceat(columns['volume'], starts)
+    else:
+        volume = columns['volume'][ends]
+
+    return {
+        'timestamp': columns['timestamp'][starts],
+        'open': columns['open'][starts],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': columns['close'][ends],
+        'volume': volume
+    }
@@ -0,0 +1,104 @@
+"""
+Memory-mapped ring buffer of on-chain transfer events
+Fixed-width 40-byte records in a file-backed ring, so the last N events survive
+restarts and window analytics are a vectorized scan over at most two
+contiguous slices instead of RPC calls. Records are appended in transaction
+version order, so timestamps within each slice are sorted.
+"""
+import os
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+
+EVENT_DTYPE = np.dtype([
+    ('version', '<u8'),       # Transaction version
+    ('timestamp', '<f8'),     # Unix seconds
+    ('amount', '<f8'),        # Token units (decimals applied)
+    ('address', '<u8'),       # hash64 of the account address
+    ('token', '<u4'),         # token_id(symbol)
+    ('kind', '<u2'),          # EVENT_WITHDRAW / EVENT_DEPOSIT
+    ('reserved', '<u2')
+])
+EVENT_WITHDRAW = 0
+EVENT_DEPOSIT = 1
+
+MAGIC = int.from_bytes(b'SXRING01', 'little')
+HEADER_BYTES = 64  # magic, capacity, record size, records written (u8 each), rest reserved
+
+
+def token_id(symbol: str) -> int:
+    return zlib.crc32(symbol.upper().encode())
+
+
+class EventRingBuffer:
+    def __init__(self, path: str, capacity: int = 1_000_000):
+        self.path = path
+        self.capacity = capacity
+        size = HEADER_BYTES + capacity * EVENT_DTYPE.itemsize
+        reuse = os.path.exists(path) and os.path.getsize(path) == size
+        if not reuse:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._map = np.memmap(path, dtype=np.uint8, mode='r+' if reuse else 'w+', shape=(size,))
+        self._header = self._map[:HEADER_BYTES].view('<u8')
+        self._records = self._map[HEADER_BYTES:].view(EVENT_DTYPE)
+        if not reuse or self._header[0] != MAGIC or self._header[1] != capacity \
+                or self._header[2] != EVENT_DTYPE.itemsize:
+            self._header[:] = 0
+            self._header[0] = MAGIC
+            self._header[1] = capacity
+            self._header[2] = EVENT_DTYPE.itemsize
+        elif self.written:
+            print(f"[Event Ring] Reopened {path} with {len(self)} events up to version {self.last_version}")
+
+    @property
+    def written(self) -> int:
+        """Records appended since the file was created (the write position is written % capacity)"""
+        return int(self._header[3])
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    @property
+    def last_version(self) -> Optional[int]:
+        if not self.written:
+            return None
+        return int(self._records[(self.written - 1) % self.capacity]['version'])
+
+    def append(self, records: np.ndarray):
+        """Append records (EVENT_DTYPE, in version order); the oldest are overwritten when full"""
+        records = records[-self.capacity:]
+        start = self.written % self.capacity
+        first = min(len(records), self.capacity - start)
+        self._records[start:start + first] = records[:first]
+        self._records[:len(records) - first] = records[first:]
+        self._header[3] = self.written + len(records)  # Publish after the records are in place
+
+    def flush(self):
+        self._map.flush()
+
+    def segments(self) -> List[np.ndarray]:
+        """The stored records as up to two views, oldest first (no copies)"""
+        written = self.written
+        if written <= self.capacity:
+            return [self._records[:written]]
+        start = written % self.capacity
+        return [self._records[start:], self._records[:start]]
+
+    def window(self, since: float, token: Optional[str] = None) -> np.ndarray:
+        """Records with timestamp >= since (optionally for one token), oldest first"""
+        parts = []
+        for segment in self.segments():
+            index = int(np.searchsorted(segment['timestamp'], since, side='left'))
+            part = segment[index:]
+            if token is not None:
+                part = part[part['token'] == token_id(token)]
+            parts.append(part)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=EVENT_DTYPE)
+
+    def oldest_timestamp(self) -> Optional[float]:
+        segments = [segment for segment in self.segments() if len(segment)]
+        return float(segments[0]['timestamp'][0]) if segments else None
@@ -0,0 +1,141 @@
+"""
+Persistent CoinGecko symbol -> coin id index
+Loaded once from disk and refreshed from the full coin list in the background,
+so resolving a symbol is an in-memory dict lookup instead of a /search call
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+from rate_limiter import get_budget, retry_after_seconds, Priority
+
+
+COINGECKO_API = "https://api.coingecko.com/api/v3"
+
+# Symbols are not unique on CoinGecko - these always win
+DEFAULT_OVERRIDES = {
+    'BTC': 'bitcoin',
+    'ETH': 'ethereum',
+    'APT': 'aptos',
+    'DOGE': 'dogecoin',
+    'SOL': 'solana',
+    'BNB': 'binancecoin',
+    'ADA': 'cardano',
+    'XRP': 'ripple',
+    'MATIC': 'matic-network',
+    'DOT': 'polkadot',
+    'AVAX': 'avalanche-2',
+    'LINK': 'chainlink',
+    'UNI': 'uniswap',
+    'ATOM': 'cosmos',
+    'LTC': 'litecoin',
+}
+
+
+class CoinGeckoIdIndex:
+    def __init__(self, path: str = 'data/coingecko_ids.json', refresh_interval: float = 86400.0,
+                 ranked_pages: int = 4, overrides: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.ranked_pages = ranked_pages  # Pages of 250 coins by market cap used to break symbol ties
+        self.overrides = dict(DEFAULT_OVERRIDES if overrides is None else overrides)
+        self._ids: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self.load()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def lookup(self, symbol: str) -> Optional[str]:
+        """CoinGecko id for a symbol, or None if the index doesn't know it"""
+        symbol = symbol.upper()
+        return self.overrides.get(symbol) or self._ids.get(symbol)
+
+    def load(self) -> bool:
+        """Load the index from disk; returns False if there is no usable file"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self._ids = data['ids']
+            self._loaded_at = data.get('updated_at', os.path.getmtime(self.path))
+            print(f"[CoinGecko Index] Loaded {len(self._ids)} symbols from {self.path}")
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def refresh(self) -> bool:
+        """Rebuild the index from /coins/list, preferring higher market cap on symbol clashes"""
+        budget = get_budget('coingecko')
+        try:
+            budget.acquire(Priority.BACKGROUND)
+            response = requests.get(f"{COINGECKO_API}/coins/list", timeout=30)
+            if response.status_code == 429:
+                budget.penalize(retry_after_seconds(response.headers))
+            response.raise_for_status()
+            coins = response.json()
+
+            rank = {}
+            for page in range(1, self.ranked_pages + 1):
+                budget.acquire(Priority.BACKGROUND)
+                markets = requests.get(
+                    f"{COINGECKO_API}/coins/markets",
+                    params={'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': 250, 'page': page},
+                    timeout=30
+                )
+                if not markets.ok:
+                    if markets.status_code == 429:
+                        budget.penalize(retry_after_seconds(markets.headers))
+                    break
+                for coin in markets.json():
+                    rank.setdefault(coin['id'], len(rank))
+
+            ids = {}
+            for coin in coins:
+                symbol = coin.get('symbol', '').upper()
+                coin_id = coin.get('id')
+                if not symbol or not coin_id:
+                    continue
+                current = ids.get(symbol)
+                if current is None or rank.get(coin_id, len(rank)) < rank.get(current, len(rank)):
+                    ids[symbol] = coin_id
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            now = time.time()
+            with open(tmp_path, 'w') as f:
+                json.dump({'updated_at': now, 'ids': ids}, f)
+            os.replace(tmp_path, self.path)
+
+            self._ids = ids  # Swap in one assignment - readers never see a partial index
+            self._loaded_at = now
+            print(f"[CoinGecko Index] Refreshed {len(ids)} symbols")
+            return True
+        except Exception as e:
+            print(f"[CoinGecko Index] Refresh failed: {e}")
+            return False
+
+    def start_background_refresh(self):
+        """Refresh now if the index is missing or stale, then periodically in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def run():
+            while True:
+                age = time.time() - self._loaded_at if self._loaded_at else None
+                if age is None or age >= self.refresh_interval:
+                    if not self.refresh():
+                        time.sleep(300)  # Retry sooner after a failure
+                        continue
+                    age = 0
+                time.sleep(max(self.refresh_interval - age, 60))
+
+        self._thread = threading.Thread(target=run, name="coingecko-index-refresh", daemon=True)
+        self._thread.start()
@@ -0,0 +1,126 @@
+"""
+HyperLogLog unique counting
+Approximate distinct counts in fixed memory (2^p one-byte registers, about
+1.6% standard error at p=12). SlidingHyperLogLog keeps one sketch per time
+bucket so counts over the last hour or day can be taken by merging the
+buckets in range. Sketches merge register-wise, so partial counts from
+several workers combine exactly as if one worker had seen every address.
+"""
+import hashlib
+import math
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+def hash64(value: str) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process, so it can't be merged across workers)"""
+    return int.from_bytes(hashlib.blake2b(value.lower().encode(), digest_size=8).digest(), 'big')
+
+
+def estimate_cardinality(registers: np.ndarray) -> float:
+    """HyperLogLog estimate with linear counting for small cardinalities"""
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -registers.astype(np.int32))))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        return m * math.log(m / zeros)
+    return estimate
+
+
+def register_update(value: str, p: int):
+    """(register index, rank) for a value"""
+    hashed = hash64(value)
+    index = hashed >> (64 - p)
+    remainder = hashed & ((1 << (64 - p)) - 1)
+    rank = (64 - p) - remainder.bit_length() + 1  # Leading zeros of the remaining bits, plus one
+    return index, rank
+
+
+class HyperLogLog:
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add(self, value: str):
+        index, rank = register_update(value, self.p)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge sketches with p={self.p} and p={other.p}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> float:
+        return estimate_cardinality(self.registers)
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.p]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        sketch = cls(data[0])
+        sketch.registers[:] = np.frombuffer(data[1:], dtype=np.uint8)
+        return sketch
+
+
+class SlidingHyperLogLog:
+    """One sketch per `bucket_seconds`, kept for `window_seconds`; memory is buckets x 2^p bytes"""
+
+    def __init__(self, window_seconds: int = 86400, bucket_seconds: int = 300, p: int = 12):
+        self.p = p
+        self.bucket_seconds = bucket_seconds
+        self.size = window_seconds // bucket_seconds
+        self._registers = np.zeros((self.size, 1 << p), dtype=np.uint8)
+        self._bucket_ids = np.full(self.size, -1, dtype=np.int64)  # Time bucket held by each ring slot
+
+    def _slot(self, bucket: int) -> int:
+        slot = bucket % self.size
+        if self._bucket_ids[slot] != bucket:
+            if self._bucket_ids[slot] > bucket:
+                return -1  # Slot already holds a newer bucket: the event fell out of the window
+            self._registers[slot] = 0
+            self._bucket_ids[slot] = bucket
+        return slot
+
+    def add(self, value: str, timestamp: Optional[float] = None) -> bool:
+        """Count a value; returns False if it is older than the window"""
+        slot = self._slot(int((time.time() if timestamp is None else timestamp) // self.bucket_seconds))
+        if slot < 0:
+            return False
+        index, rank = register_update(value, self.p)
+        if rank > self._registers[slot, index]:
+            self._registers[slot, index] = rank
+        return True
+
+    def window_sketch(self, seconds: int, now: Optional[float] = None) -> HyperLogLog:
+        """Merged sketch of the buckets in the last `seconds` (at bucket granularity)"""
+        head = int((time.time() if now is None else now) // self.bucket_seconds)
+        buckets = max(1, min(seconds // self.bucket_seconds, self.size))
+        in_window = (self._bucket_ids > head - buckets) & (self._bucket_ids <= head)
+        sketch = HyperLogLog(self.p)
+        if in_window.any():
+            sketch.registers[:] = self._registers[in_window].max(axis=0)
+        return sketch
+
+    def count(self, seconds: int, now: Optional[float] = None) -> float:
+        return self.window_sketch(seconds, now).count()
+
+    def merge(self, other: 'SlidingHyperLogLog'):
+        """Fold in another worker's window (same bucket size, window and p)"""
+        if (other.p, other.bucket_seconds, other.size) != (self.p, self.bucket_seconds, self.size):
+            raise ValueError("Cannot merge sliding sketches with different shapes")
+        for slot in range(self.size):
+            bucket = int(other._bucket_ids[slot])
+            if bucket < 0:
+                continue
+            own = self._slot(bucket)
+            if own >= 0:
+                np.maximum(self._registers[own], other._registers[slot], out=self._registers[own])
@@ -0,0 +1,190 @@
+"""
+Aptos indexer ingestion
+Pages token transfer activity out of the indexer GraphQL API with a
+(transaction_version, event_index) cursor and feeds it into the rolling
+on-chain activity counters and unique-address sketches. On first start it backfills the last 24h, then
+polls for new activity. See indexer_server.py for a local stand-in indexer.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from onchain_activity import OnchainActivityStore
+
+
+# Asset type -> (symbol, decimals); extend with APTOS_INDEXER_ASSETS=SYMBOL=ASSET_TYPE[@DECIMALS],...
+DEFAULT_ASSETS = {
+    '0x1::aptos_coin::AptosCoin': ('APT', 8)
+}
+
+ACTIVITY_QUERY = """
+query TransferActivity($version: bigint!, $event_index: bigint!, $since: timestamp!, $assets: [String!]!, $limit: Int!) {
+  fungible_asset_activities(
+    where: {
+      asset_type: {_in: $assets},
+      is_transaction_success: {_eq: true},
+      transaction_timestamp: {_gte: $since},
+      _or: [
+        {transaction_version: {_gt: $version}},
+        {transaction_version: {_eq: $version}, event_index: {_gt: $event_index}}
+      ]
+    }
+    order_by: [{transaction_version: asc}, {event_index: asc}]
+    limit: $limit
+  ) {
+    transaction_version
+    event_index
+    asset_type
+    type
+    amount
+    owner_address
+    transaction_timestamp
+  }
+}
+"""
+
+
+def parse_assets(spec: Optional[str]) -> Dict[str, Tuple[str, int]]:
+    """DEFAULT_ASSETS plus 'SYMBOL=ASSET_TYPE[@DECIMALS]' entries from a comma-separated string"""
+    assets = dict(DEFAULT_ASSETS)
+    for item in (spec or '').split(','):
+        symbol, _, asset = item.strip().partition('=')
+        if not symbol or not asset:
+            continue
+        asset_type, _, decimals = asset.partition('@')
+        assets[asset_type] = (symbol.upper(), int(decimals) if decimals else 8)
+    return assets
+
+
+def parse_indexer_timestamp(value: str) -> float:
+    """Indexer timestamps are UTC without an offset, e.g. 2024-05-01T12:00:00.123456"""
+    parsed = datetime.fromisoformat(value.replace('Z', ''))
+    return parsed.replace(tzinfo=timezone.utc).timestamp()
+
+
+class IndexerIngestor:
+    def __init__(self, url: str, store: OnchainActivityStore, assets: Optional[Dict[str, Tuple[str, int]]] = None,
+                 price_lookup: Optional[Callable[[str], Optional[float]]] = None,
+                 page_size: int = 500, poll_interval: float = 2.0, backfill_seconds: int = 86400,
+                 timeout: float = 15.0, max_retry_delay: float = 60.0):
+        self.url = url
+        self.store = store
+        self.assets = assets or dict(DEFAULT_ASSETS)
+        self.price_lookup = price_lookup  # TOKEN -> USD price at ingest time (None skips USD volume)
+        self.page_size = page_size
+        self.poll_interval = poll_interval
+        self.backfill_seconds = backfill_seconds
+        self.timeout = timeout
+        self.max_retry_delay = max_retry_delay
+        self.cursor: Tuple[int, int] = (-1, -1)  # (transaction_version, event_index) of the last ingested activity
+        self._last_counted_version: Dict[str, int] = {}  # TOKEN -> version last counted as a transaction
+        self._listeners: List[Callable] = []
+        self._since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'pages': 0, 'activities': 0, 'transactions': 0, 'errors': 0, 'lag_seconds': None}
+
+    def add_activity_listener(self, callback: Callable):
+        """callback(token, activity, timestamp) for every ingested activity"""
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def fetch_page(self, session: aiohttp.ClientSession) -> List[Dict]:
+        variables = {
+            'version': self.cursor[0],
+            'event_index': self.cursor[1],
+            'since': datetime.fromtimestamp(self._since, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S'),
+            'assets': sorted(self.assets),
+            'limit': self.page_size
+        }
+        async with session.post(self.url, json={'query': ACTIVITY_QUERY, 'variables': variables}) as response:
+            response.raise_for_status()
+            payload = await response.json()
+        if payload.get('errors'):
+            raise RuntimeError(payload['errors'][0].get('message', 'GraphQL error'))
+        return payload['data']['fungible_asset_activities']
+
+    def ingest(self, activities: List[Dict]):
+        """Count a page of activities and move the cursor past it"""
+        for activity in activities:
+            self.cursor = (int(activity['transaction_version']), int(activity['event_index']))
+            symbol, decimals = self.assets.get(activity['asset_type'], (None, 0))
+            if symbol is None:
+                continue
+            timestamp = parse_indexer_timestamp(activity['transaction_timestamp'])
+            self.stats['activities'] += 1
+            if activity.get('owner_address'):
+                self.store.record_address(symbol, activity['owner_address'], timestamp)
+            for callback in self._listeners:
+                callback(symbol, activity, timestamp)
+
+            # A transfer is a withdraw plus a deposit: volume from deposits, one count per transaction
+            if 'Deposit' not in activity.get('type', ''):
+                continue
+            price = self.price_lookup(symbol) if self.price_lookup else None
+            volume_usd = int(activity['amount']) / 10 ** decimals * price if price else 0.0
+            version = self.cursor[0]
+            new_transaction = self._last_counted_version.get(symbol) != version
+            self._last_counted_version[symbol] = version
+            self.store.record(symbol, timestamp, volume_usd, 1 if new_transaction else 0)
+            if new_transaction:
+                self.stats['transactions'] += 1
+            self.stats['lag_seconds'] = round(time.time() - timestamp, 1)
+
+    async def _run(self):
+        self._since = time.time() - self.backfill_seconds
+        delay = self.poll_interval
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            print(f"[Indexer] Ingesting {', '.join(symbol for symbol, _ in self.assets.values())} from {self.url}")
+            while True:
+                try:
+                    activities = await self.fetch_page(session)
+                    self.stats['pages'] += 1
+                    self.ingest(activities)
+                    delay = self.poll_interval
+                    if len(activities) == self.page_size:
+                        continue  # Still catching up
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    print(f"⚠️  [Indexer] {type(e).__name__}: {e} - retrying in {delay:.0f}s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_retry_delay)
+                    continue
+                await asyncio.sleep(self.poll_interval)
+
+    def snapshot(self) -> dict:
+        return {
+            'url': self.url,
+            'assets': {asset_type: symbol for asset_type, (symbol, _) in self.assets.items()},
+            'cursor': {'transaction_version': self.cursor[0], 'event_index': self.cursor[1]},
+            **self.stats
+        }
+
+
+def create_indexer_ingestor(store: OnchainActivityStore,
+                            price_lookup: Optional[Callable[[str], Optional[float]]] = None) -> Optional[IndexerIngestor]:
+    """IndexerIngestor from APTOS_INDEXER_URL / APTOS_INDEXER_ASSETS, or None when no indexer is configured"""
+    url = os.getenv('APTOS_INDEXER_URL')
+    if not url:
+        return None
+    return IndexerIngestor(
+        url, store, parse_assets(os.getenv('APTOS_INDEXER_ASSETS')), price_lookup,
+        poll_interval=float(os.getenv('APTOS_INDEXER_POLL_SECONDS', '2'))
+    )
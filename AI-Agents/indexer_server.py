@@ -0,0 +1,108 @@
+"""
+Local stand-in for the Aptos indexer GraphQL API
+Serves synthetic transfer activity (a withdraw and a deposit per transaction)
+from the fungible_asset_activities query IndexerIngestor sends, honouring its
+cursor, asset, timestamp and limit variables. The query text itself is not parsed.
+
+    python indexer_server.py --port 8090 --tps 2 --backfill 3600
+
+Then point APTOS_INDEXER_URL at http://127.0.0.1:8090/v1/graphql.
+"""
+import argparse
+import bisect
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from aiohttp import web
+
+from indexer_ingest import DEFAULT_ASSETS
+
+
+class StandInIndexer:
+    def __init__(self, assets: Optional[List[str]] = None, tps: float = 2.0, addresses: int = 5000,
+                 backfill_seconds: int = 3600, seed: Optional[int] = None):
+        self.assets = assets or list(DEFAULT_ASSETS)
+        self.tps = tps  # Transactions per second, per asset
+        self.rng = np.random.default_rng(seed)
+        # Heavy-tailed activity: a few addresses send most transfers
+        self.addresses = [f"0x{value:064x}" for value in self.rng.integers(1, 2 ** 63, size=addresses)]
+        weights = 1.0 / np.arange(1, addresses + 1)
+        self.address_weights = weights / weights.sum()
+        self.activities: List[Dict] = []
+        self._keys: List[tuple] = []  # (transaction_version, event_index) per activity, for cursor lookups
+        self._version = 1_000_000
+        self._generated_until = time.time() - backfill_seconds
+
+    def _generate_until(self, now: float):
+        span = now - self._generated_until
+        if span <= 0:
+            return
+        count = int(self.rng.poisson(self.tps * span * len(self.assets)))
+        timestamps = np.sort(self.rng.uniform(self._generated_until, now, size=count))
+        assets = self.rng.integers(0, len(self.assets), size=count)
+        senders = self.rng.choice(len(self.addresses), size=count, p=self.address_weights)
+        receivers = self.rng.choice(len(self.addresses), size=count, p=self.address_weights)
+        amounts = self.rng.lognormal(18.0, 2.0, size=count).astype(np.int64)  # Octas
+        for timestamp, asset, sender, receiver, amount in zip(timestamps, assets, senders, receivers, amounts):
+            self._append_transaction(self.assets[asset], float(timestamp), self.addresses[sender],
+                                     self.addresses[receiver], int(amount))
+        self._generated_until = now
+
+    def _append_transaction(self, asset_type: str, timestamp: float, sender: str, receiver: str, amount: int):
+        self._version += int(self.rng.integers(1, 50))
+        stamp = datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')
+        for event_index, (event_type, owner) in enumerate((('0x1::coin::WithdrawEvent', sender),
+                                                           ('0x1::coin::DepositEvent', receiver))):
+            self.activities.append({
+                'transaction_version': self._version,
+                'event_index': event_index,
+                'asset_type': asset_type,
+                'type': event_type,
+                'amount': str(amount),
+                'owner_address': owner,
+                'transaction_timestamp': stamp
+            })
+            self._keys.append((self._version, event_index))
+
+    def query(self, variables: Dict) -> List[Dict]:
+        self._generate_until(time.time())
+        start = bisect.bisect_right(self._keys, (int(variables.get('version', -1)), int(variables.get('event_index', -1))))
+        assets = set(variables.get('assets') or self.assets)
+        since = variables.get('since') or ''
+        limit = int(variables.get('limit', 100))
+        page = []
+        for activity in self.activities[start:]:
+            if activity['asset_type'] in assets and activity['transaction_timestamp'] >= since:
+                page.append(activity)
+                if len(page) == limit:
+                    break
+        return page
+
+    async def handle_graphql(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return web.json_response({'data': {'fungible_asset_activities': self.query(body.get('variables') or {})}})
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/v1/graphql', self.handle_graphql)
+        return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in Aptos indexer (GraphQL)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--tps', type=float, default=2.0, help="Transactions per second per asset")
+    parser.add_argument('--addresses', type=int, default=5000, help="Size of the address pool")
+    parser.add_argument('--backfill', type=int, default=3600, help="Seconds of history available at startup")
+    parser.add_argument('--asset', action='append', default=[], metavar='ASSET_TYPE',
+                        help="Asset type to generate (repeatable, default APT)")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    indexer = StandInIndexer(args.asset or None, tps=args.tps, addresses=args.addresses,
+                             backfill_seconds=args.backfill, seed=args.seed)
+    print(f"[Stand-in Indexer] {args.tps:g} tx/s per asset on http://{args.host}:{args.port}/v1/graphql")
+    web.run_app(indexer.make_app(), host=args.host, port=args.port, print=None)
@@ -0,0 +1,84 @@
+"""
+High-frequency live price synthesizer
+Quotes update about once a minute, so between quotes the live price is a
+random walk around the latest quote (trend from percent_change_1h, with a
+minimum absolute step for low-priced tokens and pulled back within 1% of the
+quote). One task per token writes it into the shared PriceTable at a fixed
+rate, so every session on a token sees the same live price. Real ticks from
+the stream take precedence while they are fresh.
+"""
+import asyncio
+import math
+import random
+import time
+from typing import Dict, Optional
+
+from price_table import PriceTable
+
+
+class LivePriceSynthesizer:
+    def __init__(self, price_table: PriceTable, hz: float = 10.0, stream_max_age: float = 5.0,
+                 seed: Optional[int] = None):
+        self.price_table = price_table
+        self.hz = hz
+        self.stream_max_age = stream_max_age  # Stay quiet while real ticks are newer than this
+        self.step_variation = 0.001  # ±0.1% per second
+        self.min_absolute_change = 0.01  # ±$0.01 per second minimum, for visibility on cheap tokens
+        self.max_drift = 0.01  # Pull back once more than 1% away from the quote...
+        self.pullback = 0.2  # ...by 20% per second
+        self._rng = random.Random(seed)
+        self._anchors: Dict[str, Dict] = {}  # TOKEN -> {'price': quote price, 'percent_change_1h': ...}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._users: Dict[str, int] = {}  # TOKEN -> number of sessions using it
+
+    def set_anchor(self, token: str, quote_price: float, percent_change_1h: float = 0.0):
+        """Latest quote the walk is anchored to"""
+        if quote_price and quote_price > 0:
+            self._anchors[token.upper()] = {'price': float(quote_price), 'percent_change_1h': percent_change_1h or 0.0}
+
+    def acquire(self, token: str):
+        """A session needs live prices for `token` - starts its task on first use"""
+        token = token.upper()
+        self._users[token] = self._users.get(token, 0) + 1
+        task = self._tasks.get(token)
+        if task is None or task.done():
+            self._tasks[token] = asyncio.create_task(self._run(token))
+
+    def release(self, token: str):
+        """Stops the token's task once no session uses it"""
+        token = token.upper()
+        self._users[token] = max(self._users.get(token, 0) - 1, 0)
+        if self._users[token] == 0:
+            task = self._tasks.pop(token, None)
+            if task is not None:
+                task.cancel()
+
+    def step(self, price: float, anchor: Dict, dt: float) -> float:
+        """One step of `dt` seconds; variation scales with sqrt(dt) so the per-second spread is rate independent"""
+        trend = anchor['percent_change_1h'] / 100 / 3600 * dt
+        scale = math.sqrt(dt)
+        variation = self._rng.uniform(-self.step_variation, self.step_variation) * scale
+        if abs(variation * price) < self.min_absolute_change * scale:
+            variation = self._rng.uniform(-self.min_absolute_change, self.min_absolute_change) * scale / price
+        price *= 1 + trend + variation
+
+        quote_price = anchor['price']
+        if abs(price - quote_price) > quote_price * self.max_drift:
+            price = quote_price + (price - quote_price) * (1 - self.pullback) ** dt
+        return price
+
+    async def _run(self, token: str):
+        interval = 1.0 / self.hz
+        next_at = time.monotonic()
+        while True:
+            next_at += interval
+            await asyncio.sleep(max(next_at - time.monotonic(), 0.0))
+            anchor = self._anchors.get(token)
+            if anchor is None:
+                continue
+
+            current = self.price_table.get(token)
+            if current and current['source'] != 'synthetic' and time.time() - current['timestamp'] <= self.stream_max_age:
+                continue  # Real ticks are flowing
+            base_price = current['price'] if current else anchor['price']
+            self.price_table.update(token, self.step(base_price, anchor, interval), source='synthetic')
@@ -6,7 +6,7 @@ import os
 import time
 from datetime import datetime
 from dotenv import load_dotenv
-from market_data import CoinMarketCapAPI
+from market_data import create_market_data_provider
 from sentiment_analyzer import SentimentAnalyzer
 from aptos_analyzer import AptosAnalyzer
 from decision_engine import DecisionEngine
@@ -18,13 +18,10 @@ class PerpDEXAnalyzer:
         load_dotenv()
         
         # Initialize APIs
-        cmc_api_key = os.getenv('CMC_API_KEY')
         openai_api_key = os.getenv('OPENAI_API_KEY')
         
-        if not cmc_api_key or not openai_api_key:
-            raise ValueError("Please set CMC_API_KEY and OPENAI_API_KEY in your .env file")
-        
-        self.cmc = CoinMarketCapAPI(cmc_api_key)
+        # CMC, CoinGecko or recorded replay, chosen by MARKET_DATA_PROVIDER
+        self.market_data = create_market_data_provider()
         self.sentiment_analyzer = SentimentAnalyzer(openai_api_key)
         self.aptos_analyzer = AptosAnalyzer()
         self.decision_engine = DecisionEngine()
@@ -40,8 +37,8 @@ class PerpDEXAnalyzer:
         print(f"{'='*80}\n")
         
         # Step 1: Fetch market data
-        print("📊 Fetching market data from CoinMarketCap...")
-        market_data = self.cmc.get_token_info(token_symbol)
+        print(f"📊 Fetching market data from {self.market_data.name}...")
+        market_data = self.market_data.get_token_info(token_symbol)
         
         if not market_data:
             print(f"❌ Could not fetch market data for {token_symbol}")
@@ -1,14 +1,351 @@
 """
-CoinMarketCap API integration for fetching market data
+Market data providers - CoinMarketCap, CoinGecko and (see replay_market_data)
+a local replay of recorded responses - behind one interface for quotes,
+history and trending tokens
 """
 import requests
 import os
+import math
+import time
 from typing import Dict, Optional
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
 
-class CoinMarketCapAPI:
-    def __init__(self, api_key: str):
+from ohlcv_store import OHLCVStore, RECORD_DTYPE
+from candles import aggregate_ohlcv
+from gecko_index import CoinGeckoIdIndex, COINGECKO_API
+from synthetic_market import generate_ohlcv
+from rate_limiter import get_budget, retry_after_seconds, BudgetExceeded
+
+
+# Seconds per stored point for each CoinGecko resolution
+RESOLUTION_SECONDS = {
+    'hourly': 3600,
+    'daily': 86400
+}
+
+
+# Column order of the columnar historical format
+OHLCV_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+def build_ohlcv_columns(records: np.ndarray, interval_seconds: int) -> Dict[str, np.ndarray]:
+    """
+    Aggregate store records into OHLCV candles of `interval_seconds` in one vectorized step
+    CoinGecko volumes are rolling 24h totals, so each candle takes the last one
+    """
+    return aggregate_ohlcv(
+        records['timestamp'],
+        records['price'],
+        records['volume'],
+        interval_seconds,
+        volume_mode='last'
+    )
+
+
+def ohlcv_columns_to_rows(columns: Dict[str, np.ndarray]) -> list:
+    """Legacy row format: one dict per point with ISO 'time'/'date' and a duplicate 'price'"""
+    frame = pd.DataFrame({name: columns[name] for name in OHLCV_COLUMNS})
+    # Local-time ISO strings, matching datetime.fromtimestamp(...).isoformat()
+    # (microseconds only when non-zero - candle timestamps are whole seconds)
+    local_tz = datetime.now().astimezone().tzinfo
+    times = (pd.to_datetime(frame['timestamp'], unit='s', utc=True)
+             .dt.tz_convert(local_tz).dt.tz_localize(None))
+    iso_times = times.dt.strftime('%Y-%m-%dT%H:%M:%S')
+    fractional = times.dt.microsecond != 0
+    if fractional.any():
+        iso_times = iso_times.where(~fractional, times.dt.strftime('%Y-%m-%dT%H:%M:%S.%f'))
+    frame['time'] = iso_times
+    frame['price'] = frame['close']  # Keep for compatibility
+    frame['date'] = iso_times
+    return frame[['timestamp', 'time', 'open', 'high', 'low', 'close', 'price', 'volume', 'date']].to_dict('records')
+
+
+class MarketDataProvider:
+    """
+    Interface shared by every market data source.
+    Quotes are dicts with name, symbol, price, market_cap, volume_24h,
+    percent_change_1h/24h/7d, circulating_supply, total_supply and last_updated.
+    """
+    name = 'base'
+    
+    def get_token_info(self, symbol: str) -> Optional[Dict]:
+        """Current quote for a symbol, or None if the provider doesn't know it"""
+        raise NotImplementedError
+    
+    def get_historical_columns(self, symbol: str, days: int = 30) -> Optional[Dict[str, np.ndarray]]:
+        """Historical OHLCV data as NumPy columns (timestamp, open, high, low, close, volume)"""
+        raise NotImplementedError
+    
+    def get_trending_tokens(self) -> list:
+        """Trending tokens, if the provider has them"""
+        return []
+    
+    def source_stats(self) -> Dict:
+        """Per-source latency/staleness metrics (see price_aggregator)"""
+        return {'provider': self.name}
+    
+    def get_historical_data(self, symbol: str, days: int = 30) -> Optional[list]:
+        """
+        Get historical price data for a token with OHLC (candlestick) data
+        Row format kept for existing clients - see get_historical_columns
+        """
+        columns = self.get_historical_columns(symbol, days)
+        if columns is None:
+            return None
+        return ohlcv_columns_to_rows(columns)
+
+
+class CoinGeckoAPI(MarketDataProvider):
+    """Keyless CoinGecko quotes and trending, plus store-backed historical data"""
+    name = 'coingecko'
+    
+    def __init__(self, ohlcv_store: Optional[OHLCVStore] = None,
+                 gecko_ids: Optional[CoinGeckoIdIndex] = None,
+                 quote_provider: Optional[MarketDataProvider] = None):
+        self.base_url = COINGECKO_API
+        
+        # Local store for historical data - only the missing tail is fetched from CoinGecko
+        self.ohlcv_store = ohlcv_store or OHLCVStore(os.getenv('OHLCV_STORE_PATH', 'data/ohlcv'))
+        self._provisional_tail = {}  # (symbol, resolution) -> records newer than the last completed interval
+        self._covered_days = {}  # (symbol, resolution) -> longest window already fetched in full
+        self._candle_cache = {}  # (symbol, days) -> (source point count, last source timestamp, columns)
+        
+        # Symbol -> CoinGecko id, loaded from disk and refreshed in the background
+        self.gecko_ids = gecko_ids or CoinGeckoIdIndex(os.getenv('COINGECKO_INDEX_PATH', 'data/coingecko_ids.json'))
+        self.gecko_ids.start_background_refresh()
+        
+        # Asked for the current price when synthetic history has nothing local to anchor to
+        self.quote_provider = quote_provider or self
+    
+    def _resolve_gecko_id(self, symbol: str) -> Optional[str]:
+        """CoinGecko id from the index, or from /search while the index is still being built"""
+        gecko_id = self.gecko_ids.lookup(symbol)
+        if not gecko_id and not self.gecko_ids.is_loaded:
+            search_url = f"{self.base_url}/search?query={symbol.lower()}"
+            get_budget('coingecko').acquire()
+            search_res = requests.get(search_url, timeout=10)
+            if search_res.ok:
+                search_data = search_res.json()
+                if search_data.get('coins'):
+                    gecko_id = search_data['coins'][0]['id']
+        return gecko_id
+    
+    def get_token_info(self, symbol: str) -> Optional[Dict]:
+        """Current quote from /coins/markets, in the same shape as CoinMarketCapAPI quotes"""
+        try:
+            gecko_id = self._resolve_gecko_id(symbol)
+            if not gecko_id:
+                print(f"⚠️  Token '{symbol.upper()}' not found in CoinGecko")
+                return None
+            
+            get_budget('coingecko').acquire()
+            response = requests.get(
+                f"{self.base_url}/coins/markets",
+                params={'vs_currency': 'usd', 'ids': gecko_id, 'price_change_percentage': '1h,24h,7d'},
+                timeout=10
+            )
+            if response.status_code == 429:
+                get_budget('coingecko').penalize(retry_after_seconds(response.headers))
+            response.raise_for_status()
+            coins = response.json()
+            if not coins:
+                return None
+            
+            coin = coins[0]
+            return {
+                'name': str(coin['name']),
+                'symbol': str(coin['symbol']).upper(),
+                'price': float(coin['current_price']),
+                'market_cap': float(coin.get('market_cap') or 0),
+                'volume_24h': float(coin.get('total_volume') or 0),
+                'percent_change_1h': float(coin.get('price_change_percentage_1h_in_currency') or 0),
+                'percent_change_24h': float(coin.get('price_change_percentage_24h_in_currency') or 0),
+                'percent_change_7d': float(coin.get('price_change_percentage_7d_in_currency') or 0),
+                'circulating_supply': float(coin.get('circulating_supply') or 0),
+                'total_supply': float(coin.get('total_supply') or 0),
+                'last_updated': str(coin.get('last_updated') or datetime.now().isoformat())
+            }
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            print(f"❌ CoinGecko quote error for {symbol.upper()}: {type(e).__name__}: {e}")
+            return None
+    
+    def get_trending_tokens(self) -> list:
+        """Trending coins from /search/trending"""
+        try:
+            get_budget('coingecko').acquire()
+            response = requests.get(f"{self.base_url}/search/trending", timeout=10)
+            response.raise_for_status()
+            return [coin['item'] for coin in response.json().get('coins', [])]
+        except Exception as e:
+            print(f"Error fetching trending tokens: {e}")
+            return []
+    
+    def get_historical_columns(self, symbol: str, days: int = 30) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Get historical OHLCV data as NumPy columns (timestamp, open, high, low, close, volume)
+        Served from the local store; synthesized if CoinGecko doesn't know the token
+        """
+        try:
+            gecko_id = self._resolve_gecko_id(symbol)
+            
+            if gecko_id:
+                # Candles are aggregated from finer source points where CoinGecko has them
+                # (hourly points up to 90 days), so high/low are real ranges
+                bar_resolution = 'daily' if days > 7 else 'hourly'
+                source_resolution = 'hourly' if days <= 90 else 'daily'
+                
+                # Serve from the local store, fetching only the missing tail from CoinGecko
+                records = self._load_market_chart(symbol.upper(), gecko_id, days, source_resolution)
+                return self._get_candles(symbol.upper(), days, records, RESOLUTION_SECONDS[bar_resolution])
+            else:
+                # Fallback: Generate synthetic data based on current price
+                print(f"⚠️  Token {symbol} not found in CoinGecko, generating synthetic data")
+                return self._generate_synthetic_historical(symbol, days)
+                
+        except Exception as e:
+            print(f"Error fetching historical data: {e}")
+            # Fallback to synthetic data
+            return self._generate_synthetic_historical(symbol, days)
+    
+    def _get_candles(self, symbol: str, days: int, records: np.ndarray,
+                     interval_seconds: int) -> Dict[str, np.ndarray]:
+        """Candles for a window, recomputed only when new source points arrived"""
+        key = (symbol, days)
+        last_timestamp = float(records['timestamp'][-1]) if len(records) else None
+        cached = self._candle_cache.get(key)
+        if cached and cached[0] == len(records) and cached[1] == last_timestamp:
+            return cached[2]
+        
+        columns = build_ohlcv_columns(records, interval_seconds)
+        self._candle_cache[key] = (len(records), last_timestamp, columns)
+        return columns
+    
+    def _fetch_market_chart(self, gecko_id: str, days: int, resolution: str) -> np.ndarray:
+        """Fetch a CoinGecko market_chart window as store records"""
+        url = f"{self.base_url}/coins/{gecko_id}/market_chart"
+        params = {
+            'vs_currency': 'usd',
+            'days': days
+        }
+        if resolution == 'daily':
+            params['interval'] = 'daily'
+        else:
+            # CoinGecko returns hourly points automatically for 2-90 day windows
+            # (1 day would switch to 5-minute points)
+            params['days'] = min(max(days, 2), 90)
+        get_budget('coingecko').acquire()
+        print(f"[CoinGecko] Fetching {days}d {resolution} market chart for {gecko_id}")
+        response = requests.get(url, params=params, timeout=10)
+        if response.status_code == 429:
+            get_budget('coingecko').penalize(retry_after_seconds(response.headers))
+        response.raise_for_status()
+        data = response.json()
+        
+        prices = np.asarray(data.get('prices', []), dtype=np.float64).reshape(-1, 2)
+        market_caps = np.asarray(data.get('market_caps', []), dtype=np.float64).reshape(-1, 2)
+        volumes = np.asarray(data.get('total_volumes', []), dtype=np.float64).reshape(-1, 2)
+        
+        records = np.zeros(len(prices), dtype=RECORD_DTYPE)
+        records['timestamp'] = prices[:, 0] / 1000
+        records['price'] = prices[:, 1]
+        # Caps/volumes are index-aligned with prices; missing trailing values stay 0
+        records['market_cap'][:len(market_caps)] = market_caps[:len(prices), 1]
+        records['volume'][:len(volumes)] = volumes[:len(prices), 1]
+        return records
+    
+    def _load_market_chart(self, symbol: str, gecko_id: str, days: int, resolution: str) -> np.ndarray:
+        """
+        Historical records for the last `days` days, served from the OHLCV store.
+        Completed intervals are persisted; the still-forming latest point is kept
+        in memory and replaced on the next fetch.
+        """
+        interval = RESOLUTION_SECONDS[resolution]
+        key = (symbol, resolution)
+        now = time.time()
+        start = now - days * 86400
+        first_ts, last_ts = self.ohlcv_store.bounds(symbol, resolution)
+        
+        fetched = None
+        if last_ts is None or (first_ts > start + interval and self._covered_days.get(key, 0) < days):
+            # Empty store or not enough history yet: fetch the full window once
+            fetched = self._fetch_market_chart(gecko_id, days, resolution)
+            completed = fetched[fetched['timestamp'] <= now - interval]
+            self.ohlcv_store.merge(symbol, resolution, completed)
+            self._covered_days[key] = days
+        elif now - last_ts >= 2 * interval:
+            # A new interval has completed since the last stored point: fetch only the tail
+            # (at least 2 days, otherwise CoinGecko switches to 5-minute granularity)
+            tail_days = max(math.ceil((now - last_ts) / 86400) + 1, 2)
+            try:
+                fetched = self._fetch_market_chart(gecko_id, tail_days, resolution)
+                completed = fetched[fetched['timestamp'] <= now - interval]
+                appended = self.ohlcv_store.append(symbol, resolution, completed)
+                print(f"[OHLCV Store] Appended {appended} {resolution} points for {symbol}")
+            except Exception as e:
+                # Serve what we already have rather than failing the whole request
+                print(f"⚠️  Could not refresh {symbol} tail, serving stored data: {e}")
+        
+        if fetched is not None:
+            self._provisional_tail[key] = fetched[fetched['timestamp'] > now - interval]
+        
+        stored = self.ohlcv_store.read(symbol, resolution, start=start)
+        tail = self._provisional_tail.get(key, np.empty(0, dtype=RECORD_DTYPE))
+        if len(stored):
+            tail = tail[tail['timestamp'] > stored['timestamp'][-1]]
+        return np.concatenate([stored, tail])
+    
+    def _last_known_price(self, symbol: str) -> Optional[float]:
+        """Most recent price in the local store, without any network access"""
+        latest = None
+        for resolution in RESOLUTION_SECONDS:
+            tail = self._provisional_tail.get((symbol.upper(), resolution))
+            if tail is not None and len(tail):
+                candidate = (float(tail['timestamp'][-1]), float(tail['price'][-1]))
+            else:
+                _, last_ts = self.ohlcv_store.bounds(symbol, resolution)
+                if last_ts is None:
+                    continue
+                stored = self.ohlcv_store.read(symbol, resolution, start=last_ts)
+                candidate = (float(stored['timestamp'][-1]), float(stored['price'][-1]))
+            if latest is None or candidate[0] > latest[0]:
+                latest = candidate
+        return latest[1] if latest else None
+    
+    def _generate_synthetic_historical(self, symbol: str, days: int,
+                                       seed: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Generate synthetic historical data with OHLC (candlestick) format, ending at the current price"""
+        # Prefer a locally known price; only ask for a quote when we have never seen the token
+        current_price = self._last_known_price(symbol)
+        if current_price is None:
+            current_data = self.quote_provider.get_token_info(symbol)
+            if not current_data:
+                return None
+            current_price = current_data['price']
+        
+        # Generate data points
+        interval_hours = 1 if days <= 7 else 24
+        points = days * (24 // interval_hours) + 1
+        
+        return generate_ohlcv(
+            points,
+            current_price,
+            process='random_walk',
+            interval_seconds=interval_hours * 3600,
+            seed=seed,
+            anchor='end'
+        )
+
+
+class CoinMarketCapAPI(MarketDataProvider):
+    name = 'cmc'
+    
+    def __init__(self, api_key: str, ohlcv_store: Optional[OHLCVStore] = None,
+                 gecko_ids: Optional[CoinGeckoIdIndex] = None, history: Optional[CoinGeckoAPI] = None):
         self.api_key = api_key
         self.base_url = "https://pro-api.coinmarketcap.com/v1"
         self.headers = {
@@ -17,6 +354,10 @@ class CoinMarketCapAPI:
         }
         # Create a new session for each request to prevent any connection pooling/caching
         # This ensures every API call is completely fresh
+        
+        # CMC historical data requires a higher tier - history comes from CoinGecko,
+        # anchored to CMC quotes when it has to be synthesized
+        self.history = history or CoinGeckoAPI(ohlcv_store, gecko_ids, quote_provider=self)
     
     def get_token_info(self, symbol: str) -> Optional[Dict]:
         """Get comprehensive token information from CoinMarketCap"""
@@ -41,6 +382,11 @@ class CoinMarketCapAPI:
             fresh_headers['Pragma'] = 'no-cache'
             fresh_headers['Expires'] = '0'
             
+            # Shared per-minute budget across all sessions - may queue behind higher priorities
+            queued = get_budget('cmc').acquire()
+            if queued > 0.05:
+                print(f"[CMC API] Waited {queued:.2f}s for request budget")
+            
             print(f"[CMC API] Making fresh API call for {symbol.upper()} at {datetime.now().isoformat()}")
             response = session.get(url, headers=fresh_headers, params=parameters, timeout=10)
             
@@ -50,6 +396,8 @@ class CoinMarketCapAPI:
             print(f"[CMC API] Response received in {request_time:.2f}s - Status: {response.status_code}")
             
             # Check response status
+            if response.status_code == 429:
+                get_budget('cmc').penalize(retry_after_seconds(response.headers))
             if response.status_code != 200:
                 error_data = response.json() if response.content else {}
                 error_msg = error_data.get('status', {}).get('error_message', f'HTTP {response.status_code}')
@@ -109,6 +457,8 @@ class CoinMarketCapAPI:
                 print(f"   Available symbols in response: {list(data.get('data', {}).keys())}")
             return None
             
+        except BudgetExceeded:
+            raise  # Callers decide how to surface throttling
         except requests.exceptions.RequestException as e:
             print(f"❌ CMC API Request Error: {type(e).__name__}: {str(e)}")
             if hasattr(e, 'response') and e.response is not None:
@@ -129,6 +479,7 @@ class CoinMarketCapAPI:
         """Get trending tokens (if available in your CMC plan)"""
         try:
             url = f"{self.base_url}/cryptocurrency/trending/latest"
+            get_budget('cmc').acquire()
             response = requests.get(url, headers=self.headers)
             response.raise_for_status()
             data = response.json()
@@ -137,146 +488,53 @@ class CoinMarketCapAPI:
             print(f"Error fetching trending tokens: {e}")
             return []
     
-    def get_historical_data(self, symbol: str, days: int = 30) -> Optional[list]:
-        """
-        Get historical price data for a token with OHLC (candlestick) data
-        Uses CoinGecko as fallback since CMC historical data requires higher tier
-        """
-        try:
-            # First try to get token ID from CoinGecko
-            gecko_id_map = {
-                'BTC': 'bitcoin',
-                'ETH': 'ethereum',
-                'APT': 'aptos',
-                'DOGE': 'dogecoin',
-                'SOL': 'solana',
-                'BNB': 'binancecoin',
-                'ADA': 'cardano',
-                'XRP': 'ripple',
-                'MATIC': 'matic-network',
-                'DOT': 'polkadot',
-                'AVAX': 'avalanche-2',
-                'LINK': 'chainlink',
-                'UNI': 'uniswap',
-                'ATOM': 'cosmos',
-                'LTC': 'litecoin',
-            }
-            
-            gecko_id = gecko_id_map.get(symbol.upper())
-            if not gecko_id:
-                # Try to search for it
-                search_url = f"https://api.coingecko.com/api/v3/search?query={symbol.lower()}"
-                search_res = requests.get(search_url, timeout=10)
-                if search_res.ok:
-                    search_data = search_res.json()
-                    if search_data.get('coins'):
-                        gecko_id = search_data['coins'][0]['id']
-            
-            if gecko_id:
-                # Fetch historical data from CoinGecko
-                url = f"https://api.coingecko.com/api/v3/coins/{gecko_id}/market_chart"
-                params = {
-                    'vs_currency': 'usd',
-                    'days': days,
-                    'interval': 'daily' if days > 7 else 'hourly'
-                }
-                response = requests.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Format the data with OHLC (candlestick) format
-                prices = data.get('prices', [])
-                market_caps = data.get('market_caps', [])
-                volumes = data.get('total_volumes', [])
-                
-                historical = []
-                for i, price_point in enumerate(prices):
-                    timestamp = price_point[0] / 1000
-                    price = price_point[1]
-                    
-                    # For candlestick, we need OHLC
-                    # If we have previous price, use it for open, otherwise use current
-                    if i > 0:
-                        open_price = prices[i-1][1]
-                    else:
-                        open_price = price
-                    
-                    # High and Low - approximate from price movement
-                    # In real scenario, you'd get this from exchange API
-                    high_price = price * 1.02  # Approximate
-                    low_price = price * 0.98  # Approximate
-                    close_price = price
-                    
-                    volume = volumes[i][1] if i < len(volumes) else 0
-                    
-                    historical.append({
-                        'timestamp': timestamp,
-                        'time': datetime.fromtimestamp(timestamp).isoformat(),
-                        'open': open_price,
-                        'high': high_price,
-                        'low': low_price,
-                        'close': close_price,
-                        'price': price,  # Keep for compatibility
-                        'volume': volume,
-                        'date': datetime.fromtimestamp(timestamp).isoformat()
-                    })
-                
-                return historical
-            else:
-                # Fallback: Generate synthetic data based on current price
-                print(f"⚠️  Token {symbol} not found in CoinGecko, generating synthetic data")
-                return self._generate_synthetic_historical(symbol, days)
-                
-        except Exception as e:
-            print(f"Error fetching historical data: {e}")
-            # Fallback to synthetic data
-            return self._generate_synthetic_historical(symbol, days)
-    
-    def _generate_synthetic_historical(self, symbol: str, days: int) -> list:
-        """Generate synthetic historical data with OHLC (candlestick) format"""
-        import random
-        from datetime import timedelta
-        
-        # Get current price
-        current_data = self.get_token_info(symbol)
-        if not current_data:
-            return []
-        
-        current_price = current_data['price']
-        historical = []
-        now = datetime.now()
-        
-        # Generate data points
-        interval_hours = 1 if days <= 7 else 24
-        points = days * (24 // interval_hours)
-        
-        # Start with a price slightly different from current
-        price = current_price * (1 + random.uniform(-0.1, 0.1))
-        
-        for i in range(points, -1, -1):
-            timestamp = now - timedelta(hours=i * interval_hours)
-            # Random walk with slight trend
-            price_change = random.uniform(-0.02, 0.02)
-            price = price * (1 + price_change)
-            
-            # Generate OHLC for candlestick
-            open_price = price
-            high_price = price * (1 + random.uniform(0, 0.03))
-            low_price = price * (1 - random.uniform(0, 0.03))
-            close_price = price * (1 + random.uniform(-0.01, 0.01))
-            volume = random.uniform(1000000, 10000000)
-            
-            historical.append({
-                'timestamp': timestamp.timestamp(),
-                'time': timestamp.isoformat(),
-                'open': max(open_price, 0.0001),
-                'high': max(high_price, 0.0001),
-                'low': max(low_price, 0.0001),
-                'close': max(close_price, 0.0001),
-                'price': max(price, 0.0001),  # Keep for compatibility
-                'volume': volume,
-                'date': timestamp.isoformat()
-            })
-        
-        return historical
+    def get_historical_columns(self, symbol: str, days: int = 30) -> Optional[Dict[str, np.ndarray]]:
+        """Historical OHLCV columns from CoinGecko (see CoinGeckoAPI.get_historical_columns)"""
+        return self.history.get_historical_columns(symbol, days)
 
+
+def create_market_data_provider(name: Optional[str] = None) -> MarketDataProvider:
+    """
+    Provider selected by MARKET_DATA_PROVIDER: 'cmc' (default when CMC_API_KEY is set),
+    'coingecko' (keyless) or 'replay' (recorded responses from disk, no network).
+    A comma-separated list (e.g. "cmc,coingecko") aggregates several sources with
+    PRICE_AGGREGATION ('median', 'freshness' or 'primary'); the first one is the primary.
+    With MARKET_DATA_RECORD_DIR set, every live response is recorded for later replay.
+    """
+    # Imported here - these modules build on the interface defined above
+    from replay_market_data import ReplayMarketData, RecordingMarketData
+    from price_aggregator import AggregatedMarketData
+    
+    cmc_api_key = os.getenv('CMC_API_KEY')
+    spec = (name or os.getenv('MARKET_DATA_PROVIDER') or ('cmc' if cmc_api_key else 'coingecko')).lower()
+    names = [part.strip() for part in spec.split(',') if part.strip()]
+    
+    # One CoinGecko instance (store, id index) even when it is both a source and CMC's history
+    coingecko = CoinGeckoAPI() if 'coingecko' in names else None
+    providers = []
+    for source in names:
+        if source == 'cmc':
+            if not cmc_api_key:
+                raise ValueError("MARKET_DATA_PROVIDER=cmc requires CMC_API_KEY in your .env file")
+            providers.append(CoinMarketCapAPI(cmc_api_key, history=coingecko))
+        elif source == 'coingecko':
+            providers.append(coingecko)
+        elif source == 'replay':
+            providers.append(ReplayMarketData(
+                os.getenv('MARKET_DATA_REPLAY_DIR', 'data/replay'),
+                speed=float(os.getenv('MARKET_DATA_REPLAY_SPEED', '1.0'))
+            ))
+        else:
+            raise ValueError(f"Unknown MARKET_DATA_PROVIDER '{source}', expected cmc, coingecko or replay")
+    
+    if len(providers) == 1:
+        provider = providers[0]
+    else:
+        provider = AggregatedMarketData(providers, method=os.getenv('PRICE_AGGREGATION', 'median'))
+    
+    record_dir = os.getenv('MARKET_DATA_RECORD_DIR')
+    if record_dir and 'replay' not in names:
+        provider = RecordingMarketData(provider, record_dir)
+    
+    print(f"[Market Data] Using {provider.name} provider")
+    return provider
@@ -0,0 +1,108 @@
+"""
+On-disk store for historical market data
+One append-only file of fixed-width records per (symbol, resolution), read back
+through np.memmap so range queries are a binary search plus a slice
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),  # Unix seconds
+    ('price', '<f8'),
+    ('market_cap', '<f8'),
+    ('volume', '<f8'),
+])
+
+
+class OHLCVStore:
+    def __init__(self, root: str = 'data/ohlcv'):
+        self.root = root
+        self._lock = threading.Lock()
+        self._maps: Dict[str, Tuple[int, np.memmap]] = {}  # path -> (file size, memmap)
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, symbol: str, resolution: str) -> str:
+        return os.path.join(self.root, f"{symbol.upper()}_{resolution}.bin")
+
+    def _records(self, path: str) -> np.ndarray:
+        """Memory-mapped view of a file, re-mapped only when the file has grown"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty(0, dtype=RECORD_DTYPE)
+
+        count = size // RECORD_DTYPE.itemsize  # Ignore a torn trailing record
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+
+        cached = self._maps.get(path)
+        if cached and cached[0] == size:
+            return cached[1]
+
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+        self._maps[path] = (size, records)
+        return records
+
+    def bounds(self, symbol: str, resolution: str) -> Tuple[Optional[float], Optional[float]]:
+        """(first, last) stored timestamps, or (None, None) if nothing is stored"""
+        with self._lock:
+            records = self._records(self._path(symbol, resolution))
+            if len(records) == 0:
+                return None, None
+            return float(records['timestamp'][0]), float(records['timestamp'][-1])
+
+    def read(self, symbol: str, resolution: str, start: Optional[float] = None,
+             end: Optional[float] = None) -> np.ndarray:
+        """Records with start <= timestamp <= end (timestamps are kept sorted)"""
+        with self._lock:
+            records = self._records(self._path(symbol, resolution))
+            timestamps = records['timestamp']
+            lo = int(np.searchsorted(timestamps, start, side='left')) if start is not None else 0
+            hi = int(np.searchsorted(timestamps, end, side='right')) if end is not None else len(records)
+            return np.array(records[lo:hi])
+
+    def append(self, symbol: str, resolution: str, new_records: np.ndarray) -> int:
+        """Append records newer than the stored tail; returns how many were written"""
+        if len(new_records) == 0:
+            return 0
+        path = self._path(symbol, resolution)
+        with self._lock:
+            records = self._records(path)
+            if len(records):
+                new_records = new_records[new_records['timestamp'] > records['timestamp'][-1]]
+            if len(new_records) == 0:
+                return 0
+            new_records = np.sort(new_records.astype(RECORD_DTYPE), order='timestamp')
+            # Drop a torn trailing record first, or everything after it would be misaligned
+            valid_size = len(records) * RECORD_DTYPE.itemsize
+            if os.path.exists(path) and os.path.getsize(path) != valid_size:
+                os.truncate(path, valid_size)
+            with open(path, 'ab') as f:
+                f.write(new_records.tobytes())
+            return len(new_records)
+
+    def merge(self, symbol: str, resolution: str, new_records: np.ndarray) -> int:
+        """
+        Merge records anywhere in the series (e.g. backfilling older history).
+        Rewrites the file, so the tail path should use append() instead.
+        """
+        if len(new_records) == 0:
+            return 0
+        path = self._path(symbol, resolution)
+        with self._lock:
+            existing = np.array(self._records(path))
+            combined = np.concatenate([existing, new_records.astype(RECORD_DTYPE)])
+            # Keep the stored value where timestamps collide
+            _, first_index = np.unique(combined['timestamp'], return_index=True)
+            merged = combined[first_index]
+
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(merged.tobytes())
+            self._maps.pop(path, None)
+            os.replace(tmp_path, path)
+            return len(merged) - len(existing)
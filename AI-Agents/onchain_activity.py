@@ -0,0 +1,152 @@
+"""
+Rolling on-chain activity counters
+Per-token transaction count and USD volume in per-minute buckets over the last
+24h. Window totals are kept as running sums, adjusted as buckets are added and
+expire, so reads are O(1) regardless of how much traffic was ingested.
+Unique addresses are counted approximately with sliding HyperLogLog sketches.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from hyperloglog import SlidingHyperLogLog
+
+
+ACTIVITY_METRICS = ('transaction_count', 'volume_usd')
+ACTIVITY_WINDOWS = {'1h': 3600, '24h': 86400}
+
+
+class RollingWindowCounter:
+    def __init__(self, metrics=ACTIVITY_METRICS, windows: Optional[Dict[str, int]] = None,
+                 bucket_seconds: int = 60):
+        self.metrics = tuple(metrics)
+        self.bucket_seconds = bucket_seconds
+        windows = windows or ACTIVITY_WINDOWS
+        self.window_buckets = {name: seconds // bucket_seconds for name, seconds in windows.items()}
+        self.size = max(self.window_buckets.values())
+        self._buckets = np.zeros((self.size, len(self.metrics)), dtype=np.float64)  # Ring, one row per bucket
+        self._totals = {name: np.zeros(len(self.metrics), dtype=np.float64) for name in self.window_buckets}
+        self._head: Optional[int] = None  # Newest bucket index (time // bucket_seconds)
+
+    def _advance(self, bucket: int):
+        """Move the head forward to `bucket`, expiring buckets that leave each window"""
+        if self._head is None:
+            self._head = bucket
+            return
+        if bucket <= self._head:
+            return
+        if bucket - self._head >= self.size:
+            self._buckets[:] = 0.0
+            for totals in self._totals.values():
+                totals[:] = 0.0
+            self._head = bucket
+            return
+        for new_bucket in range(self._head + 1, bucket + 1):
+            for name, length in self.window_buckets.items():
+                self._totals[name] -= self._buckets[(new_bucket - length) % self.size]
+            self._buckets[new_bucket % self.size] = 0.0  # Same slot as the bucket that left the longest window
+        self._head = bucket
+
+    def add(self, timestamp: float, **values: float) -> bool:
+        """Count an event; returns False if it is older than the longest window"""
+        bucket = int(timestamp // self.bucket_seconds)
+        self._advance(bucket)
+        age = self._head - bucket
+        if age >= self.size:
+            return False
+        row = np.array([values.get(metric, 0.0) for metric in self.metrics], dtype=np.float64)
+        self._buckets[bucket % self.size] += row
+        for name, length in self.window_buckets.items():
+            if age < length:
+                self._totals[name] += row
+        return True
+
+    def totals(self, window: str, now: Optional[float] = None) -> Dict[str, float]:
+        """Sums over the window ending at `now`"""
+        self._advance(int((time.time() if now is None else now) // self.bucket_seconds))
+        return {metric: float(value) for metric, value in zip(self.metrics, self._totals[window])}
+
+
+class OnchainActivityStore:
+    """Rolling counters per token, written by the indexer ingestor and read by AptosAnalyzer"""
+
+    def __init__(self, bucket_seconds: int = 60, unique_bucket_seconds: int = 300, unique_precision: int = 12):
+        self.bucket_seconds = bucket_seconds
+        self.unique_bucket_seconds = unique_bucket_seconds
+        self.unique_precision = unique_precision  # 2^p registers per sketch bucket (~1.6% error at p=12)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, RollingWindowCounter] = {}
+        self._uniques: Dict[str, SlidingHyperLogLog] = {}  # TOKEN -> active-address sketches over 24h
+        self.first_event_at: Dict[str, float] = {}  # TOKEN -> timestamp of the oldest counted event
+        self.last_event_at: Dict[str, float] = {}  # TOKEN -> timestamp of the newest event
+        self._generation: Dict[str, int] = {}  # TOKEN -> number of writes, for cache invalidation
+
+    def record(self, token: str, timestamp: float, volume_usd: float = 0.0, transactions: int = 1) -> bool:
+        token = token.upper()
+        with self._lock:
+            counter = self._counters.get(token)
+            if counter is None:
+                counter = self._counters[token] = RollingWindowCounter(bucket_seconds=self.bucket_seconds)
+            added = counter.add(timestamp, transaction_count=transactions, volume_usd=volume_usd)
+            if added:
+                self._generation[token] = self._generation.get(token, 0) + 1
+                self.first_event_at[token] = min(timestamp, self.first_event_at.get(token, timestamp))
+                self.last_event_at[token] = max(timestamp, self.last_event_at.get(token, timestamp))
+            return added
+
+    def _unique_sketch(self, token: str) -> SlidingHyperLogLog:
+        sketch = self._uniques.get(token)
+        if sketch is None:
+            sketch = self._uniques[token] = SlidingHyperLogLog(
+                ACTIVITY_WINDOWS['24h'], self.unique_bucket_seconds, self.unique_precision
+            )
+        return sketch
+
+    def record_address(self, token: str, address: str, timestamp: float) -> bool:
+        """Count an address that sent or received the token"""
+        token = token.upper()
+        with self._lock:
+            added = self._unique_sketch(token).add(address, timestamp)
+            if added:
+                self._generation[token] = self._generation.get(token, 0) + 1
+            return added
+
+    def merge_unique_addresses(self, token: str, other: SlidingHyperLogLog):
+        """Fold in another worker's address sketches for a token"""
+        token = token.upper()
+        with self._lock:
+            self._unique_sketch(token).merge(other)
+            self._generation[token] = self._generation.get(token, 0) + 1
+
+    def unique_counts(self, token: str, now: Optional[float] = None) -> Dict[str, int]:
+        """Approximate unique addresses per window, e.g. {'1h': 812, '24h': 9650}"""
+        with self._lock:
+            sketch = self._uniques.get(token.upper())
+            if sketch is None:
+                return {window: 0 for window in ACTIVITY_WINDOWS}
+            return {window: int(round(sketch.count(seconds, now))) for window, seconds in ACTIVITY_WINDOWS.items()}
+
+    def state_key(self, token: str, now: Optional[float] = None) -> tuple:
+        """Changes whenever the token's window totals can have changed: a new event, or a bucket rolling over"""
+        bucket = int((time.time() if now is None else now) // self.bucket_seconds)
+        return self._generation.get(token.upper(), 0), bucket
+
+    def tracked(self, token: str) -> bool:
+        return token.upper() in self._counters
+
+    def coverage_seconds(self, token: str, now: Optional[float] = None) -> float:
+        """How much of the 24h window has been observed for a token"""
+        first = self.first_event_at.get(token.upper())
+        if first is None:
+            return 0.0
+        return min((time.time() if now is None else now) - first, ACTIVITY_WINDOWS['24h'])
+
+    def window_totals(self, token: str, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """{'1h': {...}, '24h': {...}} for a token (zeros if it was never seen)"""
+        with self._lock:
+            counter = self._counters.get(token.upper())
+            if counter is None:
+                return {window: {metric: 0.0 for metric in ACTIVITY_METRICS} for window in ACTIVITY_WINDOWS}
+            return {window: counter.totals(window, now) for window in ACTIVITY_WINDOWS}
@@ -0,0 +1,90 @@
+"""
+PnL / ROI scenario surfaces for perp positions
+Computes a full (leverage x price move) grid in one NumPy pass, including the
+liquidation boundary. The ROI grid and liquidation moves don't depend on price
+or collateral, so they are cached per (side, moves, leverages); the caller's
+exact price and collateral are applied to them on every call
+"""
+from functools import lru_cache
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+DEFAULT_LEVERAGES = (1, 2, 3, 5, 10, 15, 20, 25, 50)
+DEFAULT_MOVE_RANGE = 0.20  # +/-20% price move
+DEFAULT_STEPS = 41
+MAINTENANCE_MARGIN = 0.005  # 0.5% of position size
+
+
+def calculate_pnl_surface(side: str, current_price: float, collateral: float,
+                          price_moves: Optional[Sequence[float]] = None,
+                          leverages: Optional[Sequence[float]] = None,
+                          maintenance_margin: float = MAINTENANCE_MARGIN) -> Dict:
+    """
+    PnL and ROI for every (leverage, price move) pair.
+
+    price_moves are fractions (0.05 = +5%). Cells beyond the liquidation boundary
+    are clamped to a full loss of collateral. Nested lists that don't depend on
+    price or collateral are shared between callers - treat them as read-only.
+    """
+    if price_moves is None:
+        price_moves = np.linspace(-DEFAULT_MOVE_RANGE, DEFAULT_MOVE_RANGE, DEFAULT_STEPS)
+    if leverages is None:
+        leverages = DEFAULT_LEVERAGES
+
+    side = 'SHORT' if side.upper() == 'SHORT' else 'LONG'
+    grid = _cached_grid(
+        side,
+        tuple(round(float(m), 6) for m in price_moves),
+        tuple(float(l) for l in leverages),
+        maintenance_margin
+    )
+    current_price = float(current_price)
+    collateral = float(collateral)
+    liquidation_price = np.maximum(current_price * (1.0 + grid['liquidation_move']), 0.0)  # Below 1x a long never liquidates above 0
+
+    return {
+        'side': side,
+        'current_price': current_price,
+        'collateral': collateral,
+        'maintenance_margin': maintenance_margin,
+        'leverages': grid['leverages'],
+        'price_moves_pct': grid['price_moves_pct'],
+        'prices': np.round(current_price * (1.0 + grid['moves']), 8).tolist(),
+        'pnl': np.round(grid['roi'] * collateral, 2).tolist(),
+        'roi_pct': grid['roi_pct'],
+        'liquidated': grid['liquidated'],
+        'liquidation': {
+            'price': np.round(liquidation_price, 8).tolist(),
+            'move_pct': grid['liquidation_move_pct']
+        }
+    }
+
+
+@lru_cache(maxsize=256)
+def _cached_grid(side: str, price_moves: tuple, leverages: tuple, maintenance_margin: float) -> Dict:
+    moves = np.asarray(price_moves, dtype=np.float64)
+    leverage = np.asarray(leverages, dtype=np.float64)
+    direction = -1.0 if side == 'SHORT' else 1.0
+
+    # ROI on collateral: rows = leverage, columns = price move
+    roi = direction * np.outer(leverage, moves)
+
+    # Liquidated once equity drops to the maintenance margin of the position
+    liquidation_roi = -(1.0 - maintenance_margin * leverage)
+    liquidated = roi <= liquidation_roi[:, np.newaxis]
+    roi = np.where(liquidated, -1.0, roi)
+
+    liquidation_move = -direction * np.clip(1.0 / leverage - maintenance_margin, 0.0, None)
+
+    return {
+        'moves': moves,
+        'roi': roi,
+        'liquidation_move': liquidation_move,
+        'leverages': leverage.tolist(),
+        'price_moves_pct': np.round(moves * 100, 4).tolist(),
+        'roi_pct': np.round(roi * 100, 2).tolist(),
+        'liquidated': liquidated.tolist(),
+        'liquidation_move_pct': np.round(liquidation_move * 100, 4).tolist()
+    }
@@ -22,10 +22,19 @@ class PositionType(str, Enum):
 class PositionManager:
     def __init__(self):
         self.positions = {}  # Track positions by user_id or session_id
+        # Target daily volatility of the leveraged position (as a fraction of collateral)
+        self.target_daily_volatility = {
+            RiskLevel.CONSERVATIVE: 0.10,
+            RiskLevel.MODERATE: 0.20,
+            RiskLevel.AGGRESSIVE: 0.40
+        }
     
-    def calculate_leverage(self, risk_level: str, confidence: float, signal_strength: float) -> Dict:
+    def calculate_leverage(self, risk_level: str, confidence: float, signal_strength: float,
+                           daily_volatility: Optional[float] = None) -> Dict:
         """
         Calculate leverage based on risk level, confidence, and signal strength
+        When a daily volatility estimate is available, leverage targets a fixed
+        daily volatility of the leveraged position instead of the static table
         """
         # Base leverage by risk level
         base_leverage = {
@@ -52,12 +61,30 @@ class PositionManager:
             suggested_leverage = int(base_leverage * (0.5 + multiplier * 1.0))  # 1.5x to 6x
             max_leverage = 5
         
-        return {
-            'suggested_leverage': min(suggested_leverage, max_leverage),
-            'max_leverage': max_leverage,
+        result = {
             'base_leverage': base_leverage,
             'risk_level': risk_level
         }
+        
+        if daily_volatility and daily_volatility > 0:
+            # Volatility targeting: leverage = target position vol / realized token vol
+            # e.g. moderate (20% daily target) on a token moving 4%/day -> 5x
+            target_volatility = self.target_daily_volatility.get(
+                risk_level.lower(), self.target_daily_volatility[RiskLevel.MODERATE]
+            )
+            volatility_leverage = target_volatility / daily_volatility
+            # Weak signals only get half of the volatility budget
+            suggested_leverage = int(volatility_leverage * (0.5 + multiplier * 0.5))
+            max_leverage = max(1, min(max_leverage, int(volatility_leverage)))
+            result['daily_volatility_pct'] = round(daily_volatility * 100, 4)
+            result['target_volatility_pct'] = round(target_volatility * 100, 2)
+            result['sizing_method'] = 'volatility_target'
+        else:
+            result['sizing_method'] = 'static'
+        
+        result['suggested_leverage'] = max(1, min(suggested_leverage, max_leverage))
+        result['max_leverage'] = max_leverage
+        return result
     
     def calculate_margin_requirement(self, position_size: float, leverage: int) -> Dict:
         """
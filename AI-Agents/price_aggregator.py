@@ -0,0 +1,253 @@
+"""
+Multi-source price aggregation with hedged requests
+Quotes are fetched from several providers concurrently and combined with a
+median or a freshness-weighted average. When the primary source is slower
+than its own p95 latency the request is hedged to the other sources. Latency
+and staleness are tracked per source, and feeds that are consistently slow,
+stale or failing are dropped for a cooldown period.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from market_data import MarketDataProvider
+from rate_limiter import BudgetExceeded
+
+
+AGGREGATION_METHODS = ('median', 'freshness', 'primary')
+
+
+def quote_age_seconds(quote: Dict, now: Optional[float] = None) -> Optional[float]:
+    """Seconds since a quote's last_updated, or None if it can't be parsed"""
+    try:
+        updated = datetime.fromisoformat(str(quote.get('last_updated')).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if updated.tzinfo is None:
+        updated = updated.astimezone()  # Naive timestamps are local time
+    now = time.time() if now is None else now
+    return max(now - updated.timestamp(), 0.0)
+
+
+class SourceStats:
+    """Rolling latency / staleness window and health state for one source"""
+
+    def __init__(self, name: str, window: int = 200):
+        self.name = name
+        self.latencies = deque(maxlen=window)
+        self.ages = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.drops = 0
+        self.dropped_until = 0.0
+
+    def record(self, latency: float, ok: bool, age: Optional[float]):
+        self.requests += 1
+        self.latencies.append(latency)
+        if ok:
+            self.consecutive_failures = 0
+            if age is not None:
+                self.ages.append(age)
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+
+    def p95_latency(self, default: float) -> float:
+        return float(np.percentile(self.latencies, 95)) if len(self.latencies) >= 5 else default
+
+    def median_age(self) -> Optional[float]:
+        return float(np.median(self.ages)) if self.ages else None
+
+    def drop(self, seconds: float, reason: str):
+        """Stop using this source for a while; it is probed afresh afterwards"""
+        self.drops += 1
+        self.dropped_until = time.monotonic() + seconds
+        self.latencies.clear()
+        self.ages.clear()
+        self.consecutive_failures = 0
+        print(f"⚠️  [Price Aggregator] Dropping {self.name} for {seconds:.0f}s: {reason}")
+
+    def snapshot(self) -> Dict:
+        latencies = np.asarray(self.latencies, dtype=np.float64)
+        median_age = self.median_age()
+        return {
+            'requests': self.requests,
+            'failures': self.failures,
+            'p50_latency_ms': round(float(np.percentile(latencies, 50)) * 1000, 1) if len(latencies) else None,
+            'p95_latency_ms': round(float(np.percentile(latencies, 95)) * 1000, 1) if len(latencies) else None,
+            'median_staleness_s': round(median_age, 1) if median_age is not None else None,
+            'dropped_for_seconds': round(max(self.dropped_until - time.monotonic(), 0.0), 1),
+            'drops': self.drops
+        }
+
+
+class AggregatedMarketData(MarketDataProvider):
+    """
+    Combines several providers; the first one listed is the primary.
+    method='median' or 'freshness' queries every healthy source concurrently and
+    aggregates whatever arrives within the sources' p95 latency. method='primary'
+    uses the primary alone unless it is slow or fails, then the first hedge to answer.
+    """
+
+    def __init__(self, providers: List[MarketDataProvider], method: str = 'median',
+                 timeout: float = 5.0, default_hedge_delay: float = 1.0,
+                 max_latency: float = 3.0, max_staleness: float = 300.0,
+                 max_consecutive_failures: int = 3, drop_seconds: float = 60.0,
+                 freshness_halflife: float = 30.0):
+        if method not in AGGREGATION_METHODS:
+            raise ValueError(f"Unknown aggregation method '{method}', expected one of {AGGREGATION_METHODS}")
+        self.providers = list(providers)
+        self.method = method
+        self.name = f"aggregate({','.join(provider.name for provider in self.providers)})"
+        self.timeout = timeout  # Longest a quote request may take overall
+        self.default_hedge_delay = default_hedge_delay  # Used until a source has latency history
+        self.max_latency = max_latency  # Drop a source whose p95 latency exceeds this
+        self.max_staleness = max_staleness  # ...or whose quotes are typically older than this
+        self.max_consecutive_failures = max_consecutive_failures
+        self.drop_seconds = drop_seconds
+        self.freshness_halflife = freshness_halflife  # Quote weight halves every this many seconds of age
+
+        self.stats = {provider.name: SourceStats(provider.name) for provider in self.providers}
+        self.hedged_requests = 0
+        self._lock = threading.Lock()
+        # Slow requests keep running after a tick gives up on them, so allow a few per source
+        self._executor = ThreadPoolExecutor(max_workers=4 * len(self.providers), thread_name_prefix='price-source')
+
+    def _active_providers(self) -> List[MarketDataProvider]:
+        now = time.monotonic()
+        active = [provider for provider in self.providers if self.stats[provider.name].dropped_until <= now]
+        return active or self.providers  # Never drop every source
+
+    def _submit(self, provider: MarketDataProvider, symbol: str):
+        # Run in a copy of the caller's context so its upstream_priority applies in the worker thread
+        return self._executor.submit(contextvars.copy_context().run, self._timed_fetch, provider, symbol)
+
+    def _timed_fetch(self, provider: MarketDataProvider, symbol: str) -> Optional[Dict]:
+        """Fetch one quote, recording latency and staleness even if the tick has moved on"""
+        start = time.monotonic()
+        try:
+            quote = provider.get_token_info(symbol)
+        except BudgetExceeded:
+            raise  # Our own request budget, not the source's health
+        except Exception as e:
+            print(f"❌ [Price Aggregator] {provider.name} quote failed: {type(e).__name__}: {e}")
+            quote = None
+        latency = time.monotonic() - start
+
+        stats = self.stats[provider.name]
+        with self._lock:
+            stats.record(latency, bool(quote), quote_age_seconds(quote) if quote else None)
+            median_age = stats.median_age()
+            if stats.consecutive_failures >= self.max_consecutive_failures:
+                stats.drop(self.drop_seconds, f"{stats.consecutive_failures} consecutive failures")
+            elif len(stats.latencies) >= 20 and stats.p95_latency(0.0) > self.max_latency:
+                stats.drop(self.drop_seconds, f"p95 latency {stats.p95_latency(0.0):.2f}s")
+            elif len(stats.ages) >= 5 and median_age > self.max_staleness:
+                stats.drop(self.drop_seconds, f"quotes {median_age:.0f}s old")
+        return quote
+
+    def get_token_info(self, symbol: str) -> Optional[Dict]:
+        start = time.monotonic()
+        active = self._active_providers()
+        primary, hedges = active[0], active[1:]
+
+        pending = {self._submit(primary, symbol): primary}
+        if self.method != 'primary':
+            for provider in hedges:
+                pending[self._submit(provider, symbol)] = provider
+            hedges = []
+
+        # Give the primary until its usual worst case before hedging
+        primary_future = next(iter(pending))
+        wait([primary_future], timeout=self.stats[primary.name].p95_latency(self.default_hedge_delay))
+        if hedges and (not primary_future.done() or primary_future.exception() is not None
+                       or not primary_future.result()):
+            self.hedged_requests += 1
+            for provider in hedges:
+                pending[self._submit(provider, symbol)] = provider
+
+        # Aggregate whatever arrives while the sources are within their p95 latency;
+        # past that, only wait (up to the timeout) if nothing has arrived yet
+        deadline = start + self.timeout
+        collect_until = start + min(
+            max(self.stats[provider.name].p95_latency(self.default_hedge_delay) for provider in pending.values()),
+            self.timeout
+        )
+        results = {}
+        budget_error = None
+        remaining = set(pending)
+        while remaining:
+            until = collect_until if results else deadline
+            done, remaining = wait(remaining, timeout=max(until - time.monotonic(), 0.0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is not None:
+                    budget_error = future.exception()  # Only BudgetExceeded escapes _timed_fetch
+                    continue
+                quote = future.result()
+                if quote:
+                    results[pending[future].name] = quote
+            if results and self.method == 'primary':
+                break
+
+        if not results:
+            if budget_error is not None:
+                raise budget_error  # Surfaces as 429 with Retry-After rather than a missing token
+            return None
+        return self._aggregate(results, [provider.name for provider in active])
+
+    def _aggregate(self, results: Dict[str, Dict], order: List[str]) -> Dict:
+        """Merge quotes; non-price fields come from the highest-priority source that answered"""
+        base_name = next(name for name in order if name in results)
+        names = list(results)
+        prices = np.array([float(results[name]['price']) for name in names])
+
+        if self.method == 'freshness' and len(names) > 1:
+            ages = np.array([
+                age if age is not None else self.freshness_halflife
+                for age in (quote_age_seconds(results[name]) for name in names)
+            ])
+            weights = 0.5 ** (ages / self.freshness_halflife)
+            price = float(np.sum(weights * prices) / np.sum(weights))
+        elif self.method == 'median':
+            price = float(np.median(prices))
+        else:
+            price = float(results[base_name]['price'])
+
+        quote = dict(results[base_name])
+        quote['price'] = price
+        quote['price_sources'] = {name: float(results[name]['price']) for name in names}
+        quote['price_aggregation'] = self.method
+        return quote
+
+    def get_historical_columns(self, symbol: str, days: int = 30) -> Optional[Dict[str, np.ndarray]]:
+        """History from the first healthy source that has it"""
+        for provider in self._active_providers():
+            columns = provider.get_historical_columns(symbol, days)
+            if columns is not None:
+                return columns
+        return None
+
+    def get_trending_tokens(self) -> list:
+        for provider in self._active_providers():
+            tokens = provider.get_trending_tokens()
+            if tokens:
+                return tokens
+        return []
+
+    def source_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'provider': self.name,
+                'method': self.method,
+                'hedged_requests': self.hedged_requests,
+                'sources': {name: stats.snapshot() for name, stats in self.stats.items()}
+            }
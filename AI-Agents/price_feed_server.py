@@ -0,0 +1,118 @@
+"""
+Local stand-in for an exchange WebSocket tick feed
+Streams GBM ticks for every subscribed token at a fixed rate, in the format
+PriceStreamIngestor consumes, so streaming can be run and tested without an
+upstream exchange:
+
+    python price_feed_server.py --port 8765 --hz 10 --price APT=8.5 --price BTC=65000
+
+Every client subscribed to a token receives the same ticks and sequence numbers.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import websockets
+
+from synthetic_market import SECONDS_PER_YEAR
+
+
+class StandInPriceFeed:
+    def __init__(self, prices: Optional[Dict[str, float]] = None, hz: float = 10.0,
+                 volatility: float = 0.8, default_price: float = 100.0, seed: Optional[int] = None):
+        self.prices = {token.upper(): price for token, price in (prices or {}).items()}
+        self.hz = hz
+        self.volatility = volatility  # Annualized
+        self.default_price = default_price  # Start price for tokens not given explicitly
+        self.rng = np.random.default_rng(seed)
+        self._seq: Dict[str, int] = {}
+        self._subscriptions: Dict[object, set] = {}  # websocket -> tokens
+        self._server = None
+        self._broadcaster: Optional[asyncio.Task] = None
+
+    def next_tick(self, token: str) -> Dict:
+        dt = 1.0 / self.hz / SECONDS_PER_YEAR
+        price = self.prices.get(token, self.default_price)
+        price *= float(np.exp(-0.5 * self.volatility ** 2 * dt + self.volatility * np.sqrt(dt) * self.rng.standard_normal()))
+        self.prices[token] = price
+        self._seq[token] = self._seq.get(token, 0) + 1
+        return {
+            'type': 'tick',
+            'token': token,
+            'price': price,
+            'volume': float(self.rng.lognormal(3.0, 1.0)),
+            'seq': self._seq[token],
+            'ts': time.time()
+        }
+
+    async def handler(self, websocket):
+        tokens = self._subscriptions.setdefault(websocket, set())
+        try:
+            async for message in websocket:
+                try:
+                    request = json.loads(message)
+                except ValueError:
+                    continue
+                requested = {token.upper() for token in request.get('tokens', [])}
+                if request.get('op') == 'subscribe':
+                    tokens |= requested
+                elif request.get('op') == 'unsubscribe':
+                    tokens -= requested
+        finally:
+            self._subscriptions.pop(websocket, None)
+
+    async def _broadcast_loop(self):
+        interval = 1.0 / self.hz
+        next_at = time.monotonic()
+        while True:
+            next_at += interval
+            await asyncio.sleep(max(next_at - time.monotonic(), 0.0))
+            subscribed = set().union(*self._subscriptions.values()) if self._subscriptions else set()
+            for token in sorted(subscribed):
+                message = json.dumps(self.next_tick(token))
+                clients = [ws for ws, tokens in self._subscriptions.items() if token in tokens]
+                websockets.broadcast(clients, message)
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765):
+        self._server = await websockets.serve(self.handler, host, port)
+        self._broadcaster = asyncio.create_task(self._broadcast_loop())
+        print(f"[Stand-in Feed] Streaming at {self.hz:g} Hz on ws://{host}:{port}")
+        return self._server
+
+    async def stop(self):
+        if self._broadcaster is not None:
+            self._broadcaster.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+async def _serve_forever(feed: StandInPriceFeed, host: str, port: int):
+    await feed.start(host, port)
+    await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in WebSocket tick feed")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--hz', type=float, default=10.0, help="Ticks per second per token")
+    parser.add_argument('--volatility', type=float, default=0.8, help="Annualized volatility")
+    parser.add_argument('--price', action='append', default=[], metavar='TOKEN=PRICE',
+                        help="Start price for a token (repeatable)")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    start_prices = {}
+    for item in args.price:
+        token, _, value = item.partition('=')
+        start_prices[token] = float(value)
+
+    feed = StandInPriceFeed(start_prices, hz=args.hz, volatility=args.volatility, seed=args.seed)
+    try:
+        asyncio.run(_serve_forever(feed, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,122 @@
+"""
+Streaming price ingestion
+Consumes a WebSocket tick feed into the shared PriceTable, reconnecting with
+backoff. Tick format (one object or a JSON array of them per message):
+    {"type": "tick", "token": "APT", "price": 8.51, "volume": 120.0, "seq": 42, "ts": 1700000000.12}
+Subscriptions are sent as {"op": "subscribe", "tokens": ["APT", ...]}.
+See price_feed_server.py for a local stand-in feed.
+"""
+import asyncio
+import json
+import time
+from typing import Callable, List, Optional
+
+import websockets
+
+from price_table import PriceTable
+
+
+class PriceStreamIngestor:
+    def __init__(self, url: str, price_table: PriceTable, source: str = 'stream',
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self.url = url
+        self.price_table = price_table
+        self.source = source
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.tokens = set()
+        self._listeners: List[Callable] = []
+        self._websocket = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'ticks': 0, 'reconnects': 0, 'bad_messages': 0, 'last_latency_ms': None}
+
+    @property
+    def connected(self) -> bool:
+        return self._websocket is not None
+
+    def add_tick_listener(self, callback: Callable):
+        """callback(token, price, volume, timestamp) for every accepted tick"""
+        self._listeners.append(callback)
+
+    async def subscribe(self, *tokens: str):
+        new_tokens = {token.upper() for token in tokens} - self.tokens
+        if not new_tokens:
+            return
+        self.tokens |= new_tokens
+        if self._websocket is not None:
+            try:
+                await self._websocket.send(json.dumps({'op': 'subscribe', 'tokens': sorted(new_tokens)}))
+            except websockets.ConnectionClosed:
+                pass  # Resubscribed to everything on reconnect
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with websockets.connect(self.url) as websocket:
+                    # Upstream sequence numbers may restart with a new connection
+                    self.price_table.reset_feed(self.source)
+                    self._websocket = websocket
+                    delay = self.reconnect_delay
+                    print(f"[Price Stream] Connected to {self.url}")
+                    if self.tokens:
+                        await websocket.send(json.dumps({'op': 'subscribe', 'tokens': sorted(self.tokens)}))
+                    async for message in websocket:
+                        self._handle(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  [Price Stream] {type(e).__name__}: {e} - reconnecting in {delay:.0f}s")
+            finally:
+                self._websocket = None
+            self.stats['reconnects'] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _handle(self, message):
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            self.stats['bad_messages'] += 1
+            return
+
+        received_at = time.time()
+        for tick in payload if isinstance(payload, list) else [payload]:
+            if not isinstance(tick, dict) or tick.get('type') != 'tick':
+                continue
+            try:
+                entry = self.price_table.update(
+                    tick['token'], float(tick['price']), received_at, self.source, tick.get('seq')
+                )
+            except (KeyError, TypeError, ValueError):
+                self.stats['bad_messages'] += 1
+                continue
+            if entry is None:
+                continue
+
+            self.stats['ticks'] += 1
+            if tick.get('ts'):
+                self.stats['last_latency_ms'] = round((received_at - float(tick['ts'])) * 1000, 1)
+            for callback in self._listeners:
+                callback(entry['token'], entry['price'], float(tick.get('volume') or 0.0), received_at)
+
+    def snapshot(self) -> dict:
+        return {
+            'url': self.url,
+            'connected': self.connected,
+            'tokens': sorted(self.tokens),
+            **self.stats
+        }
@@ -0,0 +1,82 @@
+"""
+Shared in-memory last-price table
+One entry per token, with a sequence number that increases on every write.
+Price feeds (the WebSocket stream, the live synthesizer) write to it; every
+session, the SL/TP path and the polling endpoints read from it.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+
+class PriceTable:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prices: Dict[str, Dict] = {}  # TOKEN -> latest entry
+        self._feed_seq: Dict[tuple, int] = {}  # (TOKEN, source) -> last upstream sequence number
+        self.stats = {'updates': 0, 'duplicates': 0, 'gaps': 0}
+
+    def update(self, token: str, price: float, timestamp: Optional[float] = None,
+               source: str = 'stream', feed_seq: Optional[int] = None) -> Optional[Dict]:
+        """
+        Write a price. feed_seq is the upstream's own sequence number: repeated or
+        out-of-order messages are dropped and skipped numbers are counted as gaps.
+        Returns the new entry, or None if the write was dropped.
+        """
+        if not price or price <= 0:
+            return None
+        token = token.upper()
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self._lock:
+            if feed_seq is not None:
+                key = (token, source)
+                last = self._feed_seq.get(key)
+                if last is not None:
+                    if feed_seq <= last:
+                        self.stats['duplicates'] += 1
+                        return None
+                    self.stats['gaps'] += feed_seq - last - 1
+                self._feed_seq[key] = feed_seq
+
+            previous = self._prices.get(token)
+            entry = {
+                'token': token,
+                'price': float(price),
+                'timestamp': timestamp,
+                'source': source,
+                'seq': previous['seq'] + 1 if previous else 1,
+                'feed_seq': feed_seq
+            }
+            self._prices[token] = entry
+            self.stats['updates'] += 1
+            return entry
+
+    def reset_feed(self, source: str):
+        """Forget upstream sequence numbers for a source (e.g. after a reconnect)"""
+        with self._lock:
+            for key in [key for key in self._feed_seq if key[1] == source]:
+                del self._feed_seq[key]
+
+    def get(self, token: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """Latest entry for a token, or None if there is none (or it is older than max_age seconds)"""
+        entry = self._prices.get(token.upper())
+        if entry is None or (max_age is not None and time.time() - entry['timestamp'] > max_age):
+            return None
+        return dict(entry)
+
+    def snapshot(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            return {
+                'tokens': {
+                    token: {
+                        'price': entry['price'],
+                        'age_seconds': round(now - entry['timestamp'], 3),
+                        'seq': entry['seq'],
+                        'source': entry['source']
+                    }
+                    for token, entry in self._prices.items()
+                },
+                **self.stats
+            }
@@ -0,0 +1,208 @@
+"""
+Shared upstream request budgets (CoinMarketCap, CoinGecko, OpenAI)
+Every client draws from one token bucket per provider. Callers waiting for a
+token are served in priority order: position-critical refreshes first,
+background agent iterations next, one-shot dashboard requests last.
+"""
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class Priority(IntEnum):
+    POSITION_CRITICAL = 0  # Open positions - SL/TP checks need a fresh price
+    AGENT = 1  # Agent iterations without an open position
+    DASHBOARD = 2  # One-shot analysis and chart requests
+    BACKGROUND = 3  # Index refreshes and other housekeeping
+
+
+# Longest a caller waits for a token before the request is rejected
+MAX_WAIT_SECONDS = {
+    Priority.POSITION_CRITICAL: 10.0,
+    Priority.AGENT: 5.0,
+    Priority.DASHBOARD: 2.0,
+    Priority.BACKGROUND: 120.0,
+}
+
+# Share of the bucket a priority may not drain, kept for the priorities above it
+RESERVED_FRACTION = {
+    Priority.POSITION_CRITICAL: 0.0,
+    Priority.AGENT: 0.0,
+    Priority.DASHBOARD: 0.2,
+    Priority.BACKGROUND: 0.5,
+}
+
+# Provider -> (env var, default requests per minute)
+DEFAULT_LIMITS = {
+    'cmc': ('CMC_RATE_LIMIT_PER_MINUTE', 30),
+    'coingecko': ('COINGECKO_RATE_LIMIT_PER_MINUTE', 25),
+    'openai': ('OPENAI_RATE_LIMIT_PER_MINUTE', 60),
+}
+
+_current_priority = contextvars.ContextVar('upstream_priority', default=Priority.AGENT)
+
+
+@contextmanager
+def upstream_priority(priority: Priority):
+    """Run upstream calls in this context (and threads started with asyncio.to_thread) at `priority`"""
+    token = _current_priority.set(Priority(priority))
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+
+def retry_after_seconds(headers, default: float = 60.0) -> float:
+    """Seconds from a Retry-After header, or `default` if it is missing or not a number"""
+    try:
+        return max(float(headers.get('Retry-After')), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, name: str, priority: Priority, retry_after: float):
+        self.name = name
+        self.priority = priority
+        self.retry_after = retry_after
+        super().__init__(f"{name} request budget exhausted for {priority.name} requests (retry in {retry_after:.1f}s)")
+
+
+class UpstreamBudget:
+    def __init__(self, name: str, requests_per_minute: float, burst: Optional[float] = None,
+                 max_wait: Optional[Dict[Priority, float]] = None,
+                 reserved_fraction: Optional[Dict[Priority, float]] = None, metrics_window: int = 500):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(requests_per_minute / 6.0, 1.0)  # ~10s of traffic
+        self.max_wait = dict(MAX_WAIT_SECONDS if max_wait is None else max_wait)
+        self.reserved_fraction = dict(RESERVED_FRACTION if reserved_fraction is None else reserved_fraction)
+
+        self._cond = threading.Condition()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0  # Set after an upstream 429
+        self._waiters = []  # Heap of (priority, sequence) - the head is served next
+        self._sequence = itertools.count()
+        self._throttled_responses = 0
+        self._metrics = {
+            priority: {'granted': 0, 'rejected': 0, 'total_wait': 0.0, 'max_wait': 0.0,
+                       'recent_waits': deque(maxlen=metrics_window)}
+            for priority in Priority
+        }
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: Optional[Priority] = None, cost: float = 1.0) -> float:
+        """
+        Take `cost` tokens, blocking until it's this caller's turn.
+        Returns the seconds spent queueing; raises BudgetExceeded if the wait
+        would exceed the priority's limit.
+        """
+        priority = current_priority() if priority is None else Priority(priority)
+        needed = min(cost + self.reserved_fraction[priority] * self.capacity, self.capacity)
+        max_wait = self.max_wait[priority]
+        start = time.monotonic()
+        entry = (priority, next(self._sequence))
+
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    at_head = self._waiters[0] == entry
+                    if at_head and now >= self._blocked_until and self._tokens >= needed:
+                        self._tokens -= cost
+                        waited = now - start
+                        self._record(priority, waited)
+                        return waited
+
+                    # Time until the bucket could serve us if we were next in line
+                    wait = max((needed - self._tokens) / self.rate, self._blocked_until - now, 0.0)
+                    elapsed = now - start
+                    if elapsed >= max_wait or (at_head and elapsed + wait > max_wait):
+                        self._metrics[priority]['rejected'] += 1
+                        raise BudgetExceeded(self.name, priority, wait)
+                    self._cond.wait(timeout=min(max(wait, 0.01), max_wait - elapsed))
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()  # The next waiter may now be at the head
+
+    def penalize(self, retry_after: float):
+        """Upstream answered 429 - stop granting tokens until it says we may retry"""
+        with self._cond:
+            self._throttled_responses += 1
+            self._tokens = 0.0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        print(f"⚠️  [Budget] {self.name} returned 429, pausing requests for {retry_after:.0f}s")
+
+    def _record(self, priority: Priority, waited: float):
+        metrics = self._metrics[priority]
+        metrics['granted'] += 1
+        metrics['total_wait'] += waited
+        metrics['max_wait'] = max(metrics['max_wait'], waited)
+        metrics['recent_waits'].append(waited)
+
+    def snapshot(self) -> Dict:
+        """Queueing delay and rejection metrics per priority"""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            by_priority = {}
+            for priority, metrics in self._metrics.items():
+                recent = np.asarray(metrics['recent_waits'], dtype=np.float64)
+                granted = metrics['granted']
+                by_priority[priority.name.lower()] = {
+                    'granted': granted,
+                    'rejected': metrics['rejected'],
+                    'avg_wait_ms': round(metrics['total_wait'] / granted * 1000, 1) if granted else 0.0,
+                    'p95_wait_ms': round(float(np.percentile(recent, 95)) * 1000, 1) if len(recent) else 0.0,
+                    'max_wait_ms': round(metrics['max_wait'] * 1000, 1)
+                }
+            return {
+                'requests_per_minute': self.requests_per_minute,
+                'burst': round(self.capacity, 2),
+                'tokens_available': round(self._tokens, 2),
+                'queued': len(self._waiters),
+                'paused_for_seconds': round(max(self._blocked_until - now, 0.0), 1),
+                'upstream_429s': self._throttled_responses,
+                'by_priority': by_priority
+            }
+
+
+_budgets: Dict[str, UpstreamBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_budget(name: str) -> UpstreamBudget:
+    """Process-wide budget for a provider, created from the environment on first use"""
+    with _budgets_lock:
+        budget = _budgets.get(name)
+        if budget is None:
+            env_var, default = DEFAULT_LIMITS[name]
+            budget = UpstreamBudget(name, float(os.getenv(env_var, default)))
+            _budgets[name] = budget
+        return budget
+
+
+def budget_snapshot() -> Dict[str, Dict]:
+    """Metrics for every provider"""
+    return {name: get_budget(name).snapshot() for name in DEFAULT_LIMITS}
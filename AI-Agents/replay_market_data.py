@@ -0,0 +1,198 @@
+"""
+Recorded market data and local replay
+RecordingMarketData wraps a live provider and writes every quote, history
+window and trending list to disk. ReplayMarketData serves them back at a
+configurable speed with no network access and no API keys, so load tests and
+CI can drive the full pipeline at high tick rates.
+
+Layout under the recording root:
+    quotes/<SYMBOL>.jsonl       one {"recorded_at": <unix seconds>, "quote": {...}} per line
+    history/<SYMBOL>_<days>d.npz  OHLCV columns (timestamp, open, high, low, close, volume)
+    trending.json
+"""
+import glob
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+from market_data import MarketDataProvider, OHLCV_COLUMNS
+from synthetic_market import generate_ohlcv
+
+
+def _quote_path(root: str, symbol: str) -> str:
+    return os.path.join(root, 'quotes', f"{symbol.upper()}.jsonl")
+
+
+def _history_path(root: str, symbol: str, days: int) -> str:
+    return os.path.join(root, 'history', f"{symbol.upper()}_{days}d.npz")
+
+
+class RecordingMarketData(MarketDataProvider):
+    """Pass-through provider that records every successful response for replay"""
+
+    def __init__(self, provider: MarketDataProvider, root: str = 'data/replay'):
+        self.provider = provider
+        self.root = root
+        self.name = f"{provider.name}+recording"
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, 'quotes'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'history'), exist_ok=True)
+
+    def get_token_info(self, symbol: str) -> Optional[Dict]:
+        quote = self.provider.get_token_info(symbol)
+        if quote:
+            line = json.dumps({'recorded_at': time.time(), 'quote': quote})
+            with self._lock, open(_quote_path(self.root, symbol), 'a') as f:
+                f.write(line + '\n')
+        return quote
+
+    def get_historical_columns(self, symbol: str, days: int = 30) -> Optional[Dict[str, np.ndarray]]:
+        columns = self.provider.get_historical_columns(symbol, days)
+        if columns is not None and len(columns['timestamp']):
+            path = _history_path(self.root, symbol, days)
+            tmp_path = f"{path}.tmp"
+            with self._lock:
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, **{name: columns[name] for name in OHLCV_COLUMNS})
+                os.replace(tmp_path, path)
+        return columns
+
+    def get_trending_tokens(self) -> list:
+        tokens = self.provider.get_trending_tokens()
+        if tokens:
+            with self._lock, open(os.path.join(self.root, 'trending.json'), 'w') as f:
+                json.dump(tokens, f)
+        return tokens
+
+    def source_stats(self) -> Dict:
+        return self.provider.source_stats()
+
+
+class ReplayMarketData(MarketDataProvider):
+    """
+    Serves recorded responses from disk.
+    speed scales the replay clock (10 = ten times faster than recorded);
+    speed 0 steps to the next recorded quote on every call, for maximum tick rate.
+    """
+    name = 'replay'
+
+    def __init__(self, root: str = 'data/replay', speed: float = 1.0, loop: bool = True):
+        self.root = root
+        self.speed = speed
+        self.loop = loop  # Start over when the recording runs out
+        self._lock = threading.Lock()
+        self._quotes: Dict[str, tuple] = {}  # SYMBOL -> (recorded_at array, quotes)
+        self._started: Dict[str, float] = {}  # SYMBOL -> monotonic time the replay started
+        self._cursors: Dict[str, int] = {}  # SYMBOL -> next quote index (speed 0)
+        self._history: Dict[str, Dict[str, np.ndarray]] = {}  # path -> recorded columns
+
+    def _load_quotes(self, symbol: str) -> Optional[tuple]:
+        if symbol in self._quotes:
+            return self._quotes[symbol]
+
+        entries = []
+        try:
+            with open(_quote_path(self.root, symbol)) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        entries.append((float(entry['recorded_at']), entry['quote']))
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Torn or malformed line
+        except OSError:
+            pass
+
+        loaded = None
+        if entries:
+            entries.sort(key=lambda entry: entry[0])
+            loaded = (np.array([entry[0] for entry in entries]), [entry[1] for entry in entries])
+            print(f"[Replay] Loaded {len(entries)} recorded quotes for {symbol}")
+        self._quotes[symbol] = loaded
+        return loaded
+
+    def get_token_info(self, symbol: str) -> Optional[Dict]:
+        symbol = symbol.upper()
+        with self._lock:
+            loaded = self._load_quotes(symbol)
+            if loaded is None:
+                print(f"⚠️  No recorded quotes for '{symbol}' under {self.root}")
+                return None
+            recorded_at, quotes = loaded
+
+            if self.speed <= 0:
+                index = self._cursors.get(symbol, 0)
+                self._cursors[symbol] = index + 1
+            else:
+                started = self._started.setdefault(symbol, time.monotonic())
+                offset = (time.monotonic() - started) * self.speed
+                span = recorded_at[-1] - recorded_at[0]
+                if self.loop and span > 0:
+                    offset %= span
+                index = int(np.searchsorted(recorded_at, recorded_at[0] + offset, side='right')) - 1
+            index = index % len(quotes) if self.loop else min(index, len(quotes) - 1)
+
+        quote = dict(quotes[index])
+        quote['last_updated'] = datetime.now().isoformat()  # Replayed quotes are "live" now
+        return quote
+
+    def _recorded_history(self, symbol: str, days: int) -> Optional[Dict[str, np.ndarray]]:
+        """Recorded window for `days`, or the shortest longer one"""
+        path = _history_path(self.root, symbol, days)
+        if not os.path.exists(path):
+            pattern = re.compile(rf"{re.escape(symbol.upper())}_(\d+)d\.npz$")
+            longer = []
+            for candidate in glob.glob(os.path.join(self.root, 'history', f"{symbol.upper()}_*d.npz")):
+                match = pattern.search(candidate)
+                if match and int(match.group(1)) >= days:
+                    longer.append((int(match.group(1)), candidate))
+            if not longer:
+                return None
+            path = min(longer)[1]
+
+        if path not in self._history:
+            with np.load(path) as data:
+                self._history[path] = {name: data[name] for name in OHLCV_COLUMNS}
+        return self._history[path]
+
+    def get_historical_columns(self, symbol: str, days: int = 30) -> Optional[Dict[str, np.ndarray]]:
+        now = time.time()
+        recorded = self._recorded_history(symbol, days)
+        if recorded is not None and len(recorded['timestamp']):
+            timestamps = recorded['timestamp']
+            # Shift by whole bars so the recording ends now, then trim to the window
+            interval = float(timestamps[1] - timestamps[0]) if len(timestamps) > 1 else 3600.0
+            shift = np.floor((now - timestamps[-1]) / interval) * interval
+            shifted = timestamps + shift
+            keep = shifted >= now - days * 86400
+            columns = {name: recorded[name][keep] for name in OHLCV_COLUMNS}
+            columns['timestamp'] = shifted[keep]
+            return columns
+
+        # Nothing recorded: synthesize around the replayed price, deterministic per symbol
+        quote = self.get_token_info(symbol)
+        if not quote:
+            return None
+        interval_hours = 1 if days <= 7 else 24
+        return generate_ohlcv(
+            days * (24 // interval_hours) + 1,
+            quote['price'],
+            process='random_walk',
+            interval_seconds=interval_hours * 3600,
+            end_time=now,
+            seed=zlib.crc32(symbol.upper().encode()),
+            anchor='end'
+        )
+
+    def get_trending_tokens(self) -> list:
+        try:
+            with open(os.path.join(self.root, 'trending.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
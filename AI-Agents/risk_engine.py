@@ -0,0 +1,126 @@
+"""
+Monte Carlo liquidation / VaR engine for open perp positions
+Simulates GBM log-price paths seeded from realized volatility with NumPy and
+caches the path statistics per (token, horizon). New prices only re-price the
+cached paths against the position's barriers, which is O(n_paths).
+"""
+import math
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from pnl_surface import MAINTENANCE_MARGIN
+
+
+DEFAULT_DAILY_VOLATILITY = 0.05  # Used until the volatility tracker has enough ticks
+
+
+class MonteCarloRiskEngine:
+    def __init__(self, n_paths: int = 10000, steps: int = 120,
+                 resimulate_volatility_change: float = 0.2,
+                 max_path_age_seconds: float = 300.0, seed: Optional[int] = None):
+        self.n_paths = n_paths
+        self.steps = steps
+        self.resimulate_volatility_change = resimulate_volatility_change
+        self.max_path_age_seconds = max_path_age_seconds
+        self.rng = np.random.default_rng(seed)
+        self._paths: Dict[Tuple[str, int], Dict] = {}  # (token, horizon_minutes) -> path stats
+
+    def _get_paths(self, token: str, horizon_minutes: int, daily_volatility: float) -> Dict:
+        """
+        Cached path statistics (running min/max and terminal log return per path).
+        Re-simulated only when volatility moves materially or the paths get old.
+        """
+        key = (token, horizon_minutes)
+        cached = self._paths.get(key)
+        now = time.time()
+        if cached:
+            volatility_change = abs(daily_volatility / cached['daily_volatility'] - 1.0)
+            age = now - cached['simulated_at']
+            if volatility_change < self.resimulate_volatility_change and age < self.max_path_age_seconds:
+                return cached
+
+        dt_days = horizon_minutes / 1440.0 / self.steps
+        step_sigma = daily_volatility * math.sqrt(dt_days)
+        shocks = self.rng.standard_normal((self.n_paths, self.steps), dtype=np.float32)
+        log_paths = np.cumsum(shocks * step_sigma - 0.5 * step_sigma * step_sigma, axis=1)
+
+        paths = {
+            'daily_volatility': daily_volatility,
+            'simulated_at': now,
+            'running_max': np.maximum(log_paths.max(axis=1), 0.0),
+            'running_min': np.minimum(log_paths.min(axis=1), 0.0),
+            'terminal': log_paths[:, -1]
+        }
+        self._paths[key] = paths
+        return paths
+
+    def estimate(self, position: Dict, current_price: float, daily_volatility: Optional[float],
+                 horizon_minutes: int = 60, stop_loss_roi: float = -30.0,
+                 take_profit_roi: float = 50.0, confidence: float = 0.95) -> Dict:
+        """
+        Risk of an open position over a horizon.
+
+        Hit probabilities are touch probabilities (the barrier is reached at any
+        point within the horizon). VaR / expected shortfall are on the horizon PnL
+        in USD, with liquidated paths losing the full collateral.
+        """
+        entry_price = position.get('entry_price', 0)
+        leverage = position.get('leverage', 1) or 1
+        collateral = position.get('collateral', 0)
+        is_short = position.get('type') == 'SHORT'
+
+        volatility_source = 'realized'
+        if not daily_volatility:
+            daily_volatility = DEFAULT_DAILY_VOLATILITY
+            volatility_source = 'default'
+
+        paths = self._get_paths(position.get('token', ''), horizon_minutes, daily_volatility)
+        running_max = paths['running_max']
+        running_min = paths['running_min']
+
+        # Barriers as price moves from entry, converted to log distance from the current price
+        stop_move = stop_loss_roi / 100 / leverage
+        take_move = take_profit_roi / 100 / leverage
+        liquidation_move = max(1.0 / leverage - MAINTENANCE_MARGIN, 1e-9)
+        price_ratio = entry_price / current_price
+
+        def log_barrier(move: float) -> float:
+            level = price_ratio * (1.0 + move)
+            return math.log(level) if level > 0 else -math.inf
+
+        if is_short:
+            stop_hit = running_max >= log_barrier(-stop_move)
+            take_hit = running_min <= log_barrier(-take_move)
+            liquidated = running_max >= log_barrier(liquidation_move)
+        else:
+            stop_hit = running_min <= log_barrier(stop_move)
+            take_hit = running_max >= log_barrier(take_move)
+            liquidated = running_min <= log_barrier(-liquidation_move)
+
+        # Horizon PnL per path
+        terminal_move = np.exp(paths['terminal']) / price_ratio - 1.0
+        direction = -1.0 if is_short else 1.0
+        pnl = collateral * leverage * direction * terminal_move
+        pnl = np.where(liquidated, -collateral, np.maximum(pnl, -collateral))
+
+        tail_quantile = np.quantile(pnl, 1.0 - confidence)
+        tail = pnl[pnl <= tail_quantile]
+        expected_shortfall = -float(tail.mean()) if tail.size else -float(tail_quantile)
+
+        return {
+            'horizon_minutes': horizon_minutes,
+            'paths': self.n_paths,
+            'daily_volatility_pct': round(daily_volatility * 100, 4),
+            'volatility_source': volatility_source,
+            'prob_stop_loss': round(float(stop_hit.mean()), 4),
+            'prob_take_profit': round(float(take_hit.mean()), 4),
+            'prob_liquidation': round(float(liquidated.mean()), 4),
+            'confidence': confidence,
+            'var_usd': round(-float(tail_quantile), 2),
+            'expected_shortfall_usd': round(expected_shortfall, 2),
+            'expected_pnl_usd': round(float(pnl.mean()), 2),
+            'simulated_at': datetime.fromtimestamp(paths['simulated_at']).isoformat()
+        }
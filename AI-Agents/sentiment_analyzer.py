@@ -2,15 +2,21 @@
 OpenAI-powered sentiment analysis for tokens
 """
 import os
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
 from typing import Dict, Optional
 import json
 import httpx
 from datetime import datetime
 
+from rate_limiter import get_budget, retry_after_seconds
+
 
 class SentimentAnalyzer:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: Optional[str]):
+        if not api_key:
+            # No key (offline runs, load tests, CI) - see _momentum_sentiment
+            self.client = None
+            return
         # Create httpx client without proxies to avoid compatibility issues
         http_client = httpx.Client(
             timeout=60.0,
@@ -23,6 +29,9 @@ class SentimentAnalyzer:
         """
         Analyze sentiment for a token based on market data and generate insights
         """
+        if self.client is None:
+            return self._momentum_sentiment(market_data)
+        
         try:
             import time
             request_start = time.time()
@@ -72,6 +81,8 @@ class SentimentAnalyzer:
             openai_model = model_mapping.get(model, "gpt-4o")  # Default to gpt-4o
             
             # Try with response_format first, fallback to parsing JSON from text
+            budget = get_budget('openai')
+            budget.acquire()
             try:
                 response = self.client.chat.completions.create(
                     model=openai_model,  # Use mapped model identifier
@@ -82,9 +93,13 @@ class SentimentAnalyzer:
                     temperature=0.7,  # Increased temperature for more variation in responses
                     response_format={"type": "json_object"}
                 )
+            except RateLimitError as e:
+                budget.penalize(retry_after_seconds(e.response.headers))
+                raise
             except Exception as format_error:
                 # Fallback: Use model without response_format and parse JSON from text
                 print(f"[OpenAI API] response_format not supported, using text parsing fallback: {format_error}")
+                budget.acquire()
                 response = self.client.chat.completions.create(
                     model="gpt-4o",
                     messages=[
@@ -123,6 +138,25 @@ class SentimentAnalyzer:
                 "reasoning": f"Error occurred: {str(e)}"
             }
     
+    def _momentum_sentiment(self, market_data: Dict) -> Dict:
+        """Deterministic sentiment from price momentum, used when OpenAI is not configured"""
+        change_1h = market_data.get('percent_change_1h', 0) or 0
+        change_24h = market_data.get('percent_change_24h', 0) or 0
+        change_7d = market_data.get('percent_change_7d', 0) or 0
+        
+        def clamp(score):
+            return max(-100.0, min(100.0, score))
+        
+        abs_24h = abs(change_24h)
+        return {
+            "overall_sentiment": clamp(5 * change_1h + 3 * change_24h + change_7d),
+            "short_term_sentiment": clamp(10 * change_1h + change_24h),
+            "medium_term_sentiment": clamp(4 * change_24h + change_7d),
+            "key_factors": [f"1h change {change_1h:+.2f}%", f"24h change {change_24h:+.2f}%", f"7d change {change_7d:+.2f}%"],
+            "risk_level": "High" if abs_24h > 10 else "Medium" if abs_24h > 3 else "Low",
+            "reasoning": "OpenAI not configured - sentiment derived from price momentum"
+        }
+    
     def get_trading_recommendation(self, sentiment_data: Dict, 
                                    market_data: Dict) -> str:
         """
@@ -0,0 +1,143 @@
+"""
+Quantitative position sizing algorithms selectable via `quant_algo`
+(e.g. "Kelly Criterion"). Each algorithm maps cached per-token inputs to the
+fraction of the portfolio committed as collateral.
+"""
+from typing import Callable, Dict, Optional
+
+
+# Registry of sizing algorithms keyed by normalized name
+SIZING_ALGORITHMS: Dict[str, Callable[[Dict, str], Optional[float]]] = {}
+
+# Target daily PnL volatility of the whole portfolio for volatility targeting
+PORTFOLIO_TARGET_VOLATILITY = {
+    'conservative': 0.02,
+    'moderate': 0.05,
+    'aggressive': 0.10
+}
+
+
+def _normalize_name(name: str) -> str:
+    return ' '.join(name.lower().replace('-', ' ').replace('_', ' ').split())
+
+
+def register_sizing_algorithm(*names: str):
+    """Decorator registering a sizing algorithm under one or more display names"""
+    def decorator(func):
+        for name in names:
+            SIZING_ALGORITHMS[_normalize_name(name)] = func
+        return func
+    return decorator
+
+
+def get_sizing_algorithm(name: Optional[str]) -> Optional[Callable[[Dict, str], Optional[float]]]:
+    """Look up a sizing algorithm by name; returns None for unknown or empty names"""
+    if not name:
+        return None
+    return SIZING_ALGORITHMS.get(_normalize_name(name))
+
+
+@register_sizing_algorithm('Kelly Criterion', 'Kelly')
+def kelly_fraction(inputs: Dict, risk_level: str) -> Optional[float]:
+    """Full Kelly: f* = p - (1 - p) / b"""
+    win_rate = inputs['win_rate']
+    payoff_ratio = inputs['payoff_ratio']
+    if payoff_ratio <= 0:
+        return 0.0
+    return max(0.0, min(win_rate - (1.0 - win_rate) / payoff_ratio, 1.0))
+
+
+@register_sizing_algorithm('Fractional Kelly', 'Half Kelly')
+def fractional_kelly_fraction(inputs: Dict, risk_level: str) -> Optional[float]:
+    """Half Kelly - gives up ~25% of growth for ~50% less drawdown"""
+    return kelly_fraction(inputs, risk_level) * 0.5
+
+
+@register_sizing_algorithm('Volatility Targeting', 'Volatility Target', 'Vol Target')
+def volatility_target_fraction(inputs: Dict, risk_level: str) -> Optional[float]:
+    """Size so the leveraged position contributes a fixed daily portfolio volatility"""
+    daily_volatility = inputs.get('daily_volatility')
+    leverage = inputs.get('leverage') or 1
+    if not daily_volatility:
+        return None  # Not enough ticks yet - no opinion
+    target = PORTFOLIO_TARGET_VOLATILITY.get(risk_level.lower(), PORTFOLIO_TARGET_VOLATILITY['moderate'])
+    return max(0.0, min(target / (daily_volatility * leverage), 1.0))
+
+
+class SizingInputCache:
+    """
+    Per-token sizing inputs (win rate, payoff ratio) maintained incrementally.
+    Trade results are folded in when positions close, so reading inputs on the
+    tick path is O(1). Counts are shrunk towards a prior until enough trades exist.
+    """
+
+    def __init__(self, prior_trades: int = 10, prior_win_rate: float = 0.5):
+        self.prior_trades = prior_trades
+        self.prior_win_rate = prior_win_rate
+        self._stats: Dict[str, Dict] = {}
+
+    def record_trade(self, token: str, roi_pct: float):
+        """Fold a closed trade's ROI (% of collateral) into the token's statistics"""
+        stats = self._stats.setdefault(token, {
+            'wins': 0, 'losses': 0, 'win_roi_sum': 0.0, 'loss_roi_sum': 0.0
+        })
+        if roi_pct > 0:
+            stats['wins'] += 1
+            stats['win_roi_sum'] += roi_pct
+        else:
+            stats['losses'] += 1
+            stats['loss_roi_sum'] += abs(roi_pct)
+
+    def get_inputs(self, token: str, take_profit_roi: float, stop_loss_roi: float,
+                   daily_volatility: Optional[float] = None, leverage: int = 1) -> Dict:
+        """
+        Sizing inputs for a token. The session's TP/SL levels act as the prior
+        average win/loss until real trades accumulate.
+        """
+        stats = self._stats.get(token, {'wins': 0, 'losses': 0, 'win_roi_sum': 0.0, 'loss_roi_sum': 0.0})
+        wins, losses = stats['wins'], stats['losses']
+        prior = self.prior_trades
+
+        win_rate = (wins + prior * self.prior_win_rate) / (wins + losses + prior)
+
+        prior_win = max(abs(take_profit_roi), 1e-9)
+        prior_loss = max(abs(stop_loss_roi), 1e-9)
+        avg_win = (stats['win_roi_sum'] + prior * prior_win) / (wins + prior)
+        avg_loss = (stats['loss_roi_sum'] + prior * prior_loss) / (losses + prior)
+
+        return {
+            'win_rate': win_rate,
+            'payoff_ratio': avg_win / avg_loss,
+            'daily_volatility': daily_volatility,
+            'leverage': leverage,
+            'trades': wins + losses
+        }
+
+
+def size_position(quant_algo: Optional[str], portfolio_amount: float,
+                  inputs: Dict, risk_level: str) -> Dict:
+    """
+    Apply the requested sizing algorithm to the portfolio amount.
+    Unknown algorithms (or algorithms without an opinion yet) commit the full amount,
+    which matches the behaviour before quant_algo was honoured.
+    """
+    algorithm = get_sizing_algorithm(quant_algo)
+    fraction = algorithm(inputs, risk_level) if algorithm else None
+
+    if fraction is None:
+        return {
+            'algorithm': quant_algo,
+            'applied': False,
+            'fraction': 1.0,
+            'collateral': round(portfolio_amount, 2)
+        }
+
+    return {
+        'algorithm': quant_algo,
+        'applied': True,
+        'fraction': round(fraction, 4),
+        'collateral': round(portfolio_amount * fraction, 2),
+        'win_rate': round(inputs['win_rate'], 4),
+        'payoff_ratio': round(inputs['payoff_ratio'], 4),
+        'trades': inputs['trades']
+    }
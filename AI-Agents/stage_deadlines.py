@@ -0,0 +1,104 @@
+"""
+Per-stage deadlines for the analysis pipeline
+Each stage (market, sentiment, on-chain, decision) runs as a task under the
+smaller of its own deadline and what is left of the iteration's latency
+budget. A stage that misses its deadline keeps running in the background and
+its result lands in the stage cache for the next iteration; this iteration
+uses the last cached value instead and reports it as stale. A stage with
+nothing cached yet is awaited in full. Identical stage work from concurrent
+sessions (same stage, key and upstream priority) shares one task; the task
+runs with its creator's priority, so a lower class is never joined.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from rate_limiter import current_priority
+
+
+DEFAULT_STAGE_DEADLINES = {'market': 0.5, 'sentiment': 0.5, 'onchain': 0.2, 'decision': 0.1}
+
+
+class StageDeadlines:
+    def __init__(self, budget: float = 0.8, deadlines: Optional[Dict[str, float]] = None):
+        self.budget = budget  # Seconds per analysis iteration across all stages
+        self.deadlines = dict(DEFAULT_STAGE_DEADLINES if deadlines is None else deadlines)
+        self._cache: Dict[tuple, tuple] = {}  # (stage, key) -> (completed_at, value)
+        self._inflight: Dict[tuple, asyncio.Task] = {}  # (stage, key, priority) -> task
+        self.stats = {stage: {'on_time': 0, 'fallbacks': 0, 'waited_uncached': 0} for stage in self.deadlines}
+
+    def iteration(self) -> 'AnalysisIteration':
+        return AnalysisIteration(self)
+
+    def _completed(self, full_key: tuple, inflight_key: tuple, task: asyncio.Task):
+        if self._inflight.get(inflight_key) is task:
+            del self._inflight[inflight_key]
+        if task.cancelled() or task.exception() is not None:
+            return  # The awaiting iteration (if any) sees the error; keep the last good value
+        self._cache[full_key] = (time.time(), task.result())
+
+    def snapshot(self) -> dict:
+        return {
+            'budget_seconds': self.budget,
+            'deadlines': self.deadlines,
+            'in_flight': len(self._inflight),
+            'stages': self.stats
+        }
+
+
+class AnalysisIteration:
+    """Deadline bookkeeping for one perform_analysis call"""
+
+    def __init__(self, deadlines: StageDeadlines):
+        self.deadlines = deadlines
+        self.started = time.monotonic()
+        self.freshness: Dict[str, Dict] = {}  # stage -> {'fresh', 'age_seconds', 'latency_ms'}
+
+    async def run(self, stage: str, key: Any, factory: Callable[[], Awaitable]) -> Any:
+        runner = self.deadlines
+        full_key = (stage, key)
+        inflight_key = (stage, key, current_priority())  # The cache is shared, the tasks are not
+        task = runner._inflight.get(inflight_key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            runner._inflight[inflight_key] = task
+            task.add_done_callback(lambda done: runner._completed(full_key, inflight_key, done))
+
+        remaining = runner.budget - (time.monotonic() - self.started)
+        timeout = max(min(runner.deadlines.get(stage, remaining), remaining), 0.0)
+        cached = runner._cache.get(full_key)
+        stats = runner.stats.setdefault(stage, {'on_time': 0, 'fallbacks': 0, 'waited_uncached': 0})
+        started = time.monotonic()
+
+        if cached is None:
+            stats['waited_uncached'] += 1
+            value = await asyncio.shield(task)  # Nothing to fall back to yet
+        else:
+            try:
+                value = await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                stats['fallbacks'] += 1
+                self.freshness[stage] = {
+                    'fresh': False,
+                    'age_seconds': round(time.time() - cached[0], 3),
+                    'deadline_ms': round(timeout * 1000, 1)
+                }
+                return cached[1]
+            stats['on_time'] += 1
+
+        self.freshness[stage] = {
+            'fresh': True,
+            'age_seconds': 0.0,
+            'latency_ms': round((time.monotonic() - started) * 1000, 1)
+        }
+        return value
+
+
+def parse_stage_deadlines(spec: Optional[str]) -> Dict[str, float]:
+    """DEFAULT_STAGE_DEADLINES overridden by 'stage=seconds,...'"""
+    deadlines = dict(DEFAULT_STAGE_DEADLINES)
+    for item in (spec or '').split(','):
+        stage, _, seconds = item.strip().partition('=')
+        if stage and seconds:
+            deadlines[stage] = float(seconds)
+    return deadlines
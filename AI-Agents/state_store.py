@@ -0,0 +1,205 @@
+"""
+Persistent position / agent state backed by SQLite in WAL mode
+Callers append journal records without blocking; a background thread batches
+them into transactions and periodically compacts the journal into a snapshot.
+On startup, state is rebuilt from the latest snapshot plus the journal tail.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+# Record kinds and the state table they apply to
+POSITION_KINDS = {'position_open', 'position_update', 'position_close', 'position_delete'}
+AGENT_KINDS = {'agent_activate', 'agent_deactivate', 'agent_delete'}
+RESULT_KINDS = {'agent_result', 'agent_result_delete'}
+DELETE_KINDS = {'position_delete', 'agent_delete', 'agent_result_delete'}
+
+# High-frequency kinds where only the latest record per session matters within a batch
+COALESCED_KINDS = {'position_update', 'agent_result'}
+
+
+def _empty_state() -> Dict[str, Dict]:
+    return {'active_positions': {}, 'active_agents': {}, 'agent_results': {}}
+
+
+def _apply(state: Dict[str, Dict], kind: str, session_id: str, payload: Optional[Dict]):
+    """Apply one journal record to a materialized state"""
+    if kind in POSITION_KINDS:
+        table = state['active_positions']
+    elif kind in AGENT_KINDS:
+        table = state['active_agents']
+    elif kind in RESULT_KINDS:
+        table = state['agent_results']
+    else:
+        return
+
+    if kind in DELETE_KINDS:
+        table.pop(session_id, None)
+    else:
+        table[session_id] = payload
+
+
+class StateStore:
+    def __init__(self, db_path: str, flush_interval: float = 0.5,
+                 snapshot_every: int = 1000, max_queue: int = 100000):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._state = _empty_state()  # Materialized by the writer thread only
+        self._records_since_snapshot = 0
+        self.dropped_records = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable across application crashes in WAL mode; only an OS
+        # crash can lose the last transactions
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, kind TEXT, session_id TEXT, payload TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, last_seq INTEGER, ts REAL, state TEXT)"
+        )
+        return conn
+
+    def recover(self) -> Dict[str, Dict]:
+        """
+        Rebuild state from the latest snapshot plus every journal record after it.
+        Call before start(); the writer thread continues from the recovered state.
+        """
+        conn = self._connect()
+        try:
+            state = _empty_state()
+            last_seq = 0
+            row = conn.execute(
+                "SELECT last_seq, state FROM snapshots ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+            if row:
+                last_seq = row[0]
+                state.update(json.loads(row[1]))
+
+            replayed = 0
+            for kind, session_id, payload in conn.execute(
+                "SELECT kind, session_id, payload FROM journal WHERE seq > ? ORDER BY seq",
+                (last_seq,)
+            ):
+                _apply(state, kind, session_id, json.loads(payload) if payload else None)
+                replayed += 1
+        finally:
+            conn.close()
+
+        self._state = json.loads(json.dumps(state))  # Independent copy for the writer thread
+        self._records_since_snapshot = replayed
+        print(f"[StateStore] Recovered {len(state['active_positions'])} positions, "
+              f"{len(state['active_agents'])} agents ({replayed} journal records replayed)")
+        return state
+
+    def start(self):
+        """Start the background writer thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="state-store-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, kind: str, session_id: str, payload: Optional[Dict] = None):
+        """
+        Append a journal record without blocking. The payload is serialized
+        immediately, so callers may keep mutating their dicts afterwards.
+        """
+        encoded = json.dumps(payload, default=str) if payload is not None else None
+        try:
+            self._queue.put_nowait((time.time(), kind, session_id, encoded))
+        except queue.Full:
+            self.dropped_records += 1
+
+    def close(self, timeout: float = 5.0):
+        """Flush pending records and stop the writer thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _drain(self, first=None) -> list:
+        batch = [first] if first is not None else []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    @staticmethod
+    def _coalesce(batch: list) -> list:
+        """Keep only the latest high-frequency record per (kind, session), preserving order"""
+        latest = {}
+        for index, (ts, kind, session_id, payload) in enumerate(batch):
+            if kind in COALESCED_KINDS:
+                latest[(kind, session_id)] = index
+        return [
+            record for index, record in enumerate(batch)
+            if record[1] not in COALESCED_KINDS or latest[(record[1], record[2])] == index
+        ]
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while True:
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    first = None
+                batch = self._drain(first)
+                if batch:
+                    self._write(conn, self._coalesce(batch))
+                elif self._stop.is_set():
+                    break
+                # Give the batch time to fill up instead of one transaction per record
+                if not self._stop.is_set():
+                    self._stop.wait(self.flush_interval)
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: list):
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO journal (ts, kind, session_id, payload) VALUES (?, ?, ?, ?)",
+                    batch
+                )
+            for ts, kind, session_id, payload in batch:
+                _apply(self._state, kind, session_id, json.loads(payload) if payload else None)
+            self._records_since_snapshot += len(batch)
+
+            if self._records_since_snapshot >= self.snapshot_every:
+                self._snapshot(conn)
+        except sqlite3.Error as e:
+            print(f"[StateStore] Error writing journal batch of {len(batch)}: {e}")
+
+    def _snapshot(self, conn: sqlite3.Connection):
+        """Write the materialized state and drop the journal records it covers"""
+        with conn:
+            last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM journal").fetchone()[0]
+            conn.execute(
+                "INSERT INTO snapshots (last_seq, ts, state) VALUES (?, ?, ?)",
+                (last_seq, time.time(), json.dumps(self._state, default=str))
+            )
+            conn.execute("DELETE FROM journal WHERE seq <= ?", (last_seq,))
+            conn.execute(
+                "DELETE FROM snapshots WHERE id < (SELECT MAX(id) FROM snapshots)"
+            )
+        self._records_since_snapshot = 0
@@ -0,0 +1,149 @@
+"""
+Vectorized, seedable synthetic market data
+Random walk, geometric Brownian motion and regime-switching price processes,
+aggregated into OHLCV bars with NumPy. No network access - the start price is
+explicit - so it can feed load tests, backtests and offline simulations.
+"""
+import bisect
+import math
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+PROCESSES = ('random_walk', 'gbm', 'regime_switching')
+
+# (annualized drift, annualized volatility) for calm, trending-up and stressed regimes
+DEFAULT_REGIMES = ((0.0, 0.4), (0.8, 0.6), (-1.5, 1.5))
+DEFAULT_TRANSITIONS = (
+    (0.995, 0.003, 0.002),
+    (0.010, 0.985, 0.005),
+    (0.020, 0.010, 0.970),
+)
+SECONDS_PER_YEAR = 365.0 * 86400
+
+
+def random_walk_log_returns(n_steps: int, step_volatility: float,
+                            rng: np.random.Generator) -> np.ndarray:
+    """Symmetric random walk: uniform percentage steps with the given standard deviation"""
+    half_width = step_volatility * np.sqrt(3.0)  # Uniform(-a, a) has std a / sqrt(3)
+    return np.log1p(rng.uniform(-half_width, half_width, n_steps))
+
+
+def gbm_log_returns(n_steps: int, drift: float, volatility: float, dt_years: float,
+                    rng: np.random.Generator) -> np.ndarray:
+    """Geometric Brownian motion log returns for annualized drift/volatility"""
+    return (drift - 0.5 * volatility ** 2) * dt_years + volatility * np.sqrt(dt_years) * rng.standard_normal(n_steps)
+
+
+def regime_path(n_steps: int, transitions: Sequence[Sequence[float]],
+                rng: np.random.Generator, initial_regime: int = 0) -> np.ndarray:
+    """
+    Markov regime index per step. Regime durations are drawn as geometric
+    variables, so the loop runs once per regime switch (on plain floats), and
+    the per-step path is expanded with a single np.repeat.
+    """
+    transitions = np.asarray(transitions, dtype=np.float64)
+    stay = np.diag(transitions)
+    # None marks an absorbing regime (p >= 1); p <= 0 leaves after exactly one step
+    log_stay = [None if p >= 1.0 else (math.log(p) if p > 0.0 else 0.0) for p in stay]
+    # Cumulative probabilities of moving to each other regime, given that we leave
+    exits = transitions * (1.0 - np.eye(len(transitions)))
+    exit_totals = exits.sum(axis=1, keepdims=True)
+    exit_cdf = np.cumsum(np.divide(exits, exit_totals, out=np.zeros_like(exits), where=exit_totals > 0), axis=1)
+    exit_cdf = exit_cdf.tolist()
+
+    sequence, durations = [], []
+    position = 0
+    regime = initial_regime
+    uniforms = []
+    while position < n_steps:
+        if not uniforms:
+            uniforms = rng.random(2048).tolist()  # Drawn in chunks, consumed in pairs
+        u_duration, u_next = uniforms.pop(), uniforms.pop()
+        if log_stay[regime] is None:
+            duration = n_steps
+        elif log_stay[regime] == 0.0:
+            duration = 1
+        else:
+            duration = 1 + int(math.log(1.0 - u_duration) / log_stay[regime])
+        sequence.append(regime)
+        durations.append(duration)
+        position += duration
+        if exit_totals[regime, 0] > 0:
+            regime = min(bisect.bisect_right(exit_cdf[regime], u_next), len(stay) - 1)
+
+    return np.repeat(np.asarray(sequence, dtype=np.int64), durations)[:n_steps]
+
+
+def regime_switching_log_returns(n_steps: int, dt_years: float, rng: np.random.Generator,
+                                 regimes: Sequence[Sequence[float]] = DEFAULT_REGIMES,
+                                 transitions: Sequence[Sequence[float]] = DEFAULT_TRANSITIONS) -> np.ndarray:
+    """GBM log returns whose drift/volatility follow a Markov regime chain"""
+    regime_params = np.asarray(regimes, dtype=np.float64)
+    path = regime_path(n_steps, transitions, rng)
+    drift = regime_params[path, 0]
+    volatility = regime_params[path, 1]
+    return (drift - 0.5 * volatility ** 2) * dt_years + volatility * np.sqrt(dt_years) * rng.standard_normal(n_steps)
+
+
+def generate_ohlcv(n_bars: int, start_price: float, process: str = 'gbm',
+                   interval_seconds: int = 3600, end_time: Optional[float] = None,
+                   seed: Optional[int] = None, substeps: int = 4, anchor: str = 'start',
+                   drift: float = 0.0, volatility: float = 0.6, step_volatility: float = 0.0115,
+                   regimes: Sequence[Sequence[float]] = DEFAULT_REGIMES,
+                   transitions: Sequence[Sequence[float]] = DEFAULT_TRANSITIONS,
+                   base_volume: float = 5000000.0) -> Dict[str, np.ndarray]:
+    """
+    Synthetic OHLCV bars as NumPy columns (timestamp, open, high, low, close, volume).
+
+    Each bar is simulated with `substeps` intra-bar steps so high/low are real path
+    extremes. anchor='start' opens the first bar at start_price; anchor='end' scales
+    the series so the last close equals start_price (useful for "history up to now").
+    volatility/drift are annualized (gbm); step_volatility is per substep (random_walk).
+    """
+    if process not in PROCESSES:
+        raise ValueError(f"Unknown process '{process}', expected one of {PROCESSES}")
+    if n_bars <= 0:
+        empty = np.empty(0, dtype=np.float64)
+        return {name: empty for name in ('timestamp', 'open', 'high', 'low', 'close', 'volume')}
+
+    rng = np.random.default_rng(seed)
+    n_steps = n_bars * substeps
+    dt_years = interval_seconds / substeps / SECONDS_PER_YEAR
+
+    if process == 'random_walk':
+        log_returns = random_walk_log_returns(n_steps, step_volatility, rng)
+    elif process == 'gbm':
+        log_returns = gbm_log_returns(n_steps, drift, volatility, dt_years, rng)
+    else:
+        log_returns = regime_switching_log_returns(n_steps, dt_years, rng, regimes, transitions)
+
+    path = start_price * np.exp(np.cumsum(log_returns)).reshape(n_bars, substeps)
+    close = path[:, -1]
+    open_prices = np.empty(n_bars, dtype=np.float64)
+    open_prices[0] = start_price
+    open_prices[1:] = close[:-1]
+    high = np.maximum(path.max(axis=1), open_prices)
+    low = np.minimum(path.min(axis=1), open_prices)
+
+    if anchor == 'end':
+        scale = start_price / close[-1]
+        open_prices, high, low, close = open_prices * scale, high * scale, low * scale, close * scale
+
+    # Volume grows with the size of the bar's range
+    bar_range = (high - low) / open_prices
+    volume = base_volume * rng.lognormal(0.0, 0.5, n_bars) * (1.0 + 10.0 * bar_range)
+
+    end_time = time.time() if end_time is None else end_time
+    timestamps = end_time - interval_seconds * np.arange(n_bars - 1, -1, -1, dtype=np.float64)
+
+    return {
+        'timestamp': timestamps,
+        'open': open_prices,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume
+    }
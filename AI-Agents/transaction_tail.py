@@ -0,0 +1,179 @@
+"""
+Aptos transaction tailing worker
+Pages /transactions forward from the last version in the event ring (several
+pages in flight while catching up), extracts coin deposits and withdrawals of
+the tracked assets, and appends them to the memory-mapped EventRingBuffer.
+After a restart it resumes from the ring's last version.
+"""
+import asyncio
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from aptos_rpc import AptosRpcClient
+from event_ring import EventRingBuffer, EVENT_DTYPE, EVENT_DEPOSIT, EVENT_WITHDRAW, token_id
+from hyperloglog import hash64
+
+
+COIN_STORE_PREFIX = '0x1::coin::CoinStore<'
+# Newer coin events name the coin and account; legacy ones only carry the event handle's account
+TYPED_EVENTS = {'0x1::coin::CoinDeposit': EVENT_DEPOSIT, '0x1::coin::CoinWithdraw': EVENT_WITHDRAW}
+LEGACY_EVENTS = {'0x1::coin::DepositEvent': EVENT_DEPOSIT, '0x1::coin::WithdrawEvent': EVENT_WITHDRAW}
+
+
+def extract_transfers(transaction: Dict, assets: Dict[str, Tuple[str, int]]) -> List[tuple]:
+    """(symbol, kind, account, amount in token units) for each tracked coin movement in a transaction"""
+    if transaction.get('type') != 'user_transaction' or not transaction.get('success', True):
+        return []
+
+    # Legacy Deposit/WithdrawEvent don't name the coin: take it from the account's CoinStore<T> write
+    account_coins: Dict[str, set] = {}
+    for change in transaction.get('changes', []):
+        resource_type = (change.get('data') or {}).get('type', '')
+        if change.get('type') == 'write_resource' and resource_type.startswith(COIN_STORE_PREFIX):
+            coin = resource_type[len(COIN_STORE_PREFIX):-1]
+            if coin in assets:
+                account_coins.setdefault(change.get('address'), set()).add(coin)
+
+    transfers = []
+    for event in transaction.get('events', []):
+        event_type = event.get('type')
+        data = event.get('data') or {}
+        if event_type in TYPED_EVENTS:
+            kind, coin, account = TYPED_EVENTS[event_type], data.get('coin_type'), data.get('account')
+        elif event_type in LEGACY_EVENTS:
+            account = (event.get('guid') or {}).get('account_address')
+            coins = account_coins.get(account, ())
+            if len(coins) != 1:
+                continue  # Ambiguous or untracked
+            kind, coin = LEGACY_EVENTS[event_type], next(iter(coins))
+        else:
+            continue
+        if coin not in assets or not account:
+            continue
+        symbol, decimals = assets[coin]
+        transfers.append((symbol, kind, account, int(data.get('amount', 0)) / 10 ** decimals))
+    return transfers
+
+
+class TransactionTailer:
+    def __init__(self, rpc: AptosRpcClient, ring: EventRingBuffer, assets: Dict[str, Tuple[str, int]],
+                 page_size: int = 100, concurrency: int = 4, poll_interval: float = 1.0,
+                 backfill_versions: int = 10000, flush_interval: float = 5.0, max_retry_delay: float = 30.0):
+        self.rpc = rpc
+        self.ring = ring
+        self.assets = assets  # Asset type -> (symbol, decimals)
+        self.page_size = page_size
+        self.concurrency = concurrency  # Pages in flight while catching up
+        self.poll_interval = poll_interval
+        self.backfill_versions = backfill_versions  # Where to start on an empty ring
+        self.flush_interval = flush_interval
+        self.max_retry_delay = max_retry_delay
+        self.next_version: Optional[int] = None
+        self._listeners: List[Callable] = []
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'transactions': 0, 'events': 0, 'errors': 0, 'behind_versions': None, 'lag_seconds': None}
+
+    def add_records_listener(self, callback: Callable):
+        """callback(records) with every batch of EVENT_DTYPE records appended to the ring"""
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.ring.flush()
+
+    def to_records(self, transactions: List[Dict]) -> np.ndarray:
+        rows = []
+        for transaction in transactions:
+            timestamp = int(transaction.get('timestamp', 0)) / 1e6
+            version = int(transaction['version'])
+            for symbol, kind, account, amount in extract_transfers(transaction, self.assets):
+                rows.append((version, timestamp, amount, hash64(account), token_id(symbol), kind, 0))
+        return np.array(rows, dtype=EVENT_DTYPE)
+
+    async def poll_once(self) -> int:
+        """Fetch and store what is available; returns the number of transactions read"""
+        ledger = await self.rpc.ledger_version()
+        if self.next_version is None:
+            last = self.ring.last_version
+            self.next_version = last + 1 if last is not None else max(ledger - self.backfill_versions, 0)
+        behind = ledger - self.next_version + 1
+        self.stats['behind_versions'] = max(behind, 0)
+        if behind <= 0:
+            return 0
+
+        pages = min(self.concurrency, math.ceil(behind / self.page_size))
+        results = await asyncio.gather(*[
+            self.rpc.get_transactions(self.next_version + i * self.page_size, self.page_size) for i in range(pages)
+        ])
+        transactions = []
+        for page in results:
+            transactions.extend(page)
+            if len(page) < self.page_size:
+                break  # Anything after a short page would leave a gap
+        if not transactions:
+            return 0
+
+        records = self.to_records(transactions)
+        if len(records):
+            self.ring.append(records)
+            for callback in self._listeners:
+                callback(records)
+        self.next_version = int(transactions[-1]['version']) + 1
+        self.stats['transactions'] += len(transactions)
+        self.stats['events'] += len(records)
+        self.stats['lag_seconds'] = round(time.time() - int(transactions[-1].get('timestamp', 0)) / 1e6, 1)
+        return len(transactions)
+
+    async def _run(self):
+        print(f"[Tx Tail] Tailing {', '.join(symbol for symbol, _ in self.assets.values())} into {self.ring.path}")
+        delay = self.poll_interval
+        last_flush = time.monotonic()
+        while True:
+            try:
+                read = await self.poll_once()
+                delay = self.poll_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"⚠️  [Tx Tail] {type(e).__name__}: {e} - retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self.ring.flush()
+                last_flush = time.monotonic()
+            if read < self.page_size * self.concurrency:
+                await asyncio.sleep(self.poll_interval)  # Caught up
+
+    def snapshot(self) -> dict:
+        return {
+            'ring_path': self.ring.path,
+            'ring_events': len(self.ring),
+            'ring_capacity': self.ring.capacity,
+            'next_version': self.next_version,
+            **self.stats
+        }
+
+
+def create_transaction_tailer(rpc: AptosRpcClient, assets: Dict[str, Tuple[str, int]]) -> Optional[TransactionTailer]:
+    """TransactionTailer writing to APTOS_EVENT_RING_PATH, or None when that is unset"""
+    path = os.getenv('APTOS_EVENT_RING_PATH')
+    if not path:
+        return None
+    ring = EventRingBuffer(path, int(os.getenv('APTOS_EVENT_RING_CAPACITY', '1000000')))
+    return TransactionTailer(rpc, ring, assets)
@@ -0,0 +1,158 @@
+"""
+Streaming volatility estimators for leverage sizing
+Each update is O(1) so it can run on every tick for every active token
+"""
+import math
+import time
+from typing import Dict, Optional
+
+
+SECONDS_PER_DAY = 86400.0
+
+
+class EWMAVolatility:
+    """
+    Close-to-close volatility as an exponentially weighted variance of log returns.
+    Decay is time-aware, so irregular tick spacing is handled correctly.
+    """
+
+    def __init__(self, halflife_seconds: float = 3600.0):
+        self.halflife_seconds = halflife_seconds
+        self.variance_rate = None  # Variance of log returns per second
+        self.last_price = None
+        self.last_timestamp = None
+        self.samples = 0
+
+    def update(self, price: float, timestamp: Optional[float] = None) -> Optional[float]:
+        """Feed a new price observation and return the updated daily volatility"""
+        if not price or price <= 0:
+            return self.daily_volatility()
+
+        timestamp = time.time() if timestamp is None else timestamp
+
+        if self.last_price is None:
+            self.last_price = price
+            self.last_timestamp = timestamp
+            return None
+
+        dt = timestamp - self.last_timestamp
+        # Skip out-of-order ticks and repeated (stale) quotes - CMC only refreshes
+        # about once a minute, and counting the repeats as zero returns would bias
+        # the estimate towards zero
+        if dt <= 0 or price == self.last_price:
+            return self.daily_volatility()
+
+        log_return = math.log(price / self.last_price)
+        sample_rate = (log_return * log_return) / dt
+        alpha = 1.0 - 0.5 ** (dt / self.halflife_seconds)
+
+        if self.variance_rate is None:
+            self.variance_rate = sample_rate
+        else:
+            self.variance_rate = (1.0 - alpha) * self.variance_rate + alpha * sample_rate
+
+        self.last_price = price
+        self.last_timestamp = timestamp
+        self.samples += 1
+        return self.daily_volatility()
+
+    def daily_volatility(self) -> Optional[float]:
+        """Volatility scaled to one day (e.g. 0.04 = 4% daily standard deviation)"""
+        if self.variance_rate is None:
+            return None
+        return math.sqrt(self.variance_rate * SECONDS_PER_DAY)
+
+
+class ParkinsonVolatility:
+    """
+    Range-based (Parkinson) volatility from OHLC bars, smoothed with an EWMA.
+    Uses the high/low range, so it is ~5x more efficient than close-to-close per bar.
+    """
+
+    PARKINSON_FACTOR = 1.0 / (4.0 * math.log(2.0))
+
+    def __init__(self, span: int = 20):
+        self.alpha = 2.0 / (span + 1.0)
+        self.variance_rate = None  # Variance per second
+        self.samples = 0
+
+    def update(self, high: float, low: float, period_seconds: float) -> Optional[float]:
+        """Feed one bar and return the updated daily volatility"""
+        if not high or not low or high < low or low <= 0 or period_seconds <= 0:
+            return self.daily_volatility()
+
+        log_range = math.log(high / low)
+        sample_rate = self.PARKINSON_FACTOR * log_range * log_range / period_seconds
+
+        if self.variance_rate is None:
+            self.variance_rate = sample_rate
+        else:
+            self.variance_rate = (1.0 - self.alpha) * self.variance_rate + self.alpha * sample_rate
+
+        self.samples += 1
+        return self.daily_volatility()
+
+    def daily_volatility(self) -> Optional[float]:
+        """Volatility scaled to one day"""
+        if self.variance_rate is None:
+            return None
+        return math.sqrt(self.variance_rate * SECONDS_PER_DAY)
+
+
+class VolatilityTracker:
+    """
+    Keeps one set of estimators per token.
+    Close-to-close EWMA is preferred once it has enough samples; Parkinson fills in
+    while the tick history is still short (e.g. right after startup).
+    """
+
+    def __init__(self, halflife_seconds: float = 3600.0, min_samples: int = 5):
+        self.halflife_seconds = halflife_seconds
+        self.min_samples = min_samples
+        self._close_estimators: Dict[str, EWMAVolatility] = {}
+        self._range_estimators: Dict[str, ParkinsonVolatility] = {}
+        self._last_bar: Dict[str, float] = {}  # token -> timestamp of the newest bar fed
+
+    def update_price(self, token: str, price: float, timestamp: Optional[float] = None) -> Optional[float]:
+        """Feed a tick price for a token"""
+        estimator = self._close_estimators.get(token)
+        if estimator is None:
+            estimator = EWMAVolatility(self.halflife_seconds)
+            self._close_estimators[token] = estimator
+        estimator.update(price, timestamp)
+        return self.get_daily_volatility(token)
+
+    def update_ohlc(self, token: str, high: float, low: float, period_seconds: float) -> Optional[float]:
+        """Feed an OHLC bar for a token"""
+        estimator = self._range_estimators.get(token)
+        if estimator is None:
+            estimator = ParkinsonVolatility()
+            self._range_estimators[token] = estimator
+        estimator.update(high, low, period_seconds)
+        return self.get_daily_volatility(token)
+
+    def update_ohlc_columns(self, token: str, columns: Dict) -> Optional[float]:
+        """Feed completed bars from historical OHLCV columns that are newer than any fed before"""
+        timestamps = columns['timestamp']
+        if len(timestamps) < 2:
+            return self.get_daily_volatility(token)
+        last = self._last_bar.get(token, float('-inf'))
+        # The final bar may still be forming; its period is taken from the bar spacing
+        for i in range(len(timestamps) - 1):
+            if timestamps[i] > last:
+                self.update_ohlc(token, float(columns['high'][i]), float(columns['low'][i]),
+                                 float(timestamps[i + 1] - timestamps[i]))
+                self._last_bar[token] = float(timestamps[i])
+        return self.get_daily_volatility(token)
+
+    def get_daily_volatility(self, token: str) -> Optional[float]:
+        """Best available daily volatility estimate for a token, or None if unknown"""
+        close_estimator = self._close_estimators.get(token)
+        if close_estimator and close_estimator.samples >= self.min_samples:
+            return close_estimator.daily_volatility()
+
+        range_estimator = self._range_estimators.get(token)
+        if range_estimator and range_estimator.samples > 0:
+            return range_estimator.daily_volatility()
+
+        return None
@@ -0,0 +1,148 @@
+"""
+Large-transfer and exchange-flow detection
+Classifies every transfer event from the on-chain feeds against sorted USD
+size tiers (bisect / searchsorted, O(log n) per event), and tracks flows into
+and out of known exchange addresses. Batches from the event ring are filtered
+with vectorized masks first, so only the rare hits reach Python code. Net
+exchange flow over the last hour becomes whale_flow_signal (-100..+100):
+outflows (coins leaving exchanges) read bullish, inflows bearish.
+"""
+import bisect
+import os
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from event_ring import EVENT_DEPOSIT, EVENT_WITHDRAW, token_id
+from hyperloglog import hash64
+from onchain_activity import RollingWindowCounter
+
+
+DEFAULT_THRESHOLDS_USD = [100_000.0, 1_000_000.0, 10_000_000.0]
+TIER_NAMES = ['large', 'whale', 'mega_whale']
+FLOW_METRICS = ('large_transfers', 'large_volume_usd', 'exchange_inflow_usd', 'exchange_outflow_usd')
+
+
+class WhaleDetector:
+    def __init__(self, assets: Dict[str, Tuple[str, int]], price_lookup: Optional[Callable[[str], Optional[float]]] = None,
+                 thresholds_usd: Optional[Dict[str, List[float]]] = None, exchange_addresses: Iterable[str] = (),
+                 max_alerts: int = 100):
+        self.decimals = {symbol: decimals for symbol, decimals in assets.values()}
+        self._symbols_by_id = {token_id(symbol): symbol for symbol in self.decimals}
+        self.price_lookup = price_lookup
+        # TOKEN -> ascending USD tier thresholds; '*' applies to tokens without their own
+        self.thresholds = {'*': sorted(DEFAULT_THRESHOLDS_USD)}
+        for token, values in (thresholds_usd or {}).items():
+            self.thresholds[token.upper()] = sorted(values)
+        self._exchange_hashes = {hash64(address) for address in exchange_addresses}
+        self._exchange_array = np.array(sorted(self._exchange_hashes), dtype=np.uint64)
+        self._flows: Dict[str, RollingWindowCounter] = {}
+        self.alerts = deque(maxlen=max_alerts)
+        self.generation = 0  # Bumped on every detection, for cache invalidation
+        self.stats = {'events': 0, 'large_transfers': 0, 'exchange_flows': 0, 'unpriced': 0}
+
+    def tier(self, token: str, usd: float) -> int:
+        """0 below the smallest threshold, else 1 + index of the highest threshold reached"""
+        return bisect.bisect_right(self.thresholds.get(token, self.thresholds['*']), usd)
+
+    def _record(self, token: str, kind: int, usd: float, tier: int, to_exchange: bool,
+                timestamp: float, amount: float, version: Optional[int]):
+        counter = self._flows.get(token)
+        if counter is None:
+            counter = self._flows[token] = RollingWindowCounter(FLOW_METRICS, {'1h': 3600})
+        values = {}
+        if tier and kind == EVENT_DEPOSIT:  # One side per transfer
+            values['large_transfers'] = 1
+            values['large_volume_usd'] = usd
+            self.stats['large_transfers'] += 1
+        if to_exchange:
+            values['exchange_inflow_usd' if kind == EVENT_DEPOSIT else 'exchange_outflow_usd'] = usd
+            self.stats['exchange_flows'] += 1
+        counter.add(timestamp, **values)
+        self.generation += 1
+
+        if tier and (kind == EVENT_DEPOSIT or to_exchange):
+            self.alerts.append({
+                'token': token,
+                'tier': TIER_NAMES[min(tier, len(TIER_NAMES)) - 1],
+                'amount': amount,
+                'usd': round(usd, 2),
+                'direction': ('exchange_inflow' if kind == EVENT_DEPOSIT else 'exchange_outflow') if to_exchange else 'transfer',
+                'version': version,
+                'timestamp': timestamp
+            })
+
+    def observe(self, token: str, kind: int, address: str, amount: float, timestamp: float,
+                version: Optional[int] = None):
+        """One transfer event (amount in token units)"""
+        self.stats['events'] += 1
+        price = self.price_lookup(token) if self.price_lookup else None
+        if not price:
+            self.stats['unpriced'] += 1
+            return
+        usd = amount * price
+        tier = self.tier(token, usd)
+        to_exchange = hash64(address) in self._exchange_hashes
+        if tier or to_exchange:
+            self._record(token, kind, usd, tier, to_exchange, timestamp, amount, version)
+
+    def observe_activity(self, token: str, activity: Dict, timestamp: float):
+        """Listener for IndexerIngestor (raw fungible_asset_activities rows)"""
+        kind = EVENT_DEPOSIT if 'Deposit' in activity.get('type', '') else EVENT_WITHDRAW
+        amount = int(activity.get('amount', 0)) / 10 ** self.decimals.get(token, 8)
+        self.observe(token, kind, activity.get('owner_address', ''), amount, timestamp,
+                     int(activity.get('transaction_version', 0)))
+
+    def observe_records(self, records: np.ndarray):
+        """Listener for TransactionTailer: a batch of EVENT_DTYPE records, classified vectorized per token"""
+        self.stats['events'] += len(records)
+        if not len(records):
+            return
+        to_exchange = np.isin(records['address'], self._exchange_array) if len(self._exchange_array) \
+            else np.zeros(len(records), dtype=bool)
+        for token_key in np.unique(records['token']):
+            token = self._symbols_by_id.get(int(token_key))
+            if token is None:
+                continue
+            mask = records['token'] == token_key
+            price = self.price_lookup(token) if self.price_lookup else None
+            if not price:
+                self.stats['unpriced'] += int(mask.sum())
+                continue
+            token_records = records[mask]
+            usd = token_records['amount'] * price
+            tiers = np.searchsorted(np.asarray(self.thresholds.get(token, self.thresholds['*'])), usd, side='right')
+            exchange = to_exchange[mask]
+            for i in np.flatnonzero((tiers > 0) | exchange):
+                record = token_records[i]
+                self._record(token, int(record['kind']), float(usd[i]), int(tiers[i]), bool(exchange[i]),
+                             float(record['timestamp']), float(record['amount']), int(record['version']))
+
+    def flows(self, token: str, now: Optional[float] = None) -> Dict:
+        """Last-hour large transfers and exchange flows, with the net-flow signal"""
+        counter = self._flows.get(token.upper())
+        totals = counter.totals('1h', now) if counter else {metric: 0.0 for metric in FLOW_METRICS}
+        inflow, outflow = totals['exchange_inflow_usd'], totals['exchange_outflow_usd']
+        signal = (outflow - inflow) / (outflow + inflow) * 100 if outflow + inflow > 0 else 0.0
+        return {
+            'whale_flow_signal': signal,
+            'large_transfers_1h': int(totals['large_transfers']),
+            'large_volume_usd_1h': totals['large_volume_usd'],
+            'exchange_inflow_usd_1h': inflow,
+            'exchange_outflow_usd_1h': outflow
+        }
+
+    def recent_alerts(self, token: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        alerts = [alert for alert in self.alerts if token is None or alert['token'] == token.upper()]
+        return alerts[-limit:]
+
+
+def create_whale_detector(assets: Dict[str, Tuple[str, int]],
+                          price_lookup: Optional[Callable[[str], Optional[float]]] = None) -> WhaleDetector:
+    """WhaleDetector with WHALE_THRESHOLDS_USD (comma list, all tokens) and EXCHANGE_ADDRESSES from the environment"""
+    thresholds = None
+    if os.getenv('WHALE_THRESHOLDS_USD'):
+        thresholds = {'*': [float(value) for value in os.getenv('WHALE_THRESHOLDS_USD').split(',') if value.strip()]}
+    exchanges = [address.strip() for address in os.getenv('EXCHANGE_ADDRESSES', '').split(',') if address.strip()]
+    return WhaleDetector(assets, price_lookup, thresholds, exchanges)